@@ -0,0 +1,106 @@
+"""Micro-benchmark: webhook ingest overhead (parse, normalize, validate, encode).
+
+Compares the previous path (``json.loads`` on decoded text, ``model_dump()``
+round-trip, stdlib response encoder) with the orjson single-validation path
+on large Wazuh alerts. IOC extraction and intel lookups are the same on both
+paths and are done once up front, so only the ingest overhead is timed.
+
+Run with ``python benchmarks/bench_ingest.py`` (or ``make bench``). Exits
+non-zero if the current path is slower.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import sys
+import timeit
+from typing import Any, Dict, List
+
+import orjson
+
+from soc_agent.adapters import normalize_event
+from soc_agent.analyzer import base_score, extract_iocs, score_event
+from soc_agent.models import EventIn
+
+
+def build_alerts(size: int = 200, seed: int = 11) -> List[bytes]:
+    """Wazuh alerts carrying a multi-KB ``full_log`` and a nested ``data`` section."""
+    rng = random.Random(seed)
+    alerts = []
+    for i in range(size):
+        ip = ".".join(str(rng.randint(1, 254)) for _ in range(4))
+        log_lines = [
+            f"Oct 18 10:22:{j % 60:02d} srv{i} sshd[{rng.randint(1000, 9999)}]: Failed password "
+            f"for invalid user u{j} from {ip} port {rng.randint(1024, 65535)} ssh2"
+            for j in range(40)
+        ]
+        alert = {
+            "timestamp": "2024-10-18T10:22:00.000+0000",
+            "rule": {
+                "level": rng.randint(3, 12),
+                "description": "sshd: authentication failed.",
+                "id": "5716",
+                "groups": ["syslog", "sshd", "authentication_failed"],
+                "mitre": {"id": ["T1110"], "tactic": ["Credential Access"]},
+            },
+            "agent": {"id": f"{i:03d}", "name": f"srv{i}", "ip": "10.0.0.5"},
+            "manager": {"name": "wazuh-manager"},
+            "data": {"srcip": ip, "srcuser": f"user{i}", "srcport": str(rng.randint(1, 65535))},
+            "decoder": {"parent": "sshd", "name": "sshd"},
+            "location": "/var/log/auth.log",
+            "full_log": "\n".join(log_lines),
+            "previous_output": "\n".join(log_lines[:20]),
+        }
+        alerts.append(json.dumps(alert).encode())
+    return alerts
+
+
+def _stub_intel(ips: List[str]) -> List[Dict[str, Any]]:
+    return [{"indicator": ip, "score": 0, "labels": ["unknown"], "sources": {}} for ip in ips]
+
+
+def analyze(body: bytes) -> Dict[str, Any]:
+    payload = EventIn.model_validate(normalize_event(orjson.loads(body)))
+    iocs = extract_iocs(payload)
+    return score_event(payload, iocs, _stub_intel(iocs["ips"]), base_score(payload))
+
+
+def legacy_ingest(body: bytes, result: Dict[str, Any]) -> bytes:
+    event = json.loads(body.decode("utf-8"))
+    payload = EventIn.model_validate(normalize_event(event))
+    payload.model_dump()
+    return json.dumps(
+        {"analysis": result, "actions": {}}, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def current_ingest(body: bytes, result: Dict[str, Any]) -> bytes:
+    EventIn.model_validate(normalize_event(orjson.loads(body)))
+    return orjson.dumps({"analysis": result, "actions": {}})
+
+
+def main() -> int:
+    alerts = build_alerts()
+    total_kb = sum(len(a) for a in alerts) / 1024
+    work = [(body, analyze(body)) for body in alerts]
+    for body, result in work:
+        assert legacy_ingest(body, result) == current_ingest(body, result), "bytes differ"
+
+    def run(fn):
+        for body, result in work:
+            fn(body, result)
+
+    rounds = 5
+    legacy = min(timeit.repeat(lambda: run(legacy_ingest), number=1, repeat=rounds))
+    current = min(timeit.repeat(lambda: run(current_ingest), number=1, repeat=rounds))
+    per_event = 1e6 / len(alerts)
+    print(f"alerts : {len(alerts)} Wazuh alerts, {total_kb:.0f} KiB")
+    print(f"legacy : {legacy * per_event:8.1f} us/event")
+    print(f"current: {current * per_event:8.1f} us/event")
+    print(f"speedup: {legacy / current:.2f}x")
+    return 0 if current <= legacy else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Micro-benchmark: single-pass IOC extraction vs. the original two-regex version.
+
+Run with ``python benchmarks/bench_iocs.py`` (or ``make bench``). Exits non-zero
+if the current extractor is slower than the legacy one on the corpus.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import socket
+import sys
+import timeit
+from typing import Any, Dict, List
+
+from soc_agent.analyzer import extract_iocs
+
+
+def legacy_is_ip(value: str) -> bool:
+    try:
+        socket.inet_aton(value)
+        return True
+    except OSError:
+        return False
+
+
+def legacy_extract_iocs(event: Dict[str, Any]) -> Dict[str, List[str]]:
+    ips: List[str] = []
+    domains: List[str] = []
+    for key in ("ip", "src_ip", "dst_ip", "attacker_ip", "host_ip"):
+        v = event.get(key)
+        if isinstance(v, str) and legacy_is_ip(v):
+            ips.append(v)
+    msg = event.get("message", "") or ""
+    ips += re.findall(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", msg)
+    domains += re.findall(r"\b([a-zA-Z0-9-]+\.)+[a-zA-Z]{2,}\b", msg)
+    ips = sorted({ip for ip in ips if legacy_is_ip(ip)})
+    domains = sorted(set(domains))
+    return {"ips": ips, "domains": domains}
+
+
+def _ip(rng: random.Random) -> str:
+    return ".".join(str(rng.randint(1, 254)) for _ in range(4))
+
+
+def _hex(rng: random.Random, n: int) -> str:
+    return "".join(rng.choice("0123456789abcdef") for _ in range(n))
+
+
+def build_corpus(size: int = 400, seed: int = 7) -> List[Dict[str, Any]]:
+    """Wazuh/CrowdStrike-like messages, from one-liners to multi-KB full_log."""
+    rng = random.Random(seed)
+    events: List[Dict[str, Any]] = []
+    for i in range(size):
+        kind = i % 4
+        if kind == 0:
+            msg = (
+                f"Oct 18 10:22:{i % 60:02d} srv01 sshd[{rng.randint(1000, 9999)}]: "
+                f"Failed password for invalid user admin from {_ip(rng)} port "
+                f"{rng.randint(1024, 65535)} ssh2 conn {_ip(rng)}:{rng.randint(1024, 65535)}"
+                f" -> dstip:{_ip(rng)}:22"
+            )
+        elif kind == 1:
+            msg = (
+                f'"C:\\Windows\\System32\\cmd.exe" /c powershell -enc {_hex(rng, 120)} '
+                f"-url https://cdn{i}.bad-example.net/payload.bin sha256 {_hex(rng, 64)} "
+                f"md5 {_hex(rng, 32)} parent svchost.exe remote {_ip(rng)}"
+            )
+        elif kind == 2:
+            lines = [
+                f"type=SYSCALL msg=audit(1697624553.{i}:{rng.randint(1, 9999)}): arch=c000003e "
+                f"syscall=59 success=yes exit=0 a0={_hex(rng, 12)} ppid={rng.randint(1, 9999)} "
+                f'comm="curl" exe="/usr/bin/curl" key="exfil" addr={_ip(rng)} '
+                f"host=mirror{rng.randint(1, 99)}.example.org"
+                for _ in range(30)
+            ]
+            msg = "\n".join(lines)
+        else:
+            diff = "\n".join(
+                f"< {_hex(rng, 40)}  /var/www/html/{_hex(rng, 8)}.php  v{rng.randint(1, 9)}."
+                f"{rng.randint(0, 9)}.{rng.randint(0, 9)}.{rng.randint(0, 9)}.{rng.randint(0, 9)}"
+                for _ in range(40)
+            )
+            msg = f"Integrity checksum changed for: '/etc/passwd'\n{diff}\nfe80::1ff:fe23:4567:890a"
+        events.append({"message": msg, "ip": _ip(rng)})
+    return events
+
+
+def main() -> int:
+    corpus = build_corpus()
+    total_kb = sum(len(e["message"]) for e in corpus) / 1024
+
+    def run(fn):
+        for event in corpus:
+            fn(event)
+
+    rounds = 5
+    legacy = min(timeit.repeat(lambda: run(legacy_extract_iocs), number=1, repeat=rounds))
+    current = min(timeit.repeat(lambda: run(extract_iocs), number=1, repeat=rounds))
+    print(f"corpus: {len(corpus)} events, {total_kb:.0f} KiB")
+    print(f"legacy : {legacy * 1000:8.2f} ms  ({total_kb / legacy / 1024:6.1f} MiB/s)")
+    print(f"current: {current * 1000:8.2f} ms  ({total_kb / current / 1024:6.1f} MiB/s)")
+    print(f"speedup: {legacy / current:.2f}x")
+    return 0 if current <= legacy else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Cold-start benchmark: import time and memory of a fresh worker process.
+
+Each run starts a new interpreter (like a pre-forked server worker or a
+test session) and measures:
+
+- ``import_ms``: ``import soc_agent.webapp``
+- ``first_event_ms``: scoring the first event afterwards, which now pays for
+  whatever was deferred (settings, intel client, rules)
+- ``rss_import_mb`` / ``rss_first_event_mb``: peak resident memory at both points
+- ``modules``: modules loaded by the import
+
+Medians over ``--runs`` are printed as JSON, together with a bare
+interpreter for reference. Run with ``python benchmarks/bench_startup.py``
+(or ``make startup``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+PROBE = r"""
+import json, resource, sys, time
+start = time.perf_counter()
+before = len(sys.modules)
+import soc_agent.webapp
+imported = time.perf_counter()
+rss_import = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+modules = len(sys.modules) - before
+if {first_event}:
+    import asyncio
+    from soc_agent.analyzer import enrich_and_score
+    event = {{"event_type": "auth_failed", "severity": 5, "message": "from 203.0.113.7"}}
+    asyncio.run(enrich_and_score(event))
+done = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "first_event_ms": (done - imported) * 1000,
+    "rss_import_mb": rss_import / 1024,
+    "rss_first_event_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": modules,
+}}))
+"""
+
+BARE = r"""
+import json, resource
+print(json.dumps({"rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def run(code: str) -> Dict[str, float]:
+    out = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def medians(samples: List[Dict[str, float]]) -> Dict[str, float]:
+    return {key: round(statistics.median(s[key] for s in samples), 1) for key in samples[0]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--no-first-event", action="store_true")
+    args = parser.parse_args()
+    probe = PROBE.format(first_event=not args.no_first_event)
+    run(probe)  # warm the bytecode cache
+    report = {
+        "runs": args.runs,
+        "webapp": medians([run(probe) for _ in range(args.runs)]),
+        "bare_interpreter": medians([run(BARE) for _ in range(args.runs)]),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""End-to-end ``/webhook`` benchmark against local stand-ins for every external service.
+
+Starts stub OTX, VirusTotal, AbuseIPDB and Autotask HTTP servers and an SMTP
+sink (see ``stubs.py``), points the real app at them, serves it with uvicorn
+and replays the Wazuh and CrowdStrike fixtures in ``fixtures/``. Source IPs
+are rewritten from a pool of ``--unique-ips`` addresses, which sets the
+intel cache hit ratio.
+
+Reports throughput and p50/p95/p99 latency per pipeline stage:
+
+* ``request``  - client-observed HTTP round trip
+* ``normalize`` - vendor adapter
+* ``analyze``  - enrichment plus scoring
+* ``enrich``   - intel lookups (part of ``analyze``)
+* ``actions``  - queueing the ticket/email
+* ``ticket_delivery`` / ``email_delivery`` - queued until delivered
+
+With ``--baseline`` the run fails (exit 1) if throughput dropped or any
+stage's p95 grew by more than ``--tolerance`` relative to the stored numbers.
+``--update-baseline`` rewrites the baseline file from this run.
+
+Run with ``make perf``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from stubs import serve_all
+
+HERE = Path(__file__).resolve().parent
+FIXTURES = HERE / "fixtures"
+# Absolute slack on p95 comparisons, so sub-millisecond stages do not flap.
+P95_SLACK_MS = 2.0
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("--events", type=int, default=1000)
+    p.add_argument("--concurrency", type=int, default=32)
+    p.add_argument("--unique-ips", type=int, default=200)
+    p.add_argument("--latency-ms", type=float, default=20.0, help="stub service latency")
+    p.add_argument("--jitter-ms", type=float, default=10.0)
+    p.add_argument("--error-rate", type=float, default=0.01, help="stub failure fraction")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--baseline", type=Path, default=None)
+    p.add_argument("--tolerance", type=float, default=0.5)
+    p.add_argument("--update-baseline", action="store_true")
+    p.add_argument("--output", type=Path, default=None, help="write the JSON report here")
+    return p.parse_args(argv)
+
+
+class Services:
+    """The stub services, running in a child process."""
+
+    def __init__(self, args: argparse.Namespace):
+        self._conn, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=serve_all,
+            args=(child, args.latency_ms, args.jitter_ms, args.error_rate, args.seed),
+            daemon=True,
+        )
+        self._process.start()
+        self.addresses: Dict[str, Any] = self._conn.recv()
+
+    def stop(self) -> Dict[str, Any]:
+        self._conn.send("stop")
+        stats = self._conn.recv()
+        self._process.join(5)
+        return stats
+
+
+def configure_environment(services: Dict[str, Any]) -> None:
+    """Point the app at the stubs; must run before ``soc_agent`` is imported."""
+    smtp_host, smtp_port = services["smtp"]
+    os.environ.update(
+        {
+            "OTX_API_KEY": "bench",
+            "VT_API_KEY": "bench",
+            "ABUSEIPDB_API_KEY": "bench",
+            "OTX_BASE_URL": services["otx"],
+            "VT_BASE_URL": services["virustotal"],
+            "ABUSEIPDB_BASE_URL": services["abuseipdb"],
+            "VT_RATE_PER_MIN": "0",
+            "VT_DAILY_BUDGET": "0",
+            "ABUSEIPDB_DAILY_BUDGET": "0",
+            "ENABLE_AUTOTASK": "1",
+            "AT_BASE_URL": services["autotask"],
+            "AT_API_INTEGRATION_CODE": "bench",
+            "AT_USERNAME": "bench",
+            "AT_SECRET": "bench",
+            "AT_ACCOUNT_ID": "1",
+            "AT_QUEUE_ID": "1",
+            "ENABLE_EMAIL": "1",
+            "SMTP_HOST": smtp_host,
+            "SMTP_PORT": str(smtp_port),
+            "SMTP_STARTTLS": "0",
+            "EMAIL_FROM": "bench@example.com",
+            "EMAIL_TO": '["soc@example.com"]',
+            "ACTION_RETRY_BACKOFF": "0.05",
+            "WEBHOOK_SHARED_SECRET": "",
+            "WEBHOOK_HMAC_SECRET": "",
+        }
+    )
+
+
+def build_corpus(events: int, unique_ips: int, seed: int) -> List[bytes]:
+    """Cycle through the fixtures, rewriting each one's source IP from a pool."""
+    from soc_agent.adapters import normalize_event
+
+    fixtures: List[Tuple[str, str]] = []
+    for path in sorted(FIXTURES.glob("*.jsonl")):
+        for line in path.read_text().splitlines():
+            if line.strip():
+                fixtures.append((line, normalize_event(json.loads(line)).get("ip") or ""))
+    rng = random.Random(seed)
+    pool = [f"100.{64 + i // 65536 % 64}.{i // 256 % 256}.{i % 256}" for i in range(unique_ips)]
+    corpus = []
+    for i in range(events):
+        text, ip = fixtures[i % len(fixtures)]
+        if ip:
+            text = text.replace(ip, rng.choice(pool))
+        corpus.append(text.encode())
+    return corpus
+
+
+class StageTimer:
+    """Collect wall-clock durations (ms) for wrapped pipeline functions."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, ms: float) -> None:
+        with self._lock:
+            self.samples.setdefault(stage, []).append(ms)
+
+    def wrap(self, stage: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def timed_async(*args: Any, **kwargs: Any) -> Any:
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self.record(stage, (time.perf_counter() - start) * 1000)
+
+            return timed_async
+
+        @functools.wraps(fn)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(stage, (time.perf_counter() - start) * 1000)
+
+        return timed
+
+
+def instrument(timer: StageTimer) -> None:
+    from soc_agent import analyzer, webapp
+
+    webapp.normalize_event = timer.wrap("normalize", webapp.normalize_event)
+    webapp.enrich_and_score = timer.wrap("analyze", webapp.enrich_and_score)
+    webapp._run_actions = timer.wrap("actions", webapp._run_actions)
+    client = analyzer.intel_client
+    client.enrich_ips = timer.wrap("enrich", client.enrich_ips)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    return {
+        "count": len(ordered),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(ordered[-1], 3),
+    }
+
+
+async def drive(url: str, corpus: List[bytes], concurrency: int, timer: StageTimer):
+    import httpx
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for body in corpus:
+        queue.put_nowait(body)
+    statuses: Dict[int, int] = {}
+    action_ids: List[Tuple[str, str]] = []
+    headers = {"Content-Type": "application/json"}
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while not queue.empty():
+            body = queue.get_nowait()
+            start = time.perf_counter()
+            r = await client.post(url, content=body, headers=headers)
+            timer.record("request", (time.perf_counter() - start) * 1000)
+            statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+            if r.status_code < 300:
+                for kind, action in r.json().get("actions", {}).items():
+                    if action.get("id"):
+                        action_ids.append((kind, action["id"]))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return statuses, action_ids
+
+
+def collect_deliveries(action_ids: List[Tuple[str, str]], timer: StageTimer, timeout: float):
+    from soc_agent.dispatch import dispatcher
+
+    deadline = time.monotonic() + timeout
+    while dispatcher.pending() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    outcomes: Dict[str, int] = {}
+    for kind, action_id in action_ids:
+        record = dispatcher.status(action_id)
+        if record is None:
+            continue
+        outcomes[record["status"]] = outcomes.get(record["status"], 0) + 1
+        if record["status"] == "delivered":
+            stage = "ticket_delivery" if kind == "autotask_ticket" else "email_delivery"
+            timer.record(stage, (record["updated_at"] - record["created_at"]) * 1000)
+    return outcomes
+
+
+def serve(app: Any) -> Tuple[Any, threading.Thread, str]:
+    import uvicorn
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, thread, f"http://127.0.0.1:{port}/webhook"
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    problems = []
+    floor = baseline["throughput_eps"] * (1 - tolerance)
+    if report["throughput_eps"] < floor:
+        problems.append(
+            f"throughput {report['throughput_eps']:.1f}/s below {floor:.1f}/s "
+            f"(baseline {baseline['throughput_eps']:.1f}/s)"
+        )
+    for stage, base in baseline["stages"].items():
+        current = report["stages"].get(stage)
+        if not current or not current["count"]:
+            continue
+        limit = base["p95"] * (1 + tolerance) + P95_SLACK_MS
+        if current["p95"] > limit:
+            problems.append(
+                f"{stage} p95 {current['p95']:.2f} ms above {limit:.2f} ms "
+                f"(baseline {base['p95']:.2f} ms)"
+            )
+    return problems
+
+
+def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    services = Services(args)
+    configure_environment(services.addresses)
+    sys.path.insert(0, str(HERE.parent / "src"))
+    import logging
+
+    from soc_agent.webapp import app
+
+    logging.getLogger().setLevel(logging.WARNING)
+    timer = StageTimer()
+    instrument(timer)
+    corpus = build_corpus(args.events, args.unique_ips, args.seed)
+
+    server, thread, url = serve(app)
+    try:
+        start = time.perf_counter()
+        statuses, action_ids = asyncio.run(drive(url, corpus, args.concurrency, timer))
+        elapsed = time.perf_counter() - start
+        outcomes = collect_deliveries(action_ids, timer, timeout=30)
+    finally:
+        server.should_exit = True
+        thread.join(10)
+        service_stats = services.stop()
+
+    report = {
+        "events": len(corpus),
+        "concurrency": args.concurrency,
+        "unique_ips": args.unique_ips,
+        "fault": {
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "throughput_eps": round(len(corpus) / elapsed, 1),
+        "http_status": {str(k): v for k, v in sorted(statuses.items())},
+        "actions": outcomes,
+        "services": service_stats,
+        "stages": {stage: percentiles(v) for stage, v in sorted(timer.samples.items())},
+    }
+
+    print(f"events: {report['events']}  concurrency: {args.concurrency}  ", end="")
+    print(f"elapsed: {elapsed:.2f}s  throughput: {report['throughput_eps']:.1f} events/s")
+    print(f"http status: {report['http_status']}  actions: {outcomes}")
+    print(f"{'stage':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage, s in report["stages"].items():
+        print(
+            f"{stage:<16}{s['count']:>8}{s['p50']:>10.2f}{s['p95']:>10.2f}"
+            f"{s['p99']:>10.2f}{s['max']:>10.2f}"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.baseline and args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if args.baseline:
+        problems = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
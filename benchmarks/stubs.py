@@ -0,0 +1,235 @@
+"""Local stand-ins for the external services the webhook pipeline talks to.
+
+Each HTTP stub answers with a canned payload shaped like the real API, after
+an injected latency, and fails a configurable fraction of requests with
+HTTP 503. The SMTP sink speaks just enough SMTP for ``smtplib`` (no TLS, no
+auth) and counts delivered messages.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import random
+import socketserver
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+@dataclass
+class Fault:
+    """Latency and error injection for one stub."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    rng: random.Random = field(default_factory=lambda: random.Random(1234))
+
+    def apply(self) -> bool:
+        """Sleep for the injected latency; return ``True`` if the call should fail."""
+        delay = self.latency_ms + self.rng.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        return self.rng.random() < self.error_rate
+
+
+def _ip_score(ip: str) -> int:
+    # Deterministic per IP, so repeated runs see the same verdicts.
+    return sum(ip.encode()) % 101
+
+
+def otx_response(path: str, query: Dict[str, Any]) -> Dict[str, Any]:
+    ip = path.split("/")[-2]
+    return {"indicator": ip, "pulse_info": {"pulses": [{}] * (_ip_score(ip) // 10)}}
+
+
+def vt_response(path: str, query: Dict[str, Any]) -> Dict[str, Any]:
+    ip = path.rsplit("/", 1)[-1]
+    bad = _ip_score(ip) // 12
+    stats = {"malicious": bad, "suspicious": bad // 2, "harmless": 60, "undetected": 10}
+    return {"data": {"id": ip, "attributes": {"last_analysis_stats": stats}}}
+
+
+def abuseipdb_response(path: str, query: Dict[str, Any]) -> Dict[str, Any]:
+    ip = query.get("ipAddress", [""])[0]
+    return {"data": {"ipAddress": ip, "abuseConfidenceScore": _ip_score(ip)}}
+
+
+_ids = itertools.count(1000)
+
+
+def autotask_response(path: str, query: Dict[str, Any]) -> Dict[str, Any]:
+    return {"itemId": next(_ids)}
+
+
+class _Backlog(ThreadingHTTPServer):
+    # The stdlib default listen backlog of 5 drops connection bursts, which
+    # shows up as 1 s SYN retransmits rather than service latency.
+    request_queue_size = 1024
+
+
+class _TcpBacklog(socketserver.ThreadingTCPServer):
+    request_queue_size = 1024
+
+
+class StubServer:
+    """Threaded HTTP server answering every request through ``respond``."""
+
+    def __init__(
+        self,
+        name: str,
+        respond: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+        fault: Optional[Fault] = None,
+    ):
+        self.name = name
+        self.fault = fault or Fault()
+        self.requests = 0
+        self.errors = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; without this, Nagle
+            # plus delayed ACKs add ~40 ms to every keep-alive response.
+            disable_nagle_algorithm = True
+
+            def _handle(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                stub.requests += 1
+                if stub.fault.apply():
+                    stub.errors += 1
+                    self._send(503, {"error": "injected failure"})
+                    return
+                parts = urlsplit(self.path)
+                self._send(200, respond(parts.path, parse_qs(parts.query)))
+
+            def _send(self, status: int, payload: Dict[str, Any]) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = _handle
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self._server = _Backlog(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "errors": self.errors}
+
+
+class SmtpSink:
+    """Minimal SMTP server that accepts and discards messages."""
+
+    def __init__(self, fault: Optional[Fault] = None):
+        self.fault = fault or Fault()
+        self.messages = 0
+        self.connections = 0
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            disable_nagle_algorithm = True
+
+            def _reply(self, line: str) -> None:
+                self.wfile.write(f"{line}\r\n".encode())
+
+            def handle(self) -> None:
+                sink.connections += 1
+                self._reply("220 bench-sink ESMTP")
+                in_data = False
+                for raw in self.rfile:
+                    line = raw.decode("utf-8", "replace").rstrip("\r\n")
+                    if in_data:
+                        if line == ".":
+                            in_data = False
+                            if sink.fault.apply():
+                                self._reply("451 injected failure")
+                            else:
+                                sink.messages += 1
+                                self._reply("250 OK queued")
+                        continue
+                    verb = line[:4].upper()
+                    if verb == "EHLO":
+                        self.wfile.write(b"250-bench-sink\r\n250 8BITMIME\r\n")
+                    elif verb == "DATA":
+                        in_data = True
+                        self._reply("354 End data with <CR><LF>.<CR><LF>")
+                    elif verb == "QUIT":
+                        self._reply("221 Bye")
+                        return
+                    else:
+                        self._reply("250 OK")
+
+        self._server = _TcpBacklog(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        host, port = self._server.server_address[:2]
+        return host, port
+
+    def start(self) -> "SmtpSink":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"messages": self.messages, "connections": self.connections}
+
+
+def serve_all(conn: Any, latency_ms: float, jitter_ms: float, error_rate: float, seed: int) -> None:
+    """Run every stub in this (child) process, controlled over ``conn``.
+
+    Sends ``{name: address}`` once listening, then waits for ``"stop"`` and
+    replies with ``{name: stats}``. Keeping the stubs out of the benchmarked
+    process stops their threads from competing with the app for the GIL.
+    """
+
+    def fault() -> Fault:
+        return Fault(latency_ms, jitter_ms, error_rate, random.Random(seed))
+
+    http = {
+        "otx": StubServer("otx", otx_response, fault()).start(),
+        "virustotal": StubServer("virustotal", vt_response, fault()).start(),
+        "abuseipdb": StubServer("abuseipdb", abuseipdb_response, fault()).start(),
+        "autotask": StubServer("autotask", autotask_response, fault()).start(),
+    }
+    smtp = SmtpSink(fault()).start()
+    addresses: Dict[str, Any] = {name: stub.url for name, stub in http.items()}
+    addresses["smtp"] = smtp.address
+    conn.send(addresses)
+    conn.recv()
+    stats: Dict[str, Any] = {name: stub.stats() for name, stub in http.items()}
+    stats["smtp"] = smtp.stats()
+    for stub in (*http.values(), smtp):
+        stub.stop()
+    conn.send(stats)
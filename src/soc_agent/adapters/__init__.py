@@ -1,7 +1,33 @@
-"""Vendor specific payload normalization utilities."""
+"""Vendor specific payload normalization utilities.
 
-from .crowdstrike import normalize_crowdstrike_event
-from .wazuh import normalize_wazuh_event
+Each vendor is an :class:`Adapter` plugin. The built-in Wazuh and CrowdStrike
+adapters are imported on first use; other packages can add adapters through
+the ``soc_agent.adapters`` entry-point group, e.g. in their ``pyproject.toml``::
+
+    [project.entry-points."soc_agent.adapters"]
+    sentinelone = "my_package.s1:ADAPTER"
+"""
+
+from typing import Any, Callable, Dict, NamedTuple
+
+from ..plugins import Registry
+
+
+class Adapter(NamedTuple):
+    name: str
+    # Whether a raw payload comes from this vendor; checked in registry order.
+    detect: Callable[[Dict[str, Any]], bool]
+    # Convert the payload into an EventIn-compatible dict.
+    normalize: Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+ADAPTERS = Registry(
+    "soc_agent.adapters",
+    {
+        "wazuh": "soc_agent.adapters.wazuh:ADAPTER",
+        "crowdstrike": "soc_agent.adapters.crowdstrike:ADAPTER",
+    },
+)
 
 
 def normalize_event(event):
@@ -12,11 +38,29 @@ def normalize_event(event):
     the application to work with a consistent schema.
     """
 
-    if "rule" in event and "agent" in event:
-        return normalize_wazuh_event(event)
-    if "eventType" in event or "Name" in event:
-        return normalize_crowdstrike_event(event)
+    for adapter in ADAPTERS.all():
+        if adapter.detect(event):
+            return adapter.normalize(event)
     return event
 
 
-__all__ = ["normalize_wazuh_event", "normalize_crowdstrike_event", "normalize_event"]
+_REEXPORTS = {
+    "normalize_wazuh_event": "wazuh",
+    "normalize_crowdstrike_event": "crowdstrike",
+}
+
+
+def __getattr__(name: str) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    # Keep the vendor functions importable from here without loading them eagerly.
+    if name in _REEXPORTS:
+        return ADAPTERS.get(_REEXPORTS[name]).normalize
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+    "ADAPTERS",
+    "Adapter",
+    "normalize_wazuh_event",
+    "normalize_crowdstrike_event",
+    "normalize_event",
+]
@@ -1,9 +1,23 @@
 from typing import Any, Dict
 
+from . import Adapter
+
+
+def _is_stream_envelope(event: Dict[str, Any]) -> bool:
+    # CrowdStrike streaming API envelope: {"metadata": {...}, "event": {...}}
+    metadata, body = event.get("metadata"), event.get("event")
+    return isinstance(metadata, dict) and isinstance(body, dict) and "eventType" in metadata
+
+
+def is_crowdstrike_event(event: Dict[str, Any]) -> bool:
+    return _is_stream_envelope(event) or "eventType" in event or "Name" in event
+
 
 def normalize_crowdstrike_event(event: Dict[str, Any]) -> Dict[str, Any]:
     """Convert a CrowdStrike event into an EventIn‑compatible dict."""
 
+    if _is_stream_envelope(event):
+        event = {"eventType": event["metadata"]["eventType"], **event["event"]}
     etype = event.get("eventType") or event.get("Name") or ""
     etype_lower = etype.lower()
     if "auth" in etype_lower and "fail" in etype_lower:
@@ -21,3 +35,6 @@ def normalize_crowdstrike_event(event: Dict[str, Any]) -> Dict[str, Any]:
         "username": event.get("UserName"),
         "raw": event,
     }
+
+
+ADAPTER = Adapter("crowdstrike", is_crowdstrike_event, normalize_crowdstrike_event)
@@ -1,5 +1,11 @@
 from typing import Any, Dict
 
+from . import Adapter
+
+
+def is_wazuh_event(event: Dict[str, Any]) -> bool:
+    return "rule" in event and "agent" in event
+
 
 def normalize_wazuh_event(event: Dict[str, Any]) -> Dict[str, Any]:
     """Convert a Wazuh alert JSON into an EventIn‑compatible dict."""
@@ -22,3 +28,6 @@ def normalize_wazuh_event(event: Dict[str, Any]) -> Dict[str, Any]:
         "username": data.get("srcuser"),
         "raw": event,
     }
+
+
+ADAPTER = Adapter("wazuh", is_wazuh_event, normalize_wazuh_event)
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import SETTINGS
+from .lazy import Lazy
+
+
+class Overloaded(Exception):
+    """The pipeline is saturated; the caller should retry after ``retry_after`` seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("priority", "key", "future", "granted", "rejected")
+
+    def __init__(self, priority: int, seq: int, future: asyncio.Future):
+        self.priority = priority
+        self.key = (-priority, seq)
+        self.future = future
+        self.granted = False
+        self.rejected: Optional[str] = None
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return self.key < other.key
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """Bounded, priority-ordered admission in front of the analysis pipeline.
+
+    At most ``workers`` requests run the pipeline at once. Requests that find
+    every slot busy wait in a queue of ``queue_size``, highest priority first,
+    for up to ``max_wait`` seconds scaled by their priority; requests below
+    ``reserve_priority`` do not wait at all and may not use the last
+    ``reserve`` fraction of the slots, which are kept for likely HIGH events.
+    When the queue is full a newcomer evicts the lowest-priority waiter if it
+    outranks it. Turned-away requests get :class:`Overloaded` with a
+    Retry-After estimate from the recent service time.
+
+    Slots are handed over under a thread lock and waiters are woken on their
+    own loop, so one controller can serve every event loop in the process.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        queue_size: int,
+        max_wait: float,
+        reserve: float = 0.0,
+        reserve_priority: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.max_wait = max_wait
+        self.reserve_priority = reserve_priority
+        self.low_priority_slots = max(1, self.workers - math.ceil(self.workers * reserve))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._service_time = 0.1
+        self.admitted = 0
+        self.waited = 0
+        self.rejected: Dict[str, int] = {
+            "saturated": 0,
+            "queue_full": 0,
+            "evicted": 0,
+            "timeout": 0,
+        }
+
+    def _capacity(self, priority: int) -> int:
+        return self.workers if priority >= self.reserve_priority else self.low_priority_slots
+
+    def _max_wait(self, priority: int) -> float:
+        # Mirrors the intel rate limiter: likely-LOW events only take a free
+        # slot, everything else waits longer the more it is likely to matter.
+        if priority < self.reserve_priority:
+            return 0.0
+        return self.max_wait * min(100, max(1, priority)) / 100
+
+    def retry_after(self) -> int:
+        backlog = (len(self._waiters) + self._active) / self.workers
+        return min(60, max(1, math.ceil(self._service_time * max(1.0, backlog))))
+
+    def _reject(self, reason: str) -> Overloaded:
+        self.rejected[reason] += 1
+        return Overloaded(reason, self.retry_after())
+
+    def _dispatch(self) -> None:
+        # Called with ``_lock`` held: hand free slots to the best waiters.
+        while self._waiters and self._active < self._capacity(self._waiters[0].priority):
+            waiter = heapq.heappop(self._waiters)
+            waiter.granted = True
+            self._active += 1
+            self.admitted += 1
+            waiter.future.get_loop().call_soon_threadsafe(_wake, waiter.future)
+
+    async def acquire(self, priority: int, deadline: Optional[float] = None) -> None:
+        """Take a pipeline slot or raise :class:`Overloaded`.
+
+        Pass the seconds the slot was held to :meth:`release`; it feeds the
+        Retry-After estimate.
+
+        ``priority`` is a cheap pre-enrichment estimate, typically the base
+        score. Waiting also ends at ``deadline`` (a ``time.monotonic()``
+        value). Every successful call must be paired with :meth:`release`.
+        """
+        with self._lock:
+            best_waiting = self._waiters[0].priority if self._waiters else -1
+            if self._active < self._capacity(priority) and best_waiting < priority:
+                self._active += 1
+                self.admitted += 1
+                return
+            wait = self._max_wait(priority)
+            if deadline is not None:
+                wait = min(wait, deadline - self._clock())
+            if wait <= 0:
+                raise self._reject("saturated")
+            if len(self._waiters) >= self.queue_size:
+                lowest = max(self._waiters, default=None)
+                if lowest is None or lowest.priority >= priority:
+                    raise self._reject("queue_full")
+                self._waiters.remove(lowest)
+                heapq.heapify(self._waiters)
+                lowest.rejected = "evicted"
+                lowest.future.get_loop().call_soon_threadsafe(_wake, lowest.future)
+            waiter = _Waiter(priority, next(self._seq), asyncio.get_running_loop().create_future())
+            heapq.heappush(self._waiters, waiter)
+            self.waited += 1
+        try:
+            await asyncio.wait_for(waiter.future, wait)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            with self._lock:
+                if not waiter.granted and waiter.rejected is None:
+                    self._waiters.remove(waiter)
+                    heapq.heapify(self._waiters)
+            if waiter.granted:
+                self.release()
+            raise
+        with self._lock:
+            if waiter.granted:
+                return
+            if waiter.rejected is None:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                waiter.rejected = "timeout"
+            raise self._reject(waiter.rejected)
+
+    def release(self, service_time: Optional[float] = None) -> None:
+        with self._lock:
+            self._active -= 1
+            if service_time is not None:
+                self._service_time += 0.2 * (service_time - self._service_time)
+            self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "active": self._active,
+                "queued": len(self._waiters),
+                "queue_size": self.queue_size,
+                "admitted": self.admitted,
+                "waited": self.waited,
+                "rejected": dict(self.rejected),
+                "service_time": round(self._service_time, 4),
+            }
+
+
+def _build_admission() -> AdmissionController:
+    return AdmissionController(
+        workers=SETTINGS.admission_workers,
+        queue_size=SETTINGS.admission_queue_size,
+        max_wait=SETTINGS.admission_max_wait,
+        reserve=SETTINGS.admission_reserve,
+        reserve_priority=SETTINGS.score_medium,
+    )
+
+
+admission: AdmissionController = Lazy(_build_admission)
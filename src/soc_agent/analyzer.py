@@ -1,80 +1,183 @@
 from __future__ import annotations
 
+import ipaddress
 import re
-import socket
-from typing import Any, Dict, List
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple, Union
+from urllib.parse import urlsplit
 
 from .config import SETTINGS
-from .intel import intel_client
-
-RULE_WEIGHTS = {
-    "auth_failed": 15,
-    "multiple_auth_failed": 25,
-    "malware_detected": 40,
-    "ransomware": 60,
-    "port_scan": 15,
-    "bruteforce": 35,
-    "geo_anomaly": 20,
-    "privilege_escalation": 50,
-    "lateral_movement": 45,
-    "exfil": 55,
-}
-SEVERITY_WEIGHT = 6
+from .correlation import correlator
+from .intel import IntelResult, Verdict, intel_client
+from .metrics import STAGE_SECONDS
+from .models import Event, EventIn
+from .scoring import DEFAULT_RULES, RULES
+
+# Read-only views of the built-in weights, kept for code that imported them
+# before the rules moved to ``scoring``; a SCORING_RULES_PATH file does not
+# change them.
+RULE_WEIGHTS: Mapping[str, int] = MappingProxyType(dict(DEFAULT_RULES["event_types"]))
+SEVERITY_WEIGHT: int = DEFAULT_RULES["severity"]["weight"]
+
+# Common file extensions that the domain pattern would otherwise report as TLDs.
+_FILE_SUFFIXES = frozenset(
+    "bat bin cfg conf dat dll exe ini jar js json log msi ps1 py sh so sys tmp txt vbs xml".split()
+)
+_OCTET = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+
+# One pass over the message. Every indicator must start at a token boundary,
+# which the shared lookbehind checks before any alternative is tried, so the
+# scan only does real work at word starts. Alternatives are tried left to
+# right: URLs win over the domains/IPs they contain, and hashes are only
+# reported at exact MD5/SHA1/SHA256 lengths. An IPv4 may carry a ``key:`` or
+# ``key=`` prefix and a ``:port`` suffix; the key must contain a non-hex
+# character, so the last groups of an IPv6 address are never taken for one.
+IOC_PATTERN = re.compile(
+    r"(?<![\w.:-])(?:"
+    r"(?P<url>(?:https?|ftp)://[^\s\"'<>()\[\]{}|\\^`]+)"
+    r"|(?P<hash>[0-9a-fA-F]{32}(?:[0-9a-fA-F]{8}(?:[0-9a-fA-F]{24})?)?)(?![\w.])"
+    r"|(?:[\w-]*[g-zG-Z_][\w-]*[:=])?"
+    rf"(?P<ipv4>{_OCTET}(?:\.{_OCTET}){{3}})(?::\d{{1,5}})?(?![\w:]|\.\d)"
+    r"|(?P<ipv6>(?:[0-9a-fA-F]{0,4}:){2,7}(?:[0-9a-fA-F]{1,4}|(?:\d{1,3}\.){3}\d{1,3})?)"
+    r"(?![\w:.])"
+    r"|(?P<domain>(?:[a-zA-Z0-9-]+\.)+[a-zA-Z]{2,63})(?![\w-])"
+    r")"
+)
+_DOMAIN_LABEL = re.compile(r"[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?")
+_IP_FIELDS = ("ip", "src_ip", "dst_ip", "attacker_ip", "host_ip")
+
+# What intel lookups return; already-rendered dicts are accepted as well.
+Enrichment = Union[IntelResult, Dict[str, Any]]
 
 
 def is_ip(value: str) -> bool:
     try:
-        socket.inet_aton(value)
+        ipaddress.ip_address(value)
         return True
-    except OSError:
+    except ValueError:
         return False
 
 
-def extract_iocs(event: Dict[str, Any]) -> Dict[str, List[str]]:
-    ips: List[str] = []
-    domains: List[str] = []
-    for key in ("ip", "src_ip", "dst_ip", "attacker_ip", "host_ip"):
+def _host_of(url: str) -> Optional[str]:
+    try:
+        return urlsplit(url).hostname
+    except ValueError:
+        return None
+
+
+def extract_iocs(event: Event) -> Dict[str, List[str]]:
+    """Extract IPv4/IPv6 addresses, domains, URLs and file hashes.
+
+    IPs come from the well-known address fields and from the message; every
+    other indicator comes from the message. Hosts of extracted URLs are also
+    reported as IPs or domains. Results are validated, de-duplicated and
+    sorted.
+    """
+    ips = set()
+    domains = set()
+    urls = set()
+    hashes = set()
+    for key in _IP_FIELDS:
         v = event.get(key)
         if isinstance(v, str) and is_ip(v):
-            ips.append(v)
+            ips.add(v)
     msg = event.get("message", "") or ""
-    ips += re.findall(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", msg)
-    domains += re.findall(r"\b([a-zA-Z0-9-]+\.)+[a-zA-Z]{2,}\b", msg)
-    ips = sorted({ip for ip in ips if is_ip(ip)})
-    domains = sorted(set(domains))
-    return {"ips": ips, "domains": domains}
-
-
-def base_score(event: Dict[str, Any]) -> int:
-    ev = (event.get("event_type") or "").lower()
-    sev = int(event.get("severity") or 0)
-    score = min(100, sev * SEVERITY_WEIGHT)
-    score += RULE_WEIGHTS.get(ev, 0)
-    raw = event.get("raw") or {}
-    if isinstance(raw, dict):
-        fail_count = int(raw.get("fail_count") or 0)
-        if fail_count >= 5:
-            score += min(20, 3 * (fail_count // 5))
-        if raw.get("geo") in {"RU", "KP", "IR", "CN"}:
-            score += 10
-        if raw.get("new_admin_user"):
-            score += 25
-    return min(100, score)
-
-
-def enrich_and_score(event: Dict[str, Any]) -> Dict[str, Any]:
-    iocs = extract_iocs(event)
-    intel_scores: List[int] = []
-    intel_details: Dict[str, Any] = {"ips": [], "domains": []}
+    # Every indicator contains "." or ":" or is a 32+ character hash, so
+    # other whitespace-separated tokens are dropped before the regex runs.
+    candidates = " ".join([t for t in msg.split() if "." in t or ":" in t or len(t) >= 32])
+    for url, hsh, ipv4, ipv6, domain in IOC_PATTERN.findall(candidates):
+        if ipv4:
+            ips.add(ipv4)
+        elif hsh:
+            hashes.add(hsh.lower())
+        elif domain:
+            domain = domain.lower()
+            labels = domain.split(".")
+            if labels[-1] not in _FILE_SUFFIXES and all(
+                _DOMAIN_LABEL.fullmatch(label) for label in labels
+            ):
+                domains.add(domain)
+        elif url:
+            url = url.rstrip(".,;:!?")
+            urls.add(url)
+            host = _host_of(url)
+            if host:
+                if is_ip(host):
+                    ips.add(host)
+                elif "." in host:
+                    domains.add(host)
+        elif ipv6:
+            try:
+                addr = ipaddress.IPv6Address(ipv6)
+            except ValueError:
+                continue
+            ips.add(str(addr.ipv4_mapped or addr))
+    return {
+        "ips": sorted(ips),
+        "domains": sorted(domains),
+        "urls": sorted(urls),
+        "hashes": sorted(hashes),
+    }
 
-    for ip in iocs["ips"]:
-        enriched = intel_client.enrich_ip(ip)
-        intel_details["ips"].append(enriched)
-        intel_scores.append(enriched.get("score", 0))
 
-    bscore = base_score(event)
+def base_score(event: Event) -> int:
+    """Score ``event`` on its own fields with the configured scoring rules."""
+    return RULES.score(event)
+
+
+def final_score(bscore: int, isig: int) -> int:
+    """Blend the base score with the highest intel score of the event's IPs."""
+    return min(100, int(round(0.6 * bscore + 0.4 * isig)))
+
+
+@lru_cache(maxsize=1024)
+def _thresholds(bscore: int, *category_scores: int) -> Tuple[int, ...]:
+    cuts = []
+    for threshold in category_scores:
+        isig = next((i for i in range(101) if final_score(bscore, i) >= threshold), None)
+        if isig:  # None: out of reach, 0: reached without intel
+            cuts.append(isig)
+    return tuple(cuts)
+
+
+def intel_thresholds(bscore: int) -> Tuple[int, ...]:
+    """Intel scores at which the category of an event with base score ``bscore`` changes.
+
+    An empty tuple means intel cannot change the category at all.
+    """
+    return _thresholds(bscore, SETTINGS.score_medium, SETTINGS.score_high)
+
+
+def _verdict(bscore: int, known: int = 0) -> Optional[Verdict]:
+    # ``known``: intel score already in hand, e.g. reused from correlation.
+    if SETTINGS.intel_mode == "full":
+        return None
+    return Verdict(intel_thresholds(bscore), known)
+
+
+def _render_intel(enriched: Enrichment) -> Dict[str, Any]:
+    if isinstance(enriched, IntelResult):
+        return enriched.to_dict(SETTINGS.intel_verbosity)
+    return enriched
+
+
+def score_event(
+    event: Event,
+    iocs: Dict[str, List[str]],
+    enriched_ips: List[Enrichment],
+    bscore: Optional[int] = None,
+) -> Dict[str, Any]:
+    rendered = [_render_intel(enriched) for enriched in enriched_ips]
+    intel_details: Dict[str, Any] = {"ips": rendered, "domains": []}
+    if any(enriched.get("partial") for enriched in rendered):
+        intel_details["partial"] = True
+    intel_scores: List[int] = [enriched.get("score", 0) for enriched in rendered]
+
+    if bscore is None:
+        bscore = base_score(event)
     isig = max(intel_scores) if intel_scores else 0
-    final = min(100, int(round(0.6 * bscore + 0.4 * isig)))
+    final = final_score(bscore, isig)
 
     if final >= SETTINGS.score_high:
         category = "HIGH"
@@ -93,3 +196,138 @@ def enrich_and_score(event: Dict[str, Any]) -> Dict[str, Any]:
         "category": category,
         "recommended_action": action,
     }
+
+
+def correlate(event: Event) -> Tuple[Event, Optional[Dict[str, Any]]]:
+    """Count ``event`` in the correlation windows.
+
+    Returns the event to score, with ``event_type`` replaced by the aggregate
+    type once a threshold is crossed, and the correlation details (or
+    ``None`` for event types that are not correlated).
+    """
+    correlation = correlator.observe(event)
+    if correlation is not None and correlation["event_type"] != correlation["rule"]:
+        if isinstance(event, EventIn):
+            event = event.model_copy(update={"event_type": correlation["event_type"]})
+        else:
+            event = {**event, "event_type": correlation["event_type"]}
+    return event, correlation
+
+
+def _reused_intel(
+    iocs: Dict[str, List[str]], correlation: Optional[Dict[str, Any]]
+) -> Dict[str, Enrichment]:
+    if correlation is None:
+        return {}
+    reused = {}
+    for ip in iocs["ips"]:
+        intel = correlator.cached_intel(correlation["rule"], ip)
+        if intel is not None:
+            reused[ip] = intel
+    return reused
+
+
+def _remember_intel(
+    iocs: Dict[str, List[str]],
+    correlation: Optional[Dict[str, Any]],
+    enriched_ips: List[Enrichment],
+) -> None:
+    if correlation is not None:
+        for ip, intel in zip(iocs["ips"], enriched_ips):
+            # Failed lookups are retried by the next event instead of reused,
+            # and lazy ones are topped up from the intel cache when needed.
+            if not intel.get("errors") and not intel.get("skipped"):
+                correlator.remember_intel(correlation["rule"], ip, intel)
+
+
+def _enrich_deadline(deadline: Optional[float]) -> Optional[float]:
+    # Leave time to score, run actions and respond after enrichment stops.
+    if deadline is None:
+        return None
+    return deadline - SETTINGS.webhook_deadline_reserve
+
+
+def _finish(result: Dict[str, Any], correlation: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if correlation is not None:
+        result["correlation"] = correlation
+    return result
+
+
+async def enrich_and_score(event: Event, deadline: Optional[float] = None) -> Dict[str, Any]:
+    """Correlate, enrich and score one event.
+
+    ``deadline`` is a ``time.monotonic()`` value for the whole request;
+    providers still pending close to it are dropped and the intel is marked
+    ``partial``. With ``intel_mode=lazy`` providers are only asked while
+    their answers could still change the category.
+    """
+    event, correlation = correlate(event)
+    iocs = extract_iocs(event)
+    bscore = base_score(event)
+    # Later events in a correlation window reuse the first event's enrichment.
+    reused = _reused_intel(iocs, correlation)
+    missing = [ip for ip in iocs["ips"] if ip not in reused]
+    # The base score doubles as the lookup priority for rate-limited feeds.
+    looked_up: Dict[str, Enrichment] = {}
+    if missing:
+        verdict = _verdict(bscore, max((r.get("score", 0) for r in reused.values()), default=0))
+        with STAGE_SECONDS.time(endpoint="webhook", stage="enrich"):
+            looked_up = dict(
+                zip(
+                    missing,
+                    await intel_client.enrich_ips(
+                        missing,
+                        priority=bscore,
+                        deadline=_enrich_deadline(deadline),
+                        verdict=verdict,
+                    ),
+                )
+            )
+    enriched_ips = [reused.get(ip) or looked_up[ip] for ip in iocs["ips"]]
+    _remember_intel(iocs, correlation, enriched_ips)
+    return _finish(score_event(event, iocs, enriched_ips, bscore), correlation)
+
+
+async def enrich_and_score_batch(
+    events: List[Event], deadline: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """Score ``events`` in order, looking up each distinct IP only once."""
+    correlated = [correlate(event) for event in events]
+    events = [event for event, _ in correlated]
+    all_iocs = [extract_iocs(event) for event in events]
+    bscores = [base_score(event) for event in events]
+    all_reused = [_reused_intel(iocs, corr) for iocs, (_, corr) in zip(all_iocs, correlated)]
+    priorities: Dict[str, int] = {}
+    # An IP shared by several events is looked up until none of their categories can change.
+    thresholds: Dict[str, Set[int]] = {}
+    for iocs, bscore, reused in zip(all_iocs, bscores, all_reused):
+        for ip in iocs["ips"]:
+            if ip not in reused:
+                priorities[ip] = max(bscore, priorities.get(ip, 0))
+                thresholds.setdefault(ip, set()).update(intel_thresholds(bscore))
+    unique_ips = list(priorities)
+    verdicts: Optional[Dict[str, Verdict]] = None
+    if SETTINGS.intel_mode != "full":
+        verdicts = {ip: Verdict(sorted(cuts)) for ip, cuts in thresholds.items()}
+    enriched: Dict[str, Enrichment] = {}
+    if unique_ips:
+        with STAGE_SECONDS.time(endpoint="batch", stage="enrich"):
+            enriched = dict(
+                zip(
+                    unique_ips,
+                    await intel_client.enrich_ips(
+                        unique_ips,
+                        priorities,
+                        deadline=_enrich_deadline(deadline),
+                        verdict=verdicts,
+                    ),
+                )
+            )
+    results = []
+    for event, iocs, bscore, reused, (_, correlation) in zip(
+        events, all_iocs, bscores, all_reused, correlated
+    ):
+        enriched_ips = [reused.get(ip) or enriched[ip] for ip in iocs["ips"]]
+        _remember_intel(iocs, correlation, enriched_ips)
+        results.append(_finish(score_event(event, iocs, enriched_ips, bscore), correlation))
+    return results
@@ -1,19 +1,31 @@
 from __future__ import annotations
 
-from typing import Any, Optional, Tuple
-
-import requests
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 from .config import SETTINGS
+from .dispatch import QueueFull, dispatcher
+from .lazy import Lazy
 
+if TYPE_CHECKING:
+    import requests
 
-def create_autotask_ticket(
-    title: str,
-    description: str,
-    priority: Optional[int] = None,
-) -> Tuple[bool, str, Optional[Any]]:
+log = logging.getLogger(__name__)
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+
+
+def autotask_unavailable() -> Optional[str]:
+    """Return why tickets cannot be created, or ``None`` if they can."""
     if not SETTINGS.enable_autotask:
-        return False, "Autotask disabled", None
+        return "Autotask disabled"
     for needed in (
         SETTINGS.at_base_url,
         SETTINGS.at_api_integration_code,
@@ -23,14 +35,182 @@ def create_autotask_ticket(
         SETTINGS.at_queue_id,
     ):
         if not needed:
-            return False, "Autotask not fully configured", None
+            return "Autotask not fully configured"
+    return None
+
+
+def get_session() -> requests.Session:
+    """Return this process's pooled Autotask session, creating it on first use."""
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=max(1, SETTINGS.action_workers))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(
+                {
+                    "ApiIntegrationCode": SETTINGS.at_api_integration_code or "",
+                    "UserName": SETTINGS.at_username or "",
+                    "Secret": SETTINGS.at_secret or "",
+                }
+            )
+            _session, _session_pid = session, os.getpid()
+        return _session
+
+
+def ticket_correlation_key(
+    event_type: Optional[str], source: Optional[str], indicator: Optional[str]
+) -> str:
+    """Key under which repeat alerts are folded into one open ticket."""
+    return "|".join((event_type or "event", source or "unknown", indicator or "-"))
+
 
-    url = f"{SETTINGS.at_base_url.rstrip('/')}/tickets"
-    headers = {
-        "ApiIntegrationCode": SETTINGS.at_api_integration_code,
-        "UserName": SETTINGS.at_username,
-        "Secret": SETTINGS.at_secret,
+def _post(path: str, payload: Dict[str, Any]) -> Tuple[bool, str, Optional[Any]]:
+    url = f"{SETTINGS.at_base_url.rstrip('/')}/{path}"
+    try:
+        r = get_session().post(url, json=payload, timeout=SETTINGS.http_timeout)
+        if r.status_code >= 400:
+            return False, f"HTTP {r.status_code}: {r.text}", None
+        return True, "created", r.json()
+    except Exception as e:
+        return False, str(e), None
+
+
+def add_ticket_note(
+    ticket_id: Any, title: str, description: str
+) -> Tuple[bool, str, Optional[Any]]:
+    payload = {
+        "ticketID": ticket_id,
+        "title": title,
+        "description": description,
+        "noteType": 1,
+        "publish": 1,
     }
+    return _post(f"tickets/{ticket_id}/notes", payload)
+
+
+class TicketCoalescer:
+    """Fold repeat alerts into the ticket already open for their correlation key.
+
+    A key stays attached to its ticket for ``window`` seconds after the ticket
+    is opened. Repeat alerts are buffered per ticket and posted as a single
+    note every ``note_interval`` seconds, so Autotask calls grow with the
+    number of incidents rather than the number of alerts. Notes are posted
+    through the action dispatcher, so they are retried and dead-lettered like
+    any other action; each note's action id is reserved as soon as its first
+    alert is buffered.
+    """
+
+    def __init__(self, window: float, note_interval: float, max_keys: int = 10000):
+        self.window = window
+        self.note_interval = note_interval
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._tickets: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._creating: Dict[str, threading.Event] = {}
+        # Per ticket: the note's action id and the alerts buffered for it.
+        self._pending: Dict[Any, Tuple[str, List[Tuple[str, str]]]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def _open_ticket(self, key: str) -> Optional[Any]:
+        entry = self._tickets.get(key)
+        if entry is None:
+            return None
+        ticket_id, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._tickets[key]
+            return None
+        return ticket_id
+
+    def submit(
+        self, key: str, title: str, description: str, priority: Optional[int]
+    ) -> Tuple[bool, str, Optional[Any]]:
+        """Open a ticket for ``key``, or fold the alert into the open one.
+
+        A folded alert's response names the note action it waits for under
+        ``awaiting``, so the dispatcher reports it delivered only once the
+        note has been posted.
+        """
+        while True:
+            with self._lock:
+                ticket_id = self._open_ticket(key)
+                if ticket_id is not None:
+                    note_id = self._buffer_note(ticket_id, title, description)
+                    return True, "coalesced", {"itemId": ticket_id, "awaiting": note_id}
+                creating = self._creating.get(key)
+                if creating is None:
+                    creating = self._creating[key] = threading.Event()
+                    break
+            # Another worker is opening the ticket for this key; wait for it.
+            creating.wait(SETTINGS.http_timeout)
+
+        try:
+            ok, msg, resp = _create_ticket(title, description, priority)
+            ticket_id = resp.get("itemId") if ok and isinstance(resp, dict) else None
+            if ticket_id is not None:
+                with self._lock:
+                    self._tickets[key] = (ticket_id, time.monotonic() + self.window)
+                    while len(self._tickets) > self.max_keys:
+                        self._tickets.popitem(last=False)
+            return ok, msg, resp
+        finally:
+            with self._lock:
+                self._creating.pop(key, None)
+            creating.set()
+
+    def _buffer_note(self, ticket_id: Any, title: str, description: str) -> str:
+        # Called with ``_lock`` held.
+        pending = self._pending.get(ticket_id)
+        if pending is None:
+            pending = self._pending[ticket_id] = (uuid.uuid4().hex, [])
+            dispatcher.reserve("autotask_note", pending[0])
+            timer = threading.Timer(self.note_interval, self.flush, args=(ticket_id,))
+            timer.daemon = True
+            timer.start()
+        pending[1].append((title, description))
+        return pending[0]
+
+    def flush(self, ticket_id: Any) -> bool:
+        """Queue the buffered repeat alerts for ``ticket_id`` as one note."""
+        with self._lock:
+            note_id, alerts = self._pending.pop(ticket_id, (None, []))
+        if not alerts:
+            return False
+        try:
+            dispatcher.submit(
+                "autotask_note",
+                add_ticket_note,
+                action_id=note_id,
+                ticket_id=ticket_id,
+                title=f"{len(alerts)} repeat alert(s)",
+                description="\n\n".join(f"{t}\n{d}" for t, d in alerts),
+            )
+        except QueueFull:
+            pass  # already dead-lettered by the dispatcher
+        return True
+
+    def flush_all(self) -> int:
+        """Queue every buffered note now and return how many there were."""
+        with self._lock:
+            ticket_ids = list(self._pending)
+        return sum(self.flush(ticket_id) for ticket_id in ticket_ids)
+
+
+ticket_coalescer: TicketCoalescer = Lazy(
+    lambda: TicketCoalescer(SETTINGS.at_correlation_window, SETTINGS.at_note_interval)
+)
+
+
+def _create_ticket(
+    title: str, description: str, priority: Optional[int]
+) -> Tuple[bool, str, Optional[Any]]:
     payload = {
         "title": title,
         "description": description,
@@ -39,15 +219,18 @@ def create_autotask_ticket(
         "accountID": int(SETTINGS.at_account_id),
         "priority": int(priority or SETTINGS.at_ticket_priority),
     }
-    try:
-        r = requests.post(
-            url,
-            headers=headers,
-            json=payload,
-            timeout=SETTINGS.http_timeout,
-        )
-        if r.status_code >= 400:
-            return False, f"HTTP {r.status_code}: {r.text}", None
-        return True, "created", r.json()
-    except Exception as e:
-        return False, str(e), None
+    return _post("tickets", payload)
+
+
+def create_autotask_ticket(
+    title: str,
+    description: str,
+    priority: Optional[int] = None,
+    correlation_key: Optional[str] = None,
+) -> Tuple[bool, str, Optional[Any]]:
+    reason = autotask_unavailable()
+    if reason:
+        return False, reason, None
+    if correlation_key and ticket_coalescer.enabled:
+        return ticket_coalescer.submit(correlation_key, title, description, priority)
+    return _create_ticket(title, description, priority)
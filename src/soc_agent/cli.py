@@ -0,0 +1,18 @@
+"""``soc-agent`` command line entry point."""
+
+from __future__ import annotations
+
+import argparse
+from typing import List, Optional
+
+from . import __version__, replay, tail
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="soc-agent")
+    parser.add_argument("--version", action="version", version=__version__)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    replay.add_parser(subparsers)
+    tail.add_parser(subparsers)
+    args = parser.parse_args(argv)
+    return args.func(args)
@@ -5,6 +5,8 @@ from typing import List, Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from .lazy import LazySettings
+
 
 class Settings(BaseSettings):
     # Server
@@ -20,8 +22,12 @@ class Settings(BaseSettings):
     smtp_port: int = Field(default=587, env="SMTP_PORT")
     smtp_username: Optional[str] = Field(default=None, env="SMTP_USERNAME")
     smtp_password: Optional[str] = Field(default=None, env="SMTP_PASSWORD")
+    smtp_starttls: bool = Field(default=True, env="SMTP_STARTTLS")
     email_from: Optional[str] = Field(default=None, env="EMAIL_FROM")
     email_to: List[str] = Field(default_factory=list, env="EMAIL_TO")
+    smtp_idle_timeout: int = Field(default=60, env="SMTP_IDLE_TIMEOUT")
+    email_digest_window: int = Field(default=0, env="EMAIL_DIGEST_WINDOW")
+    email_digest_max: int = Field(default=200, env="EMAIL_DIGEST_MAX")
 
     # Autotask
     at_base_url: Optional[str] = Field(default=None, env="AT_BASE_URL")
@@ -31,26 +37,97 @@ class Settings(BaseSettings):
     at_account_id: Optional[int] = Field(default=None, env="AT_ACCOUNT_ID")
     at_queue_id: Optional[int] = Field(default=None, env="AT_QUEUE_ID")
     at_ticket_priority: int = Field(default=3, env="AT_TICKET_PRIORITY")
+    at_correlation_window: int = Field(default=3600, env="AT_CORRELATION_WINDOW")
+    at_note_interval: int = Field(default=60, env="AT_NOTE_INTERVAL")
+
+    # Action dispatch
+    action_workers: int = Field(default=4, env="ACTION_WORKERS")
+    action_queue_size: int = Field(default=1000, env="ACTION_QUEUE_SIZE")
+    action_max_attempts: int = Field(default=5, env="ACTION_MAX_ATTEMPTS")
+    action_retry_backoff: float = Field(default=2.0, env="ACTION_RETRY_BACKOFF")
+    action_dead_letter_path: Optional[str] = Field(default=None, env="ACTION_DEAD_LETTER_PATH")
 
     # Threat feeds
     otx_api_key: Optional[str] = Field(default=None, env="OTX_API_KEY")
     vt_api_key: Optional[str] = Field(default=None, env="VT_API_KEY")
     abuseipdb_api_key: Optional[str] = Field(default=None, env="ABUSEIPDB_API_KEY")
+    otx_base_url: str = Field(default="https://otx.alienvault.com", env="OTX_BASE_URL")
+    vt_base_url: str = Field(default="https://www.virustotal.com", env="VT_BASE_URL")
+    abuseipdb_base_url: str = Field(default="https://api.abuseipdb.com", env="ABUSEIPDB_BASE_URL")
+
+    # Provider quotas (rate_per_min / daily_budget of 0 = unlimited)
+    otx_rate_per_min: float = Field(default=0, env="OTX_RATE_PER_MIN")
+    otx_daily_budget: int = Field(default=0, env="OTX_DAILY_BUDGET")
+    vt_rate_per_min: float = Field(default=4, env="VT_RATE_PER_MIN")
+    vt_daily_budget: int = Field(default=500, env="VT_DAILY_BUDGET")
+    abuseipdb_rate_per_min: float = Field(default=0, env="ABUSEIPDB_RATE_PER_MIN")
+    abuseipdb_daily_budget: int = Field(default=1000, env="ABUSEIPDB_DAILY_BUDGET")
+    intel_rate_limit_max_wait: float = Field(default=20.0, env="INTEL_RATE_LIMIT_MAX_WAIT")
+    intel_budget_reserve: float = Field(default=0.2, env="INTEL_BUDGET_RESERVE")
+    intel_breaker_failures: int = Field(default=5, env="INTEL_BREAKER_FAILURES")
+    intel_breaker_reset: float = Field(default=30.0, env="INTEL_BREAKER_RESET")
+
+    # Offline blocklists (local feed files checked before the remote providers)
+    blocklist_feeds: List[str] = Field(default_factory=list, env="BLOCKLIST_FEEDS")
+    blocklist_index_path: Optional[str] = Field(default=None, env="BLOCKLIST_INDEX_PATH")
+    blocklist_reload_interval: int = Field(default=60, env="BLOCKLIST_RELOAD_INTERVAL")
+    blocklist_score: int = Field(default=80, env="BLOCKLIST_SCORE")
+    blocklist_skip_remote: bool = Field(default=True, env="BLOCKLIST_SKIP_REMOTE")
 
     # Scoring
     score_high: int = Field(default=70, env="SCORE_HIGH")
     score_medium: int = Field(default=40, env="SCORE_MEDIUM")
+    scoring_rules_path: Optional[str] = Field(default=None, env="SCORING_RULES_PATH")
+
+    # Correlation (sliding windows per IP/user/host; window 0 disables)
+    correlation_window: int = Field(default=300, env="CORRELATION_WINDOW")
+    correlation_max_keys: int = Field(default=10000, env="CORRELATION_MAX_KEYS")
+    correlation_multiple_threshold: int = Field(default=5, env="CORRELATION_MULTIPLE_THRESHOLD")
+    correlation_bruteforce_threshold: int = Field(
+        default=20, env="CORRELATION_BRUTEFORCE_THRESHOLD"
+    )
 
     # HTTP / Cache
     http_timeout: float = Field(default=8.0, env="HTTP_TIMEOUT")
+    webhook_deadline: float = Field(default=5.0, env="WEBHOOK_DEADLINE")
+    webhook_deadline_reserve: float = Field(default=0.25, env="WEBHOOK_DEADLINE_RESERVE")
+    intel_verbosity: str = Field(default="summary", env="INTEL_VERBOSITY")
+    intel_mode: str = Field(default="lazy", env="INTEL_MODE")
+    intel_hedge_factor: float = Field(default=2.0, env="INTEL_HEDGE_FACTOR")
+    intel_hedge_default_latency: float = Field(default=0.25, env="INTEL_HEDGE_DEFAULT_LATENCY")
     ioc_cache_ttl: int = Field(default=1800, env="IOC_CACHE_TTL")
+    ioc_negative_cache_ttl: int = Field(default=60, env="IOC_NEGATIVE_CACHE_TTL")
+    ioc_cache_max_entries: int = Field(default=10000, env="IOC_CACHE_MAX_ENTRIES")
+    ioc_cache_path: Optional[str] = Field(default=None, env="IOC_CACHE_PATH")
+    ioc_cache_compact_interval: int = Field(default=300, env="IOC_CACHE_COMPACT_INTERVAL")
+    intel_max_concurrency: int = Field(default=10, env="INTEL_MAX_CONCURRENCY")
+    intel_max_connections: int = Field(default=100, env="INTEL_MAX_CONNECTIONS")
+    intel_http2: bool = Field(default=False, env="INTEL_HTTP2")
+    intel_batch_window_ms: float = Field(default=5.0, env="INTEL_BATCH_WINDOW_MS")
+    intel_batch_max: int = Field(default=25, env="INTEL_BATCH_MAX")
 
     # Webhook auth
     webhook_shared_secret: Optional[str] = Field(default=None, env="WEBHOOK_SHARED_SECRET")
     webhook_hmac_secret: Optional[str] = Field(default=None, env="WEBHOOK_HMAC_SECRET")
     webhook_hmac_header: str = Field(default="X-Signature", env="WEBHOOK_HMAC_HEADER")
     webhook_hmac_prefix: str = Field(default="sha256=", env="WEBHOOK_HMAC_PREFIX")
+    batch_max_events: int = Field(default=1000, env="BATCH_MAX_EVENTS")
+
+    # Admission control (workers 0 = unlimited)
+    admission_workers: int = Field(default=64, env="ADMISSION_WORKERS")
+    admission_queue_size: int = Field(default=256, env="ADMISSION_QUEUE_SIZE")
+    admission_max_wait: float = Field(default=2.0, env="ADMISSION_MAX_WAIT")
+    admission_reserve: float = Field(default=0.25, env="ADMISSION_RESERVE")
+
+    # Analysis history (SQLite; empty path = not stored)
+    analysis_store_path: Optional[str] = Field(default=None, env="ANALYSIS_STORE_PATH")
+    analysis_store_batch: int = Field(default=500, env="ANALYSIS_STORE_BATCH")
+    analysis_store_flush_interval: float = Field(default=0.5, env="ANALYSIS_STORE_FLUSH_INTERVAL")
+    analysis_retention_days: float = Field(default=30, env="ANALYSIS_RETENTION_DAYS")
+    analysis_compact_interval: int = Field(default=3600, env="ANALYSIS_COMPACT_INTERVAL")
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
 
-SETTINGS = Settings()
+
+# Read from the environment (and .env) on first use, not at import.
+SETTINGS: Settings = LazySettings(Settings)
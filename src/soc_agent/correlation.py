@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from .config import SETTINGS
+from .lazy import Lazy
+from .models import Event
+
+# Event fields whose values identify a correlation key. Events sharing any
+# of these values are counted together.
+_KEY_FIELDS: Sequence[Tuple[str, Sequence[str]]] = (
+    ("ip", ("ip", "src_ip", "attacker_ip")),
+    ("user", ("username",)),
+    ("host", ("host", "hostname")),
+)
+
+
+class _Window:
+    """Arrival times of the most recent events for one key.
+
+    The ring holds at most as many timestamps as the highest threshold can
+    need, so a key costs the same memory however busy it is.
+    """
+
+    __slots__ = ("times", "intel", "intel_at")
+
+    def __init__(self, size: int):
+        self.times: Deque[float] = deque(maxlen=size)
+        self.intel: Any = None
+        self.intel_at = 0.0
+
+
+class CorrelationEngine:
+    """Sliding-window counters that turn repeated events into aggregate ones.
+
+    ``rules`` maps an event type to ``(aggregate_type, threshold)`` pairs,
+    highest threshold first. When an event is seen ``threshold`` times within
+    ``window`` seconds for the same IP, user or host, it is scored as the
+    aggregate type instead. At most ``max_keys`` keys are tracked; the least
+    recently seen key is dropped first. IP keys also keep the enrichment of
+    the first event so later events in the window are not looked up again,
+    for at most ``intel_ttl`` seconds, like the IOC cache it came from.
+    """
+
+    def __init__(
+        self,
+        window: float,
+        rules: Dict[str, Sequence[Tuple[str, int]]],
+        max_keys: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+        intel_ttl: float = 1800,
+    ):
+        self.window = window
+        self.rules = {ev: sorted(steps, key=lambda s: -s[1]) for ev, steps in rules.items()}
+        self.max_keys = max_keys
+        self.intel_ttl = intel_ttl
+        self._clock = clock
+        self._size = max([t for steps in rules.values() for _, t in steps], default=1)
+        self._keys: "OrderedDict[str, _Window]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.escalations = 0
+        self.intel_reused = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and bool(self.rules)
+
+    @staticmethod
+    def keys_for(event: Event) -> List[str]:
+        keys = []
+        for kind, fields in _KEY_FIELDS:
+            for field in fields:
+                value = event.get(field)
+                if isinstance(value, str) and value:
+                    keys.append(f"{kind}:{value.lower() if kind != 'ip' else value}")
+                    break
+        return keys
+
+    def _touch(self, key: str, now: float) -> _Window:
+        # Called with ``_lock`` held.
+        state = self._keys.get(key)
+        if state is None:
+            state = self._keys[key] = _Window(self._size)
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+        else:
+            self._keys.move_to_end(key)
+        times = state.times
+        while times and times[0] <= now - self.window:
+            times.popleft()
+        if not times:
+            state.intel = None
+        return state
+
+    def observe(self, event: Event) -> Optional[Dict[str, Any]]:
+        """Count ``event`` and return its correlation, or ``None`` if not tracked.
+
+        The result holds the observed ``rule`` type, the (possibly escalated)
+        ``event_type``, the highest per-key ``count`` in the window and the
+        ``key`` that produced it.
+        """
+        event_type = (event.get("event_type") or "").lower()
+        steps = self.rules.get(event_type)
+        if not self.enabled or not steps:
+            return None
+        keys = self.keys_for(event)
+        if not keys:
+            return None
+        now = self._clock()
+        best_key, count = keys[0], 0
+        with self._lock:
+            for key in keys:
+                state = self._touch(f"{event_type}|{key}", now)
+                state.times.append(now)
+                if len(state.times) > count:
+                    best_key, count = key, len(state.times)
+        correlated = event_type
+        for aggregate, threshold in steps:
+            if count >= threshold:
+                correlated = aggregate
+                self.escalations += 1
+                break
+        return {
+            "rule": event_type,
+            "event_type": correlated,
+            "count": count,
+            "key": best_key,
+            "window": self.window,
+        }
+
+    def _intel_state(self, event_type: str, ip: str) -> Optional[_Window]:
+        now = self._clock()
+        state = self._keys.get(f"{event_type}|ip:{ip}")
+        if state is None or not state.times or state.times[-1] <= now - self.window:
+            return None
+        if state.intel is not None and state.intel_at <= now - self.intel_ttl:
+            # A steady stream keeps the window open; the intel still goes stale.
+            state.intel = None
+        return state
+
+    def cached_intel(self, event_type: str, ip: str) -> Any:
+        """Enrichment stored for ``ip`` by an earlier event in the window."""
+        with self._lock:
+            state = self._intel_state(event_type.lower(), ip)
+            intel = state.intel if state is not None else None
+        if intel is not None:
+            self.intel_reused += 1
+        return intel
+
+    def remember_intel(self, event_type: str, ip: str, intel: Any) -> None:
+        with self._lock:
+            state = self._intel_state(event_type.lower(), ip)
+            if state is not None and state.intel is None:
+                state.intel = intel
+                state.intel_at = self._clock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "keys": len(self._keys),
+            "max_keys": self.max_keys,
+            "escalations": self.escalations,
+            "intel_reused": self.intel_reused,
+        }
+
+
+def _build_correlator() -> CorrelationEngine:
+    return CorrelationEngine(
+        window=SETTINGS.correlation_window,
+        rules={
+            "auth_failed": (
+                ("bruteforce", SETTINGS.correlation_bruteforce_threshold),
+                ("multiple_auth_failed", SETTINGS.correlation_multiple_threshold),
+            )
+        },
+        max_keys=SETTINGS.correlation_max_keys,
+        intel_ttl=SETTINGS.ioc_cache_ttl,
+    )
+
+
+correlator: CorrelationEngine = Lazy(_build_correlator)
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import SETTINGS
+from .lazy import Lazy
+from .metrics import ACTION_OUTCOMES, ACTION_SECONDS
+
+log = logging.getLogger(__name__)
+
+# An action handler returns ``(ok, message)`` or ``(ok, message, response)``.
+Handler = Callable[..., Tuple[Any, ...]]
+
+# Statuses after which an action's record no longer changes.
+_SETTLED = ("delivered", "dead_letter")
+
+
+class QueueFull(Exception):
+    """Raised when the dispatch queue cannot accept another action."""
+
+
+class ActionDispatcher:
+    """Bounded background queue that delivers tickets and emails.
+
+    Actions are run by a pool of worker threads, because the Autotask and
+    SMTP clients are blocking. Failed deliveries are retried with exponential
+    backoff; once ``max_attempts`` is exhausted the action is appended to the
+    dead-letter file. The status of recent actions is kept in memory so it can
+    be reported by the API. A handler whose response names another action
+    under ``awaiting`` (e.g. an alert folded into a ticket note) stays
+    ``queued`` until that action is settled, and then takes on its status.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int,
+        max_attempts: int,
+        backoff: float,
+        dead_letter_path: Optional[str] = None,
+        max_tracked: int = 10000,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.dead_letter_path = dead_letter_path
+        self.max_tracked = max_tracked
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._jobs: Dict[str, Tuple[Handler, Dict[str, Any]]] = {}
+        self._status: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._awaiting: Dict[str, List[str]] = {}
+        self._threads: List[threading.Thread] = []
+        self._running = False
+
+    def _start(self) -> None:
+        # Called with ``_cond`` held; threads are started lazily so nothing
+        # is spawned at import time or before a server forks its workers.
+        if self._running:
+            return
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._work, name=f"action-worker-{i}", daemon=True)
+            for i in range(max(1, self.workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @staticmethod
+    def _record(action_id: str, kind: str, status: str) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "id": action_id,
+            "kind": kind,
+            "status": status,
+            "attempts": 0,
+            "message": None,
+            "response": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    def reserve(self, kind: str, action_id: str, status: str = "batching") -> None:
+        """Track ``action_id`` before it is submitted (e.g. an open digest)."""
+        with self._cond:
+            if action_id not in self._status:
+                self._track(self._record(action_id, kind, status))
+
+    def submit(
+        self, kind: str, handler: Handler, action_id: Optional[str] = None, **kwargs: Any
+    ) -> str:
+        """Queue ``handler(**kwargs)`` and return its action id."""
+        action_id = action_id or uuid.uuid4().hex
+        now = time.time()
+        with self._cond:
+            record = self._status.get(action_id) or self._record(action_id, kind, "queued")
+            record.update(status="queued", updated_at=now)
+            if len(self._jobs) >= self.max_queue:
+                record.update(status="dead_letter", message="Action queue full")
+                self._dead_letter(record, kwargs)
+                self._settle(record)
+                ACTION_OUTCOMES.inc(kind=kind, outcome="dead_letter")
+                self._track(record)
+                raise QueueFull(action_id)
+            self._start()
+            self._jobs[action_id] = (handler, kwargs)
+            self._track(record)
+            heapq.heappush(self._heap, (now, next(self._seq), action_id))
+            self._cond.notify()
+        return action_id
+
+    def status(self, action_id: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            record = self._status.get(action_id)
+            return dict(record) if record is not None else None
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._jobs)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Let workers drain ready actions for up to ``timeout`` seconds."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._heap and self._heap[0][0] <= time.time():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+        with self._cond:
+            # Anything still waiting for a retry would be lost with the process.
+            for _, _, action_id in self._heap:
+                _, kwargs = self._jobs.pop(action_id)
+                record = self._status.get(action_id)
+                if record is None:
+                    record = {"id": action_id, "kind": "unknown", "attempts": 0}
+                record.update(status="dead_letter", message="Shut down before delivery")
+                self._dead_letter(record, kwargs)
+                self._settle(record)
+            self._heap = []
+
+    def _track(self, record: Dict[str, Any]) -> None:
+        self._status[record["id"]] = record
+        self._status.move_to_end(record["id"])
+        while len(self._status) > self.max_tracked:
+            self._status.popitem(last=False)
+
+    def _next(self) -> Optional[str]:
+        with self._cond:
+            while self._running:
+                if self._heap:
+                    ready_at = self._heap[0][0]
+                    delay = ready_at - time.time()
+                    if delay <= 0:
+                        action_id = heapq.heappop(self._heap)[2]
+                        record = self._status.get(action_id)
+                        if record is not None:
+                            record.update(status="running", updated_at=time.time())
+                        return action_id
+                    self._cond.wait(delay)
+                else:
+                    self._cond.wait()
+            return None
+
+    def _work(self) -> None:
+        while True:
+            action_id = self._next()
+            if action_id is None:
+                return
+            handler, kwargs = self._jobs[action_id]
+            start = time.perf_counter()
+            try:
+                outcome = handler(**kwargs)
+                ok, message = bool(outcome[0]), str(outcome[1])
+                response = outcome[2] if len(outcome) > 2 else None
+            except Exception as e:
+                ok, message, response = False, str(e), None
+            self._finish(action_id, ok, message, response, time.perf_counter() - start)
+
+    def _finish(
+        self, action_id: str, ok: bool, message: str, response: Any, elapsed: float = 0.0
+    ) -> None:
+        with self._cond:
+            _, kwargs = self._jobs[action_id]
+            record = self._status.get(action_id)
+            if record is None:
+                record = {"id": action_id, "kind": "unknown", "attempts": 0}
+            record["attempts"] += 1
+            record.update(message=message, response=response, updated_at=time.time())
+            awaiting = response.get("awaiting") if isinstance(response, dict) else None
+            target = self._status.get(awaiting) if awaiting else None
+            if ok and target is not None and target["status"] not in _SETTLED:
+                record["status"] = "queued"
+                del self._jobs[action_id]
+                self._awaiting.setdefault(awaiting, []).append(action_id)
+            elif ok:
+                record["status"] = target["status"] if target is not None else "delivered"
+                del self._jobs[action_id]
+            elif record["attempts"] < self.max_attempts:
+                record["status"] = "retrying"
+                delay = min(300.0, self.backoff * 2 ** (record["attempts"] - 1))
+                heapq.heappush(self._heap, (time.time() + delay, next(self._seq), action_id))
+            else:
+                record["status"] = "dead_letter"
+                del self._jobs[action_id]
+                self._dead_letter(record, kwargs)
+            self._settle(record)
+            ACTION_SECONDS.observe(elapsed, kind=record["kind"])
+            ACTION_OUTCOMES.inc(kind=record["kind"], outcome=record["status"])
+            self._cond.notify_all()
+
+    def _settle(self, record: Dict[str, Any]) -> None:
+        # Called with ``_cond`` held: pass a settled status on to its waiters.
+        if record["status"] not in _SETTLED:
+            return
+        for waiter_id in self._awaiting.pop(record["id"], []):
+            waiter = self._status.get(waiter_id)
+            if waiter is not None:
+                waiter.update(
+                    status=record["status"], message=record["message"], updated_at=time.time()
+                )
+
+    def _dead_letter(self, record: Dict[str, Any], kwargs: Dict[str, Any]) -> None:
+        log.error(
+            "action %s (%s) undeliverable: %s", record["id"], record["kind"], record["message"]
+        )
+        if not self.dead_letter_path:
+            return
+        entry = {
+            "id": record["id"],
+            "kind": record["kind"],
+            "attempts": record["attempts"],
+            "error": record["message"],
+            "failed_at": time.time(),
+            "args": kwargs,
+        }
+        try:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(entry, default=str) + "\n")
+        except OSError as e:
+            log.error("could not write dead-letter entry for %s: %s", record["id"], e)
+
+
+def _build_dispatcher() -> ActionDispatcher:
+    return ActionDispatcher(
+        workers=SETTINGS.action_workers,
+        max_queue=SETTINGS.action_queue_size,
+        max_attempts=SETTINGS.action_max_attempts,
+        backoff=SETTINGS.action_retry_backoff,
+        dead_letter_path=SETTINGS.action_dead_letter_path,
+    )
+
+
+dispatcher: ActionDispatcher = Lazy(_build_dispatcher)
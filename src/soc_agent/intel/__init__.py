@@ -1,3 +1,4 @@
-from .client import intel_client
+from .client import Verdict, intel_client
+from .result import IntelResult
 
-__all__ = ["intel_client"]
+__all__ = ["IntelResult", "Verdict", "intel_client"]
@@ -1,69 +1,710 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
-
-import requests
+import asyncio
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 from ..config import SETTINGS
-from .providers import abuseipdb, otx, virustotal
+from ..lazy import Lazy
+from ..metrics import INTEL_SKIPPED, PROVIDER_SECONDS
+from .breaker import CircuitBreaker
+from .cache import IOCCache
+from .disk_cache import SqliteIntelCache
+from .providers import PROVIDERS, Provider
+from .providers.blocklist import BlocklistIndex
+from .ratelimit import TokenBucket
+from .result import SUMMARY_FIELDS, IntelResult
+from .stats import ProviderStats
+
+if TYPE_CHECKING:
+    import httpx
+
+
+def _is_outage(error: Exception) -> bool:
+    """Whether ``error`` means the provider is unhealthy (vs. rejecting this query)."""
+    import httpx
+
+    if isinstance(error, httpx.HTTPStatusError):
+        code = error.response.status_code
+        return code >= 500 or code == 429
+    return True
+
+
+class _Answer(NamedTuple):
+    """One provider's reply: its raw JSON and summary, or why there is none."""
+
+    raw: Optional[Dict[str, Any]] = None
+    summary: Optional[Dict[str, int]] = None
+    error: Optional[str] = None
+
+
+class Verdict:
+    """Whether more intel can still change an event's category.
+
+    ``thresholds`` are the intel scores at which the category of the event
+    being enriched changes (see ``analyzer.intel_thresholds``) and ``score``
+    is the highest intel score seen for the event so far. The verdict is
+    settled once no provider left to ask can lift the score past another
+    threshold. The lookups for all of an event's indicators share one.
+    """
+
+    __slots__ = ("thresholds", "score")
+
+    def __init__(self, thresholds: Sequence[int], score: int = 0):
+        self.thresholds = tuple(thresholds)
+        self.score = score
+
+    def observe(self, score: int) -> None:
+        self.score = max(self.score, score)
+
+    def settled(self, reachable: int) -> bool:
+        """Whether no intel score up to ``reachable`` crosses another threshold."""
+        return not any(self.score < t <= reachable for t in self.thresholds)
+
+
+class _Waiter(NamedTuple):
+    """One caller waiting on a micro-batch."""
+
+    future: asyncio.Future
+    timeout: float
+    dispatched: Callable[[], None]
+
+
+class MicroBatcher:
+    """Coalesce a bulk-capable provider's lookups that arrive within a short window.
+
+    Pending indicators are collected for ``window`` seconds or until
+    ``max_items`` distinct indicators are waiting, then sent as one request
+    through the provider's ``bulk_lookup``. Duplicate indicators in a batch are
+    looked up once and every waiting caller receives the result. The request
+    gets the longest timeout among the callers waiting on it.
+    """
+
+    def __init__(self, provider: Provider, window: float, max_items: int):
+        self.provider = provider
+        self.window = window
+        self.max_items = max(1, max_items)
+        self._pending: Dict[str, List[_Waiter]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.batches = 0
+        self.submitted = 0
+        self.requests = 0
+
+    async def submit(
+        self,
+        client: httpx.AsyncClient,
+        ip: str,
+        timeout: float,
+        dispatched: Callable[[], None] = lambda: None,
+    ) -> Dict[str, Any]:
+        """Look ``ip`` up with the next batch.
+
+        ``dispatched`` is called when the batch holding ``ip`` is sent. A
+        caller cancelled before that is taken out of the batch.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop, self._pending, self._timer = loop, {}, None
+        waiter = _Waiter(loop.create_future(), timeout, dispatched)
+        self._pending.setdefault(ip, []).append(waiter)
+        self.submitted += 1
+        if len(self._pending) >= self.max_items:
+            self._flush(client)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush, client)
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            waiting = self._pending.get(ip)
+            if waiting is not None and waiter in waiting:
+                waiting.remove(waiter)
+                if not waiting:
+                    del self._pending[ip]
+            raise
+
+    def _flush(self, client: httpx.AsyncClient) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            asyncio.ensure_future(self._run(client, batch))
+
+    async def _run(self, client: httpx.AsyncClient, batch: Dict[str, List[_Waiter]]) -> None:
+        ips = list(batch)
+        timeout = max(w.timeout for waiters in batch.values() for w in waiters)
+        self.batches += 1
+        for waiters in batch.values():
+            for waiter in waiters:
+                waiter.dispatched()
+        outcomes: Dict[str, Any]
+        self.requests += 1
+        try:
+            found = await self.provider.bulk_lookup(client, ips, timeout)
+            outcomes = {ip: found.get(ip, KeyError(f"no result for {ip}")) for ip in ips}
+        except Exception as e:
+            outcomes = {ip: e for ip in ips}
+        for ip, waiters in batch.items():
+            outcome = outcomes[ip]
+            for waiter in waiters:
+                if waiter.future.done():
+                    continue
+                if isinstance(outcome, BaseException):
+                    waiter.future.set_exception(outcome)
+                else:
+                    waiter.future.set_result(outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "lookups": self.submitted,
+            "requests": self.requests,
+        }
 
 
 class IntelClient:
-    def __init__(self):
+    def __init__(self, providers: Optional[Sequence[Provider]] = None):
         """Initialize the intelligence client.
 
+        ``providers`` defaults to every plugin in the provider registry; the
+        provider modules are imported here, not when this module is.
+
         Logging should be configured by the application using this client. To
         avoid unintentionally overriding existing logging handlers, this
         constructor does not configure logging and simply uses whatever
         configuration is already in place.
+
+        The pooled ``httpx.AsyncClient`` is created on first use because it is
+        bound to the event loop that runs it.
+        """
+        self.session: Optional[httpx.AsyncClient] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.cache = IOCCache(
+            max_entries=SETTINGS.ioc_cache_max_entries,
+            ttl=SETTINGS.ioc_cache_ttl,
+            negative_ttl=SETTINGS.ioc_negative_cache_ttl,
+        )
+        self.disk_cache: Optional[SqliteIntelCache] = (
+            SqliteIntelCache(SETTINGS.ioc_cache_path, SETTINGS.ioc_cache_compact_interval)
+            if SETTINGS.ioc_cache_path
+            else None
+        )
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.providers: List[Provider] = list(PROVIDERS.all() if providers is None else providers)
+        self.rate_limiters: Dict[str, TokenBucket] = {
+            p.name: p.rate_limiter() for p in self.providers
+        }
+        self.breakers: Dict[str, CircuitBreaker] = {
+            p.name: p.circuit_breaker() for p in self.providers
+        }
+        self.observed: Dict[str, ProviderStats] = {p.name: ProviderStats() for p in self.providers}
+        # Hedged lookups left to finish after their answer stopped mattering.
+        self._background: Set[asyncio.Future] = set()
+        # Only bulk endpoints save requests: ``_inflight`` already merges
+        # concurrent single lookups of one indicator.
+        self.batchers: Dict[str, MicroBatcher] = (
+            {
+                p.name: MicroBatcher(
+                    p, SETTINGS.intel_batch_window_ms / 1000, SETTINGS.intel_batch_max
+                )
+                for p in self.providers
+                if p.bulk_lookup is not None
+            }
+            if SETTINGS.intel_batch_window_ms > 0
+            else {}
+        )
+        self.blocklist: Optional[BlocklistIndex] = (
+            BlocklistIndex(
+                SETTINGS.blocklist_feeds,
+                SETTINGS.blocklist_index_path,
+                SETTINGS.blocklist_reload_interval,
+            )
+            if SETTINGS.blocklist_feeds
+            else None
+        )
+
+    def _client(self) -> httpx.AsyncClient:
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        if self.session is None or (
+            isinstance(self.session, httpx.AsyncClient) and self._session_loop is not loop
+        ):
+            self.session = httpx.AsyncClient(
+                http2=SETTINGS.intel_http2,
+                timeout=SETTINGS.http_timeout,
+                limits=httpx.Limits(
+                    max_connections=SETTINGS.intel_max_connections,
+                    max_keepalive_connections=SETTINGS.intel_max_connections,
+                ),
+            )
+            self._session_loop = loop
+        return self.session
+
+    async def aclose(self) -> None:
+        if self.session is not None:
+            import httpx
+
+            if isinstance(self.session, httpx.AsyncClient):
+                await self.session.aclose()
+        self.session = None
+        self._session_loop = None
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats()
+        if self.disk_cache is not None:
+            stats["disk"] = self.disk_cache.stats()
+        if self.blocklist is not None:
+            stats["blocklist"] = self.blocklist.stats()
+        return stats
+
+    async def _query(
+        self,
+        provider: Provider,
+        client: httpx.AsyncClient,
+        ip: str,
+        limiter: Optional[asyncio.Semaphore],
+        priority: int,
+        deadline: Optional[float] = None,
+    ) -> _Answer:
+        start = time.perf_counter()
+        breaker = self.breakers.get(provider.name)
+        if breaker is not None and not breaker.allow():
+            PROVIDER_SECONDS.observe(0.0, provider=provider.name, outcome="circuit_open")
+            return _Answer(error="circuit open")
+        timeout = SETTINGS.http_timeout
+        max_wait = self._max_wait(priority)
+        if deadline is not None:
+            remaining = max(0.0, deadline - time.monotonic())
+            timeout, max_wait = min(timeout, remaining), min(max_wait, remaining)
+        bucket = self.rate_limiters.get(provider.name)
+        if bucket is not None and not await bucket.acquire(priority, max_wait):
+            if breaker is not None:
+                breaker.release()
+            PROVIDER_SECONDS.observe(
+                time.perf_counter() - start, provider=provider.name, outcome="rate_limited"
+            )
+            return _Answer(error="rate limited")
+        observed = self.observed[provider.name]
+        asked: Optional[float] = None
+
+        def dispatched() -> None:
+            nonlocal asked
+            asked = time.perf_counter()
+
+        try:
+            if limiter is None:
+                data = await self._dispatch(provider, client, ip, timeout, dispatched)
+            else:
+                async with limiter:
+                    data = await self._dispatch(provider, client, ip, timeout, dispatched)
+            outcome = _Answer(data, provider.summarize(data))
+            status = "ok"
+        except asyncio.CancelledError:
+            if asked is None:
+                # Still queued on our side: the provider was never asked.
+                if breaker is not None:
+                    breaker.release()
+                PROVIDER_SECONDS.observe(
+                    time.perf_counter() - start, provider=provider.name, outcome="queued"
+                )
+                raise
+            # Cancelled at the request deadline: the provider was too slow.
+            if breaker is not None:
+                breaker.record_failure()
+            observed.record(time.perf_counter() - asked, ok=False)
+            PROVIDER_SECONDS.observe(
+                time.perf_counter() - start, provider=provider.name, outcome="deadline"
+            )
+            raise
+        except Exception as e:
+            outcome = _Answer(error=str(e))
+            status = "error"
+            up = not _is_outage(e)
+        else:
+            up = True
+        if breaker is not None:
+            if up:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+        observed.record(time.perf_counter() - (asked or start), ok=status == "ok")
+        PROVIDER_SECONDS.observe(
+            time.perf_counter() - start, provider=provider.name, outcome=status
+        )
+        return outcome
+
+    async def _dispatch(
+        self,
+        provider: Provider,
+        client: httpx.AsyncClient,
+        ip: str,
+        timeout: float,
+        dispatched: Callable[[], None],
+    ) -> Dict[str, Any]:
+        # ``dispatched`` marks the moment the request actually leaves for the
+        # provider, after any local queueing.
+        batcher = self.batchers.get(provider.name)
+        if batcher is not None:
+            return await batcher.submit(client, ip, timeout, dispatched)
+        dispatched()
+        return await provider.lookup(client, ip, timeout)
+
+    @staticmethod
+    def _max_wait(priority: int) -> float:
+        # Lookups for events that cannot reach MEDIUM on their own do not
+        # queue for rate-limited quota; they only use a slot if one is free.
+        if priority < SETTINGS.score_medium:
+            return 0.0
+        return SETTINGS.intel_rate_limit_max_wait * min(100, priority) / 100
+
+    async def enrich_ip(
+        self,
+        ip: str,
+        limiter: Optional[asyncio.Semaphore] = None,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        verdict: Optional[Verdict] = None,
+    ) -> IntelResult:
+        """Return the enrichment for ``ip``, from cache when possible.
+
+        Concurrent callers asking for the same indicator share a single
+        upstream lookup. Results are shared between callers and must be
+        treated as read-only. ``priority`` (typically the event's base score)
+        decides who gets rate-limited provider quota first. Providers that
+        have not answered by ``deadline`` (a ``time.monotonic()`` value) are
+        left out of the result. With a ``verdict`` providers are only asked
+        until it is settled (see :meth:`_lookup`); without one, or when a
+        cached result skipped providers this caller still needs, the
+        missing providers are asked as well.
         """
-        self.session = requests.Session()
+        result = self.cache.get(ip)
+        if result is None:
+            result = await self._shared_lookup(ip, limiter, priority, deadline, verdict)
+        while result.skipped and not self._settled_by(result, verdict):
+            result = await self._shared_lookup(ip, limiter, priority, deadline, verdict, result)
+        return result
 
-    def enrich_ip(self, ip: str) -> Dict[str, Any]:
-        results: Dict[str, Any] = {"indicator": ip, "sources": {}, "score": 0, "labels": []}
+    def _settled_by(self, result: IntelResult, verdict: Optional[Verdict]) -> bool:
+        if verdict is None:
+            return False
+        verdict.observe(result.score)
+        skipped = [p.max_vote for p in self.providers if p.name in result.skipped]
+        return verdict.settled(max(skipped, default=0))
+
+    async def _shared_lookup(
+        self,
+        ip: str,
+        limiter: Optional[asyncio.Semaphore],
+        priority: int,
+        deadline: Optional[float],
+        verdict: Optional[Verdict],
+        previous: Optional[IntelResult] = None,
+    ) -> IntelResult:
+        task = self._inflight.get(ip)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._lookup_and_cache(ip, limiter, priority, deadline, verdict, previous)
+            )
+            self._inflight[ip] = task
+            task.add_done_callback(lambda _t, key=ip: self._inflight.pop(key, None))
+        else:
+            self.cache.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _lookup_and_cache(
+        self,
+        ip: str,
+        limiter: Optional[asyncio.Semaphore],
+        priority: int,
+        deadline: Optional[float] = None,
+        verdict: Optional[Verdict] = None,
+        previous: Optional[IntelResult] = None,
+    ) -> IntelResult:
+        if self.disk_cache is not None and previous is None:
+            stored = await self.disk_cache.aget(ip)
+            if stored is not None:
+                data, remaining = stored
+                results = IntelResult.from_dict(data)
+                self.cache.set(ip, results, ttl=remaining)
+                return results
+        results = await self._lookup(ip, limiter, priority, deadline, verdict, previous)
+        negative = results.partial
+        self.cache.set(ip, results, negative=negative)
+        if self.disk_cache is not None:
+            await self.disk_cache.aset(ip, results.to_dict("full"), self.cache.ttl_for(negative))
+        return results
+
+    async def _ask(
+        self,
+        providers: Sequence[Provider],
+        client: httpx.AsyncClient,
+        ip: str,
+        limiter: Optional[asyncio.Semaphore],
+        priority: int,
+        deadline: Optional[float],
+    ) -> List[_Answer]:
+        """Query ``providers`` concurrently, cancelling those pending at ``deadline``."""
+        tasks = [
+            asyncio.ensure_future(self._query(p, client, ip, limiter, priority, deadline))
+            for p in providers
+        ]
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        return [
+            _Answer(error="deadline exceeded") if task in pending else task.result()
+            for task in tasks
+        ]
+
+    def _lazy_order(self, provider: Provider) -> Tuple[bool, float, float, int]:
+        # Unmetered providers first, then by winning answers per second, then
+        # by quota and by how high the provider can vote.
+        capacity = provider.daily_capacity()
+        value = self.observed[provider.name].value()
+        return (capacity != float("inf"), -value, -capacity, -provider.max_vote)
+
+    async def _ask_lazily(
+        self,
+        providers: Sequence[Provider],
+        client: httpx.AsyncClient,
+        ip: str,
+        limiter: Optional[asyncio.Semaphore],
+        priority: int,
+        deadline: Optional[float],
+        verdict: Verdict,
+        votes: List[int],
+        absorb: Callable[[Provider, _Answer], None],
+    ) -> List[Provider]:
+        """Ask ``providers`` one after another until ``verdict`` is settled.
+
+        They are asked in :meth:`_lazy_order`, except those whose
+        ``max_vote`` cannot cross any threshold still open. When a provider
+        takes longer than ``intel_hedge_factor`` times its average latency
+        (``intel_hedge_default_latency`` until it has been measured), the
+        next one is started alongside it. Returns the providers whose
+        answers were not needed; hedged lookups still running then finish in
+        the background.
+        """
+        remaining = sorted(providers, key=self._lazy_order)
+        passed: List[Provider] = []
+        running: Dict[asyncio.Future, Provider] = {}
+        hedge_at: Optional[float] = None
+        while True:
+            verdict.observe(max(votes, default=0))
+            passed.extend(p for p in remaining if verdict.settled(p.max_vote))
+            remaining = [p for p in remaining if not verdict.settled(p.max_vote)]
+            unsettled = [*remaining, *running.values()]
+            if not unsettled or verdict.settled(max(p.max_vote for p in unsettled)):
+                for task in running:
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
+                return [*passed, *unsettled]
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                break
+            if remaining and (not running or (hedge_at is not None and now >= hedge_at)):
+                provider = remaining.pop(0)
+                task = asyncio.ensure_future(
+                    self._query(provider, client, ip, limiter, priority, deadline)
+                )
+                running[task] = provider
+                hedge_at = None
+                if SETTINGS.intel_hedge_factor > 0:
+                    observed = self.observed[provider.name]
+                    # Unmeasured providers get the default, so a cold start is not serial.
+                    latency = (
+                        observed.latency if observed.calls else SETTINGS.intel_hedge_default_latency
+                    )
+                    hedge_at = now + SETTINGS.intel_hedge_factor * latency
+            wake = [t for t in (hedge_at if remaining else None, deadline) if t is not None]
+            done, _ = await asyncio.wait(
+                running,
+                timeout=max(0.0, min(wake) - now) if wake else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                absorb(running.pop(task), task.result())
+        # Out of time before the verdict was settled.
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        for provider in [*running.values(), *remaining]:
+            absorb(provider, _Answer(error="deadline exceeded"))
+        return passed
+
+    async def _lookup(
+        self,
+        ip: str,
+        limiter: Optional[asyncio.Semaphore],
+        priority: int,
+        deadline: Optional[float] = None,
+        verdict: Optional[Verdict] = None,
+        previous: Optional[IntelResult] = None,
+    ) -> IntelResult:
+        """Query the configured providers for ``ip``.
+
+        The local blocklist index is consulted first; when it lists ``ip`` and
+        ``blocklist_skip_remote`` is set, the remote providers are not called.
+        Without a ``verdict`` every provider is queried concurrently. With
+        one they are asked as in :meth:`_ask_lazily` until no provider left
+        could settle the verdict differently; those are listed in
+        ``skipped``. ``previous`` is a result with skipped providers to top
+        up: only those are asked and their answers are merged into it.
+        Providers still pending at ``deadline`` are cancelled; like failed
+        providers they are listed in ``errors``, which marks the result
+        partial. Raw provider JSON is kept only with ``intel_verbosity=full``.
+        """
+        keep_raw = SETTINGS.intel_verbosity == "full"
+        raw: Dict[str, Any] = {}
+        fields: Dict[str, int] = {}
+        errors: Dict[str, str] = {}
         votes: List[int] = []
 
-        if SETTINGS.otx_api_key:
-            try:
-                data = otx.lookup_ip(self.session, ip, SETTINGS.http_timeout)
-                results["sources"]["otx"] = data
-                pulses = len(data.get("pulse_info", {}).get("pulses", []))
-                if pulses:
-                    votes.append(min(30, 10 + pulses))
-            except Exception as e:
-                results["sources"]["otx_error"] = str(e)
-
-        if SETTINGS.vt_api_key:
-            try:
-                data = virustotal.lookup_ip(self.session, ip, SETTINGS.http_timeout)
-                results["sources"]["virustotal"] = data
-                stats = data.get("data", {}).get("attributes", {}).get("last_analysis_stats", {})
-                malicious = int(stats.get("malicious", 0))
-                suspicious = int(stats.get("suspicious", 0))
-                if malicious or suspicious:
-                    votes.append(min(40, 5 * (malicious + suspicious)))
-            except Exception as e:
-                results["sources"]["vt_error"] = str(e)
-
-        if SETTINGS.abuseipdb_api_key:
-            try:
-                data = abuseipdb.lookup_ip(self.session, ip, SETTINGS.http_timeout)
-                results["sources"]["abuseipdb"] = data
-                score = int(data.get("data", {}).get("abuseConfidenceScore", 0))
-                if score:
-                    votes.append(min(50, score))
-            except Exception as e:
-                results["sources"]["abuseipdb_error"] = str(e)
+        if previous is None:
+            providers = [p for p in self.providers if p.enabled()]
+            feeds = self.blocklist.lookup(ip) if self.blocklist is not None else []
+            if feeds:
+                raw["blocklist"] = {"feeds": feeds}
+                votes.append(SETTINGS.blocklist_score)
+                if SETTINGS.blocklist_skip_remote:
+                    providers = []
+        else:
+            providers = [p for p in self.providers if p.enabled() and p.name in previous.skipped]
+            feeds = list(previous.feeds)
+            raw.update(previous.raw or {})
+            for field in SUMMARY_FIELDS:
+                if getattr(previous, field) is not None:
+                    fields[field] = getattr(previous, field)
+            errors.update(previous.errors or {})
+            votes.append(previous.score)
+
+        answered: Dict[str, int] = {}
+
+        def absorb(provider: Provider, answer: _Answer) -> None:
+            if answer.error is not None:
+                errors[provider.name] = answer.error
+                return
+            fields.update(answer.summary)
+            vote = provider.vote(answer.summary)
+            answered[provider.name] = vote
+            if vote:
+                votes.append(vote)
+            if keep_raw:
+                raw[provider.name] = answer.raw
+
+        skipped: List[str] = []
+        if providers:
+            client = self._client()
+            if verdict is None:
+                answers = await self._ask(providers, client, ip, limiter, priority, deadline)
+                for provider, answer in zip(providers, answers):
+                    absorb(provider, answer)
+            else:
+                for provider in await self._ask_lazily(
+                    providers, client, ip, limiter, priority, deadline, verdict, votes, absorb
+                ):
+                    INTEL_SKIPPED.inc(provider=provider.name)
+                    self.observed[provider.name].skipped += 1
+                    skipped.append(provider.name)
 
         agg = max(votes) if votes else 0
-        results["score"] = agg
+        for name, vote in answered.items():
+            self.observed[name].record_vote(0 < vote == agg)
         if agg >= 70:
-            results["labels"].append("malicious")
+            labels = ["malicious"]
         elif agg >= 40:
-            results["labels"].append("suspicious")
+            labels = ["suspicious"]
         else:
-            results["labels"].append("unknown")
-        return results
+            labels = ["unknown"]
+        labels.extend(f"blocklist:{feed}" for feed in feeds)
+        return IntelResult(
+            ip,
+            agg,
+            labels,
+            feeds=feeds,
+            errors=errors,
+            raw=raw if keep_raw else None,
+            skipped=skipped,
+            **fields,
+        )
+
+    async def enrich_ips(
+        self,
+        ips: Sequence[str],
+        priority: Union[int, Mapping[str, int]] = 0,
+        deadline: Optional[float] = None,
+        verdict: Union[None, Verdict, Mapping[str, Verdict]] = None,
+    ) -> List[IntelResult]:
+        """Enrich all ``ips`` of one event at once.
+
+        Provider calls for every IP run concurrently, bounded by
+        ``intel_max_concurrency`` in-flight requests for the event.
+        ``priority`` is either one priority for every IP or a per-IP mapping,
+        and so is ``verdict``, which turns on lazy enrichment.
+        """
+        if not ips:
+            return []
+        limiter = asyncio.Semaphore(max(1, SETTINGS.intel_max_concurrency))
+        if isinstance(priority, Mapping):
+            priorities = [priority.get(ip, 0) for ip in ips]
+        else:
+            priorities = [priority] * len(ips)
+        if isinstance(verdict, Mapping):
+            verdicts = [verdict.get(ip) for ip in ips]
+        else:
+            verdicts = [verdict] * len(ips)
+        return list(
+            await asyncio.gather(
+                *(
+                    self.enrich_ip(ip, limiter, prio, deadline, v)
+                    for ip, prio, v in zip(ips, priorities, verdicts)
+                )
+            )
+        )
+
+    def batch_stats(self) -> Dict[str, Any]:
+        return {name: batcher.stats() for name, batcher in self.batchers.items()}
+
+    def breaker_stats(self) -> Dict[str, Any]:
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
+
+    def provider_stats(self) -> Dict[str, Any]:
+        """Per-provider live statistics, in the order lazy enrichment asks them."""
+        out: Dict[str, Any] = {}
+        for p in sorted(self.providers, key=self._lazy_order):
+            capacity = p.daily_capacity()
+            out[p.name] = {
+                "enabled": p.enabled(),
+                "max_vote": p.max_vote,
+                "daily_capacity": None if capacity == float("inf") else capacity,
+                "breaker": self.breakers[p.name].state,
+                **self.observed[p.name].stats(),
+            }
+        return out
+
+    def rate_limit_stats(self) -> Dict[str, Any]:
+        return {name: bucket.stats() for name, bucket in self.rate_limiters.items()}
 
 
-intel_client = IntelClient()
+# Built on first use in each process (see ``soc_agent.lazy``).
+intel_client: IntelClient = Lazy(IntelClient)
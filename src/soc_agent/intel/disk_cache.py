@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS intel_cache (
+    indicator TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS intel_cache_expires_at ON intel_cache (expires_at);
+"""
+
+
+class SqliteIntelCache:
+    """On-disk intel cache tier shared by every worker process on a host.
+
+    Rows hold the aggregated per-indicator enrichment result as JSON with an
+    absolute (wall clock) expiry. The database runs in WAL mode so readers in
+    other processes never block on a writer, and each thread of each process
+    lazily opens its own connection. Expired rows are removed by a background
+    compaction thread started on first use.
+
+    :meth:`aget` and :meth:`aset` run the SQLite calls on a small thread pool
+    so the event loop never waits on the disk. The freed pages of compacted
+    rows are returned to the file system through incremental auto-vacuum; a
+    file created without it is converted with a one-off ``VACUUM`` when it is
+    first opened.
+    """
+
+    def __init__(self, path: str, compact_interval: float = 300.0, workers: int = 4):
+        self.path = path
+        self.compact_interval = compact_interval
+        self.workers = max(1, workers)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns: List[Tuple[int, sqlite3.Connection]] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._compactor: Optional[threading.Thread] = None
+        self._compactor_pid: Optional[int] = None
+        self._stop = threading.Event()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.compacted = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Closed by ``close`` from whichever thread shuts the cache down.
+        conn = sqlite3.connect(
+            self.path, timeout=5.0, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Setting the mode only takes effect once an existing file is rebuilt.
+            try:
+                conn.execute("VACUUM")
+            except sqlite3.Error as e:
+                log.warning("intel disk cache could not enable incremental vacuum: %s", e)
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so they are keyed by pid too.
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._local.conn = self._connect()
+            self._local.pid = pid
+            with self._lock:
+                self._conns.append((pid, self._local.conn))
+            self._ensure_compactor()
+        return self._local.conn
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Pool threads do not survive a fork, so each process gets its own pool.
+        with self._lock:
+            pid = os.getpid()
+            if self._executor is None or self._executor_pid != pid:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="intel-cache")
+                self._executor_pid = pid
+            return self._executor
+
+    async def aget(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """:meth:`get` without blocking the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._pool(), self.get, key)
+
+    async def aset(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        """:meth:`set` without blocking the event loop."""
+        if ttl <= 0:
+            return
+        await asyncio.get_running_loop().run_in_executor(self._pool(), self.set, key, value, ttl)
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return ``(value, remaining_ttl)`` for an unexpired entry."""
+        now = time.time()
+        try:
+            row = (
+                self._conn()
+                .execute(
+                    "SELECT value, expires_at FROM intel_cache"
+                    " WHERE indicator = ? AND expires_at > ?",
+                    (key, now),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            log.warning("intel disk cache read failed: %s", e)
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0]), row[1] - now
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        if ttl <= 0:
+            return
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO intel_cache (indicator, expires_at, value)"
+                " VALUES (?, ?, ?)",
+                (key, time.time() + ttl, json.dumps(value, separators=(",", ":"))),
+            )
+            self.writes += 1
+        except sqlite3.Error as e:
+            log.warning("intel disk cache write failed: %s", e)
+
+    def compact(self) -> int:
+        """Delete expired rows and return how many were removed."""
+        conn = self._conn()
+        cur = conn.execute("DELETE FROM intel_cache WHERE expires_at <= ?", (time.time(),))
+        removed = cur.rowcount or 0
+        if removed:
+            conn.execute("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        self.compacted += removed
+        return removed
+
+    def _ensure_compactor(self) -> None:
+        if self.compact_interval <= 0:
+            return
+        with self._lock:
+            pid = os.getpid()
+            if self._compactor is not None and self._compactor_pid == pid:
+                return
+            self._stop = threading.Event()
+            self._compactor = threading.Thread(
+                target=self._compact_loop, name="intel-cache-compactor", daemon=True
+            )
+            self._compactor_pid = pid
+            self._compactor.start()
+
+    def _compact_loop(self) -> None:
+        stop = self._stop
+        while not stop.wait(self.compact_interval):
+            try:
+                self.compact()
+            except sqlite3.Error as e:
+                log.warning("intel disk cache compaction failed: %s", e)
+
+    def close(self) -> None:
+        self._stop.set()
+        pid = os.getpid()
+        with self._lock:
+            compactor, self._compactor = self._compactor, None
+            executor, self._executor = self._executor, None
+        if executor is not None and self._executor_pid == pid:
+            executor.shutdown(wait=True)
+        if compactor is not None and self._compactor_pid == pid:
+            compactor.join()
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn_pid, conn in conns:
+            if conn_pid == pid:
+                conn.close()
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "compacted": self.compacted,
+        }
@@ -0,0 +1,71 @@
+"""Threat-intel providers.
+
+Each remote provider module exposes a :class:`Provider` as ``PROVIDER``.
+Providers are found through the ``soc_agent.intel_providers`` entry-point
+group and only imported when the intel client is first built.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from ...config import SETTINGS
+from ...plugins import Registry
+from ..breaker import CircuitBreaker
+from ..ratelimit import TokenBucket
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class Provider(NamedTuple):
+    name: str
+    # Prefix of this provider's settings: ``<prefix>_api_key``, ``<prefix>_rate_per_min``...
+    prefix: str
+    lookup: Callable[[httpx.AsyncClient, str, float], Awaitable[Dict[str, Any]]]
+    # Reduces a raw response to ``IntelResult`` fields; ``vote`` scores that summary.
+    summarize: Callable[[Dict[str, Any]], Dict[str, int]]
+    vote: Callable[[Dict[str, int]], int]
+    # Optional multi-indicator endpoint: ``lookup_ips(client, ips, timeout)``
+    # returning ``{ip: data}``. Only providers that define it are micro-batched
+    # (``INTEL_BATCH_WINDOW_MS``); none of the built-in providers has one.
+    bulk_lookup: Optional[
+        Callable[[httpx.AsyncClient, List[str], float], Awaitable[Dict[str, Dict[str, Any]]]]
+    ] = None
+    # Highest score ``vote`` can return; lazy enrichment skips providers that
+    # cannot change the verdict.
+    max_vote: int = 100
+
+    def enabled(self) -> bool:
+        return bool(getattr(SETTINGS, f"{self.prefix}_api_key"))
+
+    def circuit_breaker(self) -> CircuitBreaker:
+        return CircuitBreaker(SETTINGS.intel_breaker_failures, SETTINGS.intel_breaker_reset)
+
+    def daily_capacity(self) -> float:
+        """Lookups per day the configured quota allows (``inf`` when unmetered)."""
+        rate = getattr(SETTINGS, f"{self.prefix}_rate_per_min")
+        budget = getattr(SETTINGS, f"{self.prefix}_daily_budget")
+        limits = [limit for limit in (rate * 1440, budget) if limit > 0]
+        return min(limits) if limits else float("inf")
+
+    def rate_limiter(self) -> TokenBucket:
+        return TokenBucket(
+            rate_per_min=getattr(SETTINGS, f"{self.prefix}_rate_per_min"),
+            daily_budget=getattr(SETTINGS, f"{self.prefix}_daily_budget"),
+            reserve=SETTINGS.intel_budget_reserve,
+            reserve_priority=SETTINGS.score_medium,
+        )
+
+
+# Order matters: it is the order sources appear in the enrichment result.
+PROVIDERS = Registry(
+    "soc_agent.intel_providers",
+    {
+        "otx": "soc_agent.intel.providers.otx:PROVIDER",
+        "virustotal": "soc_agent.intel.providers.virustotal:PROVIDER",
+        "abuseipdb": "soc_agent.intel.providers.abuseipdb:PROVIDER",
+    },
+)
+
+__all__ = ["PROVIDERS", "Provider"]
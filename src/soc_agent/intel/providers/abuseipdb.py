@@ -1,15 +1,17 @@
 from __future__ import annotations
 
-from typing import Any, Dict
-
-import requests
+from typing import TYPE_CHECKING, Any, Dict
 
 from ...config import SETTINGS
+from . import Provider
+
+if TYPE_CHECKING:
+    import httpx
 
 
-def lookup_ip(session: requests.Session, ip: str, timeout: float) -> Dict[str, Any]:
-    url = "https://api.abuseipdb.com/api/v2/check"
-    r = session.get(
+async def lookup_ip(client: httpx.AsyncClient, ip: str, timeout: float) -> Dict[str, Any]:
+    url = f"{SETTINGS.abuseipdb_base_url.rstrip('/')}/api/v2/check"
+    r = await client.get(
         url,
         params={"ipAddress": ip, "maxAgeInDays": 90},
         headers={"Key": SETTINGS.abuseipdb_api_key, "Accept": "application/json"},
@@ -17,3 +19,15 @@ def lookup_ip(session: requests.Session, ip: str, timeout: float) -> Dict[str, A
     )
     r.raise_for_status()
     return r.json()
+
+
+def summarize(data: Dict[str, Any]) -> Dict[str, int]:
+    return {"abuse_confidence": int(data.get("data", {}).get("abuseConfidenceScore", 0))}
+
+
+def vote(summary: Dict[str, int]) -> int:
+    score = summary["abuse_confidence"]
+    return min(50, score) if score else 0
+
+
+PROVIDER = Provider("abuseipdb", "abuseipdb", lookup_ip, summarize, vote, max_vote=50)
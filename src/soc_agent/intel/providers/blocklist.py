@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import csv
+import ipaddress
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+log = logging.getLogger(__name__)
+
+_MAGIC = b"SOCBL1\0\0"
+_V4_ROOT, _V6_ROOT = 0, 1
+
+
+def parse_feed(lines: Iterable[str]) -> Iterator[ipaddress._BaseNetwork]:
+    """Yield the networks listed in a blocklist feed.
+
+    Understands the common free formats: one IP/CIDR per line (FireHOL
+    netsets), ``CIDR ; SBL-id`` (Spamhaus DROP) and CSV exports where one
+    column holds the address (abuse.ch). ``#`` and ``;`` start comments.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] in "#;":
+            continue
+        head = line.split(";", 1)[0].strip()
+        fields = [head] if "," not in head else next(csv.reader([head]))
+        for field in fields:
+            try:
+                yield ipaddress.ip_network(field.strip().strip('"'), strict=False)
+                break
+            except ValueError:
+                continue
+
+
+class _Trie:
+    """Binary prefix trie stored in three parallel ``uint32`` arrays.
+
+    Node 0 is the IPv4 root and node 1 the IPv6 root. ``left``/``right`` hold
+    child node numbers (0 means no child, since no node points back to a
+    root) and ``label`` a 1-based index into the label-set table (0 = none).
+    """
+
+    def __init__(self, left: Sequence[int], right: Sequence[int], label: Sequence[int]):
+        self.left = left
+        self.right = right
+        self.label = label
+
+    @classmethod
+    def build(
+        cls, networks: Iterable[Tuple[ipaddress._BaseNetwork, str]]
+    ) -> Tuple["_Trie", List[List[str]]]:
+        left, right, label = array("I", [0, 0]), array("I", [0, 0]), array("I", [0, 0])
+        node_sets: Dict[int, FrozenSet[str]] = {}
+        for network, feed in networks:
+            bits = network.max_prefixlen
+            value = int(network.network_address)
+            node = _V4_ROOT if network.version == 4 else _V6_ROOT
+            for depth in range(network.prefixlen):
+                children = right if (value >> (bits - 1 - depth)) & 1 else left
+                child = children[node]
+                if not child:
+                    child = len(left)
+                    left.append(0)
+                    right.append(0)
+                    label.append(0)
+                    children[node] = child
+                node = child
+            node_sets[node] = node_sets.get(node, frozenset()) | {feed}
+        table: Dict[FrozenSet[str], int] = {}
+        for node, feeds in node_sets.items():
+            label[node] = table.setdefault(feeds, len(table) + 1)
+        labels = [sorted(feeds) for feeds, _ in sorted(table.items(), key=lambda kv: kv[1])]
+        return cls(left, right, label), labels
+
+    def match(self, address: ipaddress._BaseAddress) -> List[int]:
+        """Label ids of every listed prefix that covers ``address``."""
+        bits = address.max_prefixlen
+        value = int(address)
+        node = _V4_ROOT if address.version == 4 else _V6_ROOT
+        left, right, label = self.left, self.right, self.label
+        found = [label[node]] if label[node] else []
+        for shift in range(bits - 1, -1, -1):
+            node = right[node] if (value >> shift) & 1 else left[node]
+            if not node:
+                break
+            if label[node]:
+                found.append(label[node])
+        return found
+
+
+class _Index:
+    def __init__(self, trie: _Trie, labels: List[List[str]], signature: str, buf=None):
+        self.trie = trie
+        self.labels = labels
+        self.signature = signature
+        self._buf = buf  # keeps the mmap alive while the arrays point into it
+
+    def lookup(self, address: ipaddress._BaseAddress) -> List[str]:
+        feeds = set()
+        for label_id in self.trie.match(address):
+            feeds.update(self.labels[label_id - 1])
+        return sorted(feeds)
+
+
+def _write_index(path: str, trie: _Trie, labels: List[List[str]], signature: str) -> None:
+    header = json.dumps({"signature": signature, "labels": labels, "nodes": len(trie.left)}).encode(
+        "utf-8"
+    )
+    header += b" " * (-len(header) % 4)
+    directory = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".blocklist-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(_MAGIC)
+            fh.write(struct.pack("<I", len(header)))
+            fh.write(header)
+            for arr in (trie.left, trie.right, trie.label):
+                fh.write(arr.tobytes())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _map_index(path: str) -> Optional[_Index]:
+    with open(path, "rb") as fh:
+        buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    if buf[: len(_MAGIC)] != _MAGIC:
+        buf.close()
+        return None
+    offset = len(_MAGIC)
+    (header_len,) = struct.unpack_from("<I", buf, offset)
+    offset += 4
+    header = json.loads(bytes(buf[offset : offset + header_len]))
+    offset += header_len
+    size = header["nodes"] * 4
+    view = memoryview(buf)
+    arrays = [view[offset + i * size : offset + (i + 1) * size].cast("I") for i in range(3)]
+    return _Index(_Trie(*arrays), header["labels"], header["signature"], buf)
+
+
+class BlocklistIndex:
+    """Offline IP reputation from local blocklist feed files.
+
+    The feeds are compiled into a CIDR prefix trie. With ``index_path`` set,
+    the trie is written to that file once and memory-mapped, so every worker
+    on the host shares one copy. Feed files are re-checked at most every
+    ``reload_interval`` seconds; when they change the index is rebuilt in a
+    background thread, atomically replaced on disk and swapped in for new
+    lookups. Lookups keep using the previous index until then; only the very
+    first lookup waits for a build, as there is nothing to serve before it.
+    """
+
+    def __init__(
+        self,
+        feeds: Sequence[str],
+        index_path: Optional[str] = None,
+        reload_interval: float = 60.0,
+    ):
+        self.feeds = list(feeds)
+        self.index_path = index_path
+        self.reload_interval = reload_interval
+        self._index: Optional[_Index] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._reloader: Optional[threading.Thread] = None
+        self.lookups = 0
+        self.hits = 0
+        self.reloads = 0
+
+    @staticmethod
+    def feed_name(path: str) -> str:
+        return os.path.splitext(os.path.basename(path))[0]
+
+    def _signature(self) -> str:
+        parts = []
+        for path in self.feeds:
+            try:
+                st = os.stat(path)
+                parts.append(f"{path}:{st.st_mtime_ns}:{st.st_size}")
+            except OSError:
+                parts.append(f"{path}:missing")
+        return "|".join(parts)
+
+    def _build(self, signature: str) -> _Index:
+        def networks() -> Iterator[Tuple[ipaddress._BaseNetwork, str]]:
+            for path in self.feeds:
+                try:
+                    with open(path, encoding="utf-8", errors="replace") as fh:
+                        name = self.feed_name(path)
+                        for network in parse_feed(fh):
+                            yield network, name
+                except OSError as e:
+                    log.warning("blocklist feed %s unreadable: %s", path, e)
+
+        trie, labels = _Trie.build(networks())
+        if not self.index_path:
+            return _Index(trie, labels, signature)
+        _write_index(self.index_path, trie, labels, signature)
+        return _map_index(self.index_path)
+
+    def refresh(self, force: bool = False) -> None:
+        """Rebuild or re-map the index if the feed files changed."""
+        now = time.monotonic()
+        if not force and self._index is not None and now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            signature = self._signature()
+            if self._index is not None and self._index.signature == signature:
+                return
+            index = None
+            if self.index_path and os.path.exists(self.index_path):
+                # Another worker may already have built the current index.
+                index = _map_index(self.index_path)
+                if index is not None and index.signature != signature:
+                    index = None
+            self._index = index or self._build(signature)
+            self.reloads += 1
+
+    def _refresh_in_background(self) -> None:
+        reloader = self._reloader
+        if reloader is not None and reloader.is_alive():
+            return
+        self._checked_at = time.monotonic()
+        self._reloader = threading.Thread(target=self._reload, name="blocklist-reload", daemon=True)
+        self._reloader.start()
+
+    def _reload(self) -> None:
+        try:
+            self.refresh(force=True)
+        except Exception as e:
+            log.warning("blocklist reload failed, keeping the current index: %s", e)
+
+    def lookup(self, ip: str) -> List[str]:
+        """Names of the feeds that list ``ip`` (empty if none)."""
+        if self._index is None:
+            self.refresh()
+        elif time.monotonic() - self._checked_at >= self.reload_interval:
+            self._refresh_in_background()
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return []
+        self.lookups += 1
+        feeds = self._index.lookup(address)
+        if feeds:
+            self.hits += 1
+        return feeds
+
+    def stats(self) -> Dict[str, Any]:
+        index = self._index
+        return {
+            "feeds": len(self.feeds),
+            "nodes": len(index.trie.left) if index is not None else 0,
+            "mapped": index is not None and index._buf is not None,
+            "reloads": self.reloads,
+            "lookups": self.lookups,
+            "hits": self.hits,
+        }
@@ -1,14 +1,29 @@
 from __future__ import annotations
 
-from typing import Any, Dict
-
-import requests
+from typing import TYPE_CHECKING, Any, Dict
 
 from ...config import SETTINGS
+from . import Provider
+
+if TYPE_CHECKING:
+    import httpx
 
 
-def lookup_ip(session: requests.Session, ip: str, timeout: float) -> Dict[str, Any]:
-    url = f"https://otx.alienvault.com/api/v1/indicators/IPv4/{ip}/general"
-    r = session.get(url, headers={"X-OTX-API-KEY": SETTINGS.otx_api_key}, timeout=timeout)
+async def lookup_ip(client: httpx.AsyncClient, ip: str, timeout: float) -> Dict[str, Any]:
+    section = "IPv6" if ":" in ip else "IPv4"
+    url = f"{SETTINGS.otx_base_url.rstrip('/')}/api/v1/indicators/{section}/{ip}/general"
+    r = await client.get(url, headers={"X-OTX-API-KEY": SETTINGS.otx_api_key}, timeout=timeout)
     r.raise_for_status()
     return r.json()
+
+
+def summarize(data: Dict[str, Any]) -> Dict[str, int]:
+    return {"pulses": len(data.get("pulse_info", {}).get("pulses", []))}
+
+
+def vote(summary: Dict[str, int]) -> int:
+    pulses = summary["pulses"]
+    return min(30, 10 + pulses) if pulses else 0
+
+
+PROVIDER = Provider("otx", "otx", lookup_ip, summarize, vote, max_vote=30)
@@ -1,14 +1,32 @@
 from __future__ import annotations
 
-from typing import Any, Dict
-
-import requests
+from typing import TYPE_CHECKING, Any, Dict
 
 from ...config import SETTINGS
+from . import Provider
+
+if TYPE_CHECKING:
+    import httpx
 
 
-def lookup_ip(session: requests.Session, ip: str, timeout: float) -> Dict[str, Any]:
-    url = f"https://www.virustotal.com/api/v3/ip_addresses/{ip}"
-    r = session.get(url, headers={"x-apikey": SETTINGS.vt_api_key}, timeout=timeout)
+async def lookup_ip(client: httpx.AsyncClient, ip: str, timeout: float) -> Dict[str, Any]:
+    url = f"{SETTINGS.vt_base_url.rstrip('/')}/api/v3/ip_addresses/{ip}"
+    r = await client.get(url, headers={"x-apikey": SETTINGS.vt_api_key}, timeout=timeout)
     r.raise_for_status()
     return r.json()
+
+
+def summarize(data: Dict[str, Any]) -> Dict[str, int]:
+    stats = data.get("data", {}).get("attributes", {}).get("last_analysis_stats", {})
+    return {
+        "malicious": int(stats.get("malicious", 0)),
+        "suspicious": int(stats.get("suspicious", 0)),
+    }
+
+
+def vote(summary: Dict[str, int]) -> int:
+    flagged = summary["malicious"] + summary["suspicious"]
+    return min(40, 5 * flagged) if flagged else 0
+
+
+PROVIDER = Provider("virustotal", "vt", lookup_ip, summarize, vote, max_vote=40)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class TokenBucket:
+    """Per-provider request limiter with a daily budget.
+
+    Tokens refill continuously at ``rate_per_min``; ``rate_per_min <= 0``
+    disables the per-minute limit and ``daily_budget <= 0`` the daily cap.
+    Waiting callers are served highest priority first, and callers below
+    ``reserve_priority`` may not spend the last ``reserve`` fraction of the
+    daily budget, which is kept for likely HIGH events.
+
+    Waiters poll instead of parking on an ``asyncio.Condition`` so one bucket
+    can be shared by every event loop in the process.
+    """
+
+    def __init__(
+        self,
+        rate_per_min: float,
+        daily_budget: int = 0,
+        reserve: float = 0.0,
+        reserve_priority: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+        wallclock: Callable[[], float] = time.time,
+    ):
+        self.rate = rate_per_min / 60.0
+        self.capacity = float(max(1, math.ceil(rate_per_min)))
+        self.daily_budget = daily_budget
+        self.reserve = reserve
+        self.reserve_priority = reserve_priority
+        self._clock = clock
+        self._wallclock = wallclock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._day = self._today()
+        self._used_today = 0
+        self._waiters: List[List[Any]] = []
+        self._seq = itertools.count()
+        self.granted = 0
+        self.rejected = 0
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0 and self.daily_budget <= 0
+
+    def _today(self) -> int:
+        return int(self._wallclock() // 86400)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        if self.rate > 0:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        day = self._today()
+        if day != self._day:
+            self._day, self._used_today = day, 0
+
+    def _budget_left(self, priority: int) -> bool:
+        if self.daily_budget <= 0:
+            return True
+        limit = self.daily_budget
+        if priority < self.reserve_priority:
+            limit = int(self.daily_budget * (1.0 - self.reserve))
+        return self._used_today < limit
+
+    def _take(self) -> None:
+        if self.rate > 0:
+            self._tokens -= 1
+        self._used_today += 1
+        self.granted += 1
+
+    async def acquire(self, priority: int = 0, max_wait: float = 0.0) -> bool:
+        """Take one request slot, waiting up to ``max_wait`` seconds.
+
+        Returns ``False`` when the daily budget is spent or no slot freed up
+        in time; the caller should then skip the lookup.
+        """
+        if self.unlimited:
+            return True
+        self._refill()
+        if not self._budget_left(priority):
+            self.rejected += 1
+            return False
+        if not self._waiters and (self.rate <= 0 or self._tokens >= 1):
+            self._take()
+            return True
+
+        deadline = self._clock() + max_wait
+        entry = [-priority, next(self._seq)]
+        heapq.heappush(self._waiters, entry)
+        try:
+            while True:
+                self._refill()
+                if not self._budget_left(priority):
+                    break
+                if self._waiters[0] is entry and self._tokens >= 1:
+                    self._take()
+                    return True
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    break
+                until_token = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.01
+                await asyncio.sleep(min(remaining, max(0.01, until_token)))
+        finally:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+        self.rejected += 1
+        return False
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        self._refill()
+        return {
+            "rate_per_min": self.rate * 60 if self.rate > 0 else None,
+            "tokens": round(self._tokens, 2) if self.rate > 0 else None,
+            "daily_budget": self.daily_budget or None,
+            "used_today": self._used_today,
+            "waiting": len(self._waiters),
+            "granted": self.granted,
+            "rejected": self.rejected,
+        }
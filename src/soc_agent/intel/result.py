@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+# Provider summary fields, in the order they appear in rendered results.
+SUMMARY_FIELDS: Tuple[str, ...] = ("pulses", "malicious", "suspicious", "abuse_confidence")
+
+
+class IntelResult:
+    """Enrichment of one indicator, reduced to what scoring and summaries use.
+
+    Provider responses are boiled down to OTX pulse counts, VirusTotal
+    malicious/suspicious engine counts and the AbuseIPDB confidence score;
+    fields stay ``None`` when the provider was not asked or failed. ``errors``
+    maps provider names to why they gave no data, and ``skipped`` names the
+    providers lazy enrichment did not ask because their answer could not
+    change the verdict. The untouched provider JSON is only kept in ``raw``
+    when ``intel_verbosity`` is ``full``.
+
+    Results are cached and shared between requests: treat them as read-only.
+    """
+
+    __slots__ = (
+        "indicator",
+        "score",
+        "labels",
+        "pulses",
+        "malicious",
+        "suspicious",
+        "abuse_confidence",
+        "feeds",
+        "errors",
+        "raw",
+        "skipped",
+    )
+
+    def __init__(
+        self,
+        indicator: str,
+        score: int = 0,
+        labels: Sequence[str] = (),
+        pulses: Optional[int] = None,
+        malicious: Optional[int] = None,
+        suspicious: Optional[int] = None,
+        abuse_confidence: Optional[int] = None,
+        feeds: Sequence[str] = (),
+        errors: Optional[Dict[str, str]] = None,
+        raw: Optional[Dict[str, Any]] = None,
+        skipped: Sequence[str] = (),
+    ):
+        self.indicator = indicator
+        self.score = score
+        self.labels = tuple(labels)
+        self.pulses = pulses
+        self.malicious = malicious
+        self.suspicious = suspicious
+        self.abuse_confidence = abuse_confidence
+        self.feeds = tuple(feeds)
+        self.errors = errors or None
+        self.raw = raw
+        self.skipped = tuple(skipped)
+
+    @property
+    def partial(self) -> bool:
+        return self.errors is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style access, so results and plain dicts can be read alike."""
+        if key == "partial":
+            return self.partial
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def to_dict(self, verbosity: str = "summary") -> Dict[str, Any]:
+        """Render for responses and storage; ``full`` adds the raw provider JSON."""
+        out: Dict[str, Any] = {
+            "indicator": self.indicator,
+            "score": self.score,
+            "labels": list(self.labels),
+        }
+        for field in SUMMARY_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                out[field] = value
+        if self.feeds:
+            out["feeds"] = list(self.feeds)
+        if self.errors:
+            out["errors"] = dict(self.errors)
+            out["partial"] = True
+            out["missing"] = list(self.errors)
+        if self.skipped:
+            out["skipped"] = list(self.skipped)
+        if verbosity == "full" and self.raw is not None:
+            out["sources"] = self.raw
+        return out
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "IntelResult":
+        return cls(
+            data["indicator"],
+            data.get("score", 0),
+            data.get("labels", ()),
+            *(data.get(field) for field in SUMMARY_FIELDS),
+            feeds=data.get("feeds", ()),
+            errors=data.get("errors"),
+            raw=data.get("sources"),
+            skipped=data.get("skipped", ()),
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, IntelResult):
+            return NotImplemented
+        return all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"IntelResult({self.to_dict()!r})"
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+
+class ProviderStats:
+    """Rolling latency, error rate and usefulness of one intel provider.
+
+    Each is an exponentially weighted moving average, with weight ``alpha``
+    for the newest sample: ``latency`` over lookups that reached the
+    provider, ``error_rate`` over the same lookups, and ``win_rate`` over
+    the lookups it answered, counting the ones where its vote was the
+    winning ``max(votes)``. Until a provider has been seen its win rate is
+    assumed to be one half.
+    """
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.win_rate = 0.5
+        self.calls = 0
+        self.errors = 0
+        self.answered = 0
+        self.wins = 0
+        self.skipped = 0
+
+    def record(self, seconds: float, ok: bool) -> None:
+        if self.calls == 0:
+            self.latency = seconds
+        else:
+            self.latency += self.alpha * (seconds - self.latency)
+        self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+        self.calls += 1
+        self.errors += not ok
+
+    def record_vote(self, won: bool) -> None:
+        self.win_rate += self.alpha * (float(won) - self.win_rate)
+        self.answered += 1
+        self.wins += won
+
+    def value(self) -> float:
+        """Winning answers per second spent waiting; unmeasured providers rank first."""
+        if self.calls == 0:
+            return float("inf")
+        return (1.0 - self.error_rate) * self.win_rate / max(self.latency, 0.001)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "latency_ms": round(self.latency * 1000, 1),
+            "error_rate": round(self.error_rate, 4),
+            "win_rate": round(self.win_rate, 4),
+            "value": round(self.value(), 3) if self.calls else None,
+            "calls": self.calls,
+            "errors": self.errors,
+            "answered": self.answered,
+            "wins": self.wins,
+            "skipped": self.skipped,
+        }
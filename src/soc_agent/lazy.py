@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+import threading
+import weakref
+from typing import Any, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+_per_process: "weakref.WeakSet[Lazy[Any]]" = weakref.WeakSet()
+
+
+class Lazy(Generic[T]):
+    """Module-level singleton that is built on first use.
+
+    Attribute reads and writes are forwarded to the object returned by
+    ``factory``, which is called the first time the proxy is used rather than
+    when the module defining it is imported. With ``per_process`` (the
+    default) a forked child drops the parent's object and builds its own, so
+    pre-forked workers never share sessions, locks or threads created before
+    the fork.
+    """
+
+    def __init__(self, factory: Callable[[], T], per_process: bool = True):
+        object.__setattr__(self, "_lazy_factory", factory)
+        object.__setattr__(self, "_lazy_target", None)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+        if per_process:
+            _per_process.add(self)
+
+    def _lazy_get(self) -> T:
+        target = self._lazy_target
+        if target is None:
+            with self._lazy_lock:
+                target = self._lazy_target
+                if target is None:
+                    target = self._lazy_factory()
+                    self._lazy_bind(target)
+        return target
+
+    def _lazy_bind(self, target: T) -> None:
+        object.__setattr__(self, "_lazy_target", target)
+
+    def _lazy_reset(self) -> None:
+        object.__setattr__(self, "_lazy_target", None)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_lazy_"):
+            raise AttributeError(name)
+        return getattr(self._lazy_get(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._lazy_get(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._lazy_get(), name)
+
+    def __repr__(self) -> str:
+        if self._lazy_target is None:
+            return f"<Lazy {getattr(self._lazy_factory, '__qualname__', self._lazy_factory)}>"
+        return repr(self._lazy_target)
+
+
+class LazySettings(Lazy[T]):
+    """``Lazy`` for a pydantic settings object, with plain-attribute reads.
+
+    Settings are read on every request, so once built their field values are
+    copied onto the proxy itself and reads no longer go through
+    ``__getattr__``. Assignments (e.g. ``monkeypatch`` in tests) update both.
+    Settings come from the environment and are not rebuilt after a fork.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        super().__init__(factory, per_process=False)
+
+    def _lazy_bind(self, target: T) -> None:
+        self.__dict__.update(target.__dict__)
+        super()._lazy_bind(target)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._lazy_get(), name, value)
+        self.__dict__[name] = value
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._lazy_get(), name)
+        self.__dict__.pop(name, None)
+
+
+def is_loaded(obj: Any) -> bool:
+    """Whether ``obj`` has been built in this process (always true for non-proxies)."""
+    return not isinstance(obj, Lazy) or obj._lazy_target is not None
+
+
+def _reset_after_fork() -> None:
+    for proxy in list(_per_process):
+        proxy._lazy_reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
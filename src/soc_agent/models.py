@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -18,3 +18,13 @@ class EventIn(BaseModel):
     model_config = {
         "extra": "allow"
     }
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style field access, so scoring helpers take models and dicts alike."""
+        if key in type(self).model_fields:
+            return getattr(self, key)
+        return (self.model_extra or {}).get(key, default)
+
+
+# A validated event, or a plain dict with the same keys.
+Event = Union[EventIn, Dict[str, Any]]
@@ -1,17 +1,104 @@
 from __future__ import annotations
 
 import smtplib
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from email.message import EmailMessage
-from typing import Tuple
+from typing import Callable, List, Optional, Tuple
 
 from .config import SETTINGS
+from .lazy import Lazy
 
 
-def send_email(subject: str, body: str, subtype: str = "plain") -> Tuple[bool, str]:
+def email_unavailable() -> Optional[str]:
+    """Return why email cannot be sent, or ``None`` if it can."""
     if not SETTINGS.enable_email:
-        return False, "Email disabled"
+        return "Email disabled"
     if not (SETTINGS.smtp_host and SETTINGS.email_from and SETTINGS.email_to):
-        return False, "Email not configured"
+        return "Email not configured"
+    return None
+
+
+class SmtpSender:
+    """Long-lived SMTP connection shared by every sender thread.
+
+    The connection (and its STARTTLS/login handshake) is reused across
+    messages and re-established when the relay drops it or it has been idle
+    for longer than ``smtp_idle_timeout`` seconds.
+    """
+
+    def __init__(self):
+        self._conn: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.sent = 0
+
+    def _open(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(SETTINGS.smtp_host, SETTINGS.smtp_port, timeout=10)
+        try:
+            if SETTINGS.smtp_starttls:
+                conn.starttls()
+            if SETTINGS.smtp_username and SETTINGS.smtp_password:
+                conn.login(SETTINGS.smtp_username, SETTINGS.smtp_password)
+        except Exception:
+            conn.close()
+            raise
+        self.connects += 1
+        return conn
+
+    def _close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+    def send(self, msg: EmailMessage) -> None:
+        with self._lock:
+            if self._conn is not None and (
+                time.monotonic() - self._last_used > SETTINGS.smtp_idle_timeout
+            ):
+                self._close()
+            for attempt in (1, 2):
+                if self._conn is None:
+                    self._conn = self._open()
+                try:
+                    self._conn.send_message(msg)
+                except OSError as e:
+                    if isinstance(e, smtplib.SMTPException) and not isinstance(
+                        e, smtplib.SMTPServerDisconnected
+                    ):
+                        # The relay refused this message (e.g. a bad recipient);
+                        # the connection is still good and resending would not help.
+                        self._last_used = time.monotonic()
+                        raise
+                    # A pooled connection may have been dropped by the relay;
+                    # retry once on a fresh one.
+                    self._close()
+                    if attempt == 2:
+                        raise
+                    continue
+                self._last_used = time.monotonic()
+                self.sent += 1
+                return
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+
+smtp_sender: SmtpSender = Lazy(SmtpSender)
+
+
+def send_email(subject: str, body: str, subtype: str = "plain") -> Tuple[bool, str]:
+    reason = email_unavailable()
+    if reason:
+        return False, reason
 
     msg = EmailMessage()
     msg["From"] = SETTINGS.email_from
@@ -20,11 +107,80 @@ def send_email(subject: str, body: str, subtype: str = "plain") -> Tuple[bool, s
     msg.set_content(body, subtype=subtype)
 
     try:
-        with smtplib.SMTP(SETTINGS.smtp_host, SETTINGS.smtp_port, timeout=10) as s:
-            s.starttls()
-            if SETTINGS.smtp_username and SETTINGS.smtp_password:
-                s.login(SETTINGS.smtp_username, SETTINGS.smtp_password)
-            s.send_message(msg)
+        smtp_sender.send(msg)
         return True, "sent"
     except Exception as exc:
         return False, str(exc)
+
+
+class EmailDigest:
+    """Merge alert emails raised within ``window`` seconds into one message.
+
+    Alerts are grouped by source and category in the digest body, and each
+    alert keeps its full subject and body. A digest is handed to ``sink`` as
+    ``sink(batch_id, subject, body)`` when the window closes or ``max_items``
+    alerts have been collected.
+    """
+
+    def __init__(
+        self,
+        window: float,
+        max_items: int,
+        sink: Callable[[str, str, str], None],
+    ):
+        self.window = window
+        self.max_items = max_items
+        self.sink = sink
+        self._lock = threading.Lock()
+        self._batch_id: Optional[str] = None
+        self._opened_at = 0.0
+        self._items: List[Tuple[str, str, str, str]] = []
+        self._timer: Optional[threading.Timer] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def add(self, source: Optional[str], category: str, subject: str, body: str) -> str:
+        """Add an alert to the open digest and return the digest id."""
+        with self._lock:
+            if self._batch_id is None:
+                self._batch_id = uuid.uuid4().hex
+                self._opened_at = time.time()
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            batch_id = self._batch_id
+            self._items.append((source or "unknown", category, subject, body))
+            full = len(self._items) >= self.max_items
+        if full:
+            self.flush()
+        return batch_id
+
+    def flush(self) -> Optional[str]:
+        """Send the open digest now; returns its id, or ``None`` if empty."""
+        with self._lock:
+            if self._batch_id is None:
+                return None
+            batch_id, items, opened_at = self._batch_id, self._items, self._opened_at
+            if self._timer is not None:
+                self._timer.cancel()
+            self._batch_id, self._items, self._timer = None, [], None
+        subject, body = self._render(items, opened_at)
+        self.sink(batch_id, subject, body)
+        return batch_id
+
+    @staticmethod
+    def _render(items: List[Tuple[str, str, str, str]], opened_at: float) -> Tuple[str, str]:
+        groups: "OrderedDict[Tuple[str, str], List[Tuple[str, str]]]" = OrderedDict()
+        for source, category, subject, body in items:
+            groups.setdefault((source, category), []).append((subject, body))
+        started = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(opened_at))
+        subject = f"[DIGEST] {len(items)} alerts since {started}"
+        lines = [f"{len(items)} alerts since {started}", ""]
+        for (source, category), alerts in groups.items():
+            lines.append(f"== {source} / {category} ({len(alerts)}) ==")
+            for alert_subject, alert_body in alerts:
+                lines += ["", f"--- {alert_subject} ---", alert_body]
+            lines.append("")
+        return subject, "\n".join(lines)
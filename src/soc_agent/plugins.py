@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import importlib
+import logging
+import threading
+from importlib import metadata
+from typing import Any, Dict, List, Mapping, Optional
+
+log = logging.getLogger(__name__)
+
+
+def load_object(spec: str) -> Any:
+    """Import ``"package.module:attr"`` and return ``attr``."""
+    module, _, attr = spec.partition(":")
+    obj: Any = importlib.import_module(module)
+    for part in filter(None, attr.split(".")):
+        obj = getattr(obj, part)
+    return obj
+
+
+class Registry:
+    """Named plugins from an entry-point group, imported on first use.
+
+    ``builtins`` maps names to ``"module:attr"`` specs for the plugins that
+    ship with the package, in priority order; they are registered here as
+    well as in ``pyproject.toml`` so they work without an installed
+    distribution. Other packages add plugins by declaring entry points in
+    ``group``; an entry point named like a built-in replaces it. Neither the
+    entry-point metadata nor any plugin module is read until a plugin is
+    asked for, and each plugin is imported once.
+    """
+
+    def __init__(self, group: str, builtins: Mapping[str, str]):
+        self.group = group
+        self.builtins = dict(builtins)
+        self._specs: Optional[Dict[str, Any]] = None
+        self._loaded: Dict[str, Any] = {}
+        self._all: Optional[List[Any]] = None
+        self._lock = threading.Lock()
+
+    def _discover(self) -> Dict[str, Any]:
+        if self._specs is None:
+            specs: Dict[str, Any] = dict(self.builtins)
+            try:
+                found = metadata.entry_points(group=self.group)
+            except Exception as e:  # pragma: no cover - broken site-packages metadata
+                log.warning("could not read %s entry points: %s", self.group, e)
+                found = ()
+            for ep in sorted(found, key=lambda ep: ep.name):
+                if specs.get(ep.name) != ep.value:
+                    specs[ep.name] = ep
+            self._specs = specs
+        return self._specs
+
+    def names(self) -> List[str]:
+        return list(self._discover())
+
+    def register(self, name: str, plugin: Any) -> None:
+        """Add (or replace) a plugin object directly, e.g. from tests."""
+        with self._lock:
+            self._discover()[name] = plugin
+            self._loaded[name] = plugin
+            self._all = None
+
+    def get(self, name: str) -> Any:
+        plugin = self._loaded.get(name)
+        if plugin is not None:
+            return plugin
+        with self._lock:
+            if name not in self._loaded:
+                spec = self._discover()[name]
+                if isinstance(spec, str):
+                    plugin = load_object(spec)
+                elif isinstance(spec, metadata.EntryPoint):
+                    plugin = spec.load()
+                else:
+                    plugin = spec
+                self._loaded[name] = plugin
+            return self._loaded[name]
+
+    def all(self) -> List[Any]:
+        """Every plugin, built-ins first; plugins that fail to import are skipped."""
+        plugins = self._all
+        if plugins is None:
+            plugins = []
+            for name in self.names():
+                try:
+                    plugins.append(self.get(name))
+                except Exception as e:
+                    log.error("could not load %s plugin %r: %s", self.group, name, e)
+            self._all = plugins
+        return plugins
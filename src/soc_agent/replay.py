@@ -0,0 +1,506 @@
+"""Offline replay of archived alerts through the scoring pipeline.
+
+Archives (NDJSON, optionally gzip/bz2/xz compressed) are streamed line by
+line, cut into chunks and scored in a process pool with the same
+``normalize_event`` -> ``EventIn`` -> ``enrich_and_score_batch`` path the
+webhook uses. Results are written in input order to NDJSON or Parquet.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bz2
+import gzip
+import json
+import lzma
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import IO, Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+
+from .adapters import normalize_event
+from .analyzer import enrich_and_score_batch
+from .config import SETTINGS
+from .correlation import correlator
+from .intel import intel_client
+from .intel.disk_cache import SqliteIntelCache
+from .models import EventIn
+
+_OPENERS: Dict[str, Callable[..., IO[bytes]]] = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+}
+
+# One chunk of input: (source path, number of lines before it, raw lines)
+Chunk = Tuple[str, int, List[bytes]]
+
+
+def open_input(path: str) -> IO[bytes]:
+    """Open ``path`` for streaming, decompressing by file suffix."""
+    if path == "-":
+        return sys.stdin.buffer
+    opener = _OPENERS.get(os.path.splitext(path)[1].lower(), open)
+    return opener(path, "rb")
+
+
+def read_chunks(paths: List[str], done: Dict[str, int], chunk_size: int) -> Iterator[Chunk]:
+    """Yield chunks of at most ``chunk_size`` lines, skipping the first
+    ``done[path]`` lines of each input (already processed by an earlier run).
+    """
+    for path in paths:
+        skip = done.get(path, 0)
+        with open_input(path) as f:
+            offset = 0
+            lines: List[bytes] = []
+            for line in f:
+                if offset < skip:
+                    offset += 1
+                    continue
+                lines.append(line)
+                if len(lines) >= chunk_size:
+                    yield path, offset, lines
+                    offset += len(lines)
+                    lines = []
+            if lines:
+                yield path, offset, lines
+
+
+# --- worker side ---------------------------------------------------------
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _init_worker(intel_cache: Optional[str], workers: int) -> None:
+    """Prepare a pool process (or the main process when running inline)."""
+    global _loop
+    # Correlation windows follow arrival time, which means nothing when an
+    # archive is replayed at full speed across processes.
+    correlator.window = 0
+    if intel_cache:
+        intel_client.disk_cache = SqliteIntelCache(intel_cache, SETTINGS.ioc_cache_compact_interval)
+    # Every process has its own buckets; split the provider quotas between them.
+    for bucket in intel_client.rate_limiters.values():
+        bucket.rate /= workers
+        bucket.capacity = max(1.0, bucket.capacity / workers)
+        bucket._tokens = min(bucket._tokens, bucket.capacity)
+        if bucket.daily_budget > 0:
+            bucket.daily_budget = max(1, bucket.daily_budget // workers)
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+
+
+def parse_lines(
+    lines: Iterable[Tuple[Dict[str, Any], bytes]],
+) -> Tuple[List[Dict[str, Any]], List[Tuple[int, EventIn]]]:
+    """Decode, normalize and validate ``(record, line)`` pairs.
+
+    Every record is returned; the ones that fail get an ``error``. The valid
+    events come back with the index of their record, ready for scoring.
+    """
+    records: List[Dict[str, Any]] = []
+    payloads: List[Tuple[int, EventIn]] = []
+    for record, line in lines:
+        records.append(record)
+        try:
+            event = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            record["error"] = f"Invalid JSON: {e}"
+            continue
+        if not isinstance(event, dict):
+            record["error"] = "Invalid payload: expected an object"
+            continue
+        try:
+            payload = EventIn.model_validate(normalize_event(event))
+        except Exception as e:
+            record["error"] = f"Invalid payload: {e}"
+            continue
+        payloads.append((len(records) - 1, payload))
+    return records, payloads
+
+
+def score_chunk(
+    source: str, offset: int, lines: List[bytes], keep_events: bool = False
+) -> Tuple[List[Dict[str, Any]], Dict[int, EventIn]]:
+    """Parse, validate and score one chunk.
+
+    Returns one record per non-blank line, either with an ``analysis`` or an
+    ``error``, and (with ``keep_events``) the validated events by record index.
+    """
+    records, payloads = parse_lines(
+        ({"source": source, "line": number}, line)
+        for number, line in enumerate(lines, offset + 1)
+        if line.strip()
+    )
+    if payloads:
+        analyses = _loop.run_until_complete(
+            enrich_and_score_batch([payload for _, payload in payloads])
+        )
+        for (index, _), analysis in zip(payloads, analyses):
+            records[index]["analysis"] = analysis
+    return records, (dict(payloads) if keep_events else {})
+
+
+# --- output --------------------------------------------------------------
+
+
+class NdjsonWriter:
+    """Appends one JSON object per line; the position is the file size."""
+
+    def __init__(self, path: str, position: int = 0):
+        self.path = path
+        if position:
+            size = os.path.getsize(path) if os.path.exists(path) else None
+            if size is None or size < position:
+                raise ValueError(
+                    f"{path} is missing or shorter than the checkpointed {position} bytes;"
+                    " rerun with --restart"
+                )
+        self._f = open(path, "r+b" if position else "wb")
+        self._f.truncate(position)
+        self._f.seek(position)
+        self._position = position
+
+    def write(self, records: List[Dict[str, Any]]) -> bool:
+        self._f.write(b"".join(orjson.dumps(r) + b"\n" for r in records))
+        self._f.flush()
+        self._position = self._f.tell()
+        return True
+
+    def sync(self) -> None:
+        os.fsync(self._f.fileno())
+
+    def position(self) -> int:
+        return self._position
+
+    def close(self) -> None:
+        self.sync()
+        self._f.close()
+
+
+class ParquetWriter:
+    """Writes ``part-NNNNN.parquet`` files of ``rows_per_part`` rows into a
+    directory; the position is the number of complete parts.
+
+    Parquet files cannot be appended to, so rows are buffered and a
+    checkpoint is only durable once their part has been written.
+    """
+
+    def __init__(self, path: str, position: int = 0, rows_per_part: int = 100000):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow: pip install 'soc-agent[parquet]'")
+        self.path = path
+        self.rows_per_part = rows_per_part
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            # Parts written after the last checkpoint are redone.
+            if name.startswith("part-") and int(name[5:10]) >= position:
+                os.remove(os.path.join(path, name))
+        self.parts = position
+        self._rows: List[Dict[str, Any]] = []
+
+    def write(self, records: List[Dict[str, Any]]) -> bool:
+        self._rows.extend(records)
+        if len(self._rows) < self.rows_per_part:
+            return False
+        self._flush()
+        return True
+
+    def _flush(self) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns: Dict[str, List[Any]] = {
+            "source": [],
+            "line": [],
+            "error": [],
+            "category": [],
+            "score_base": [],
+            "score_intel": [],
+            "score_final": [],
+            "recommended_action": [],
+            "analysis": [],
+        }
+        for row in self._rows:
+            analysis = row.get("analysis")
+            scores = analysis["scores"] if analysis else {}
+            columns["source"].append(row["source"])
+            columns["line"].append(row["line"])
+            columns["error"].append(row.get("error"))
+            columns["category"].append(analysis and analysis["category"])
+            columns["score_base"].append(scores.get("base"))
+            columns["score_intel"].append(scores.get("intel"))
+            columns["score_final"].append(scores.get("final"))
+            columns["recommended_action"].append(analysis and analysis["recommended_action"])
+            columns["analysis"].append(orjson.dumps(analysis).decode() if analysis else None)
+        name = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+        tmp = name + ".tmp"
+        pq.write_table(pa.table(columns), tmp)
+        _fsync_path(tmp)
+        os.replace(tmp, name)
+        self.parts += 1
+        self._rows = []
+
+    def sync(self) -> None:
+        # Each part is synced before its rename; this makes the renames durable.
+        _fsync_path(self.path)
+
+    def position(self) -> int:
+        return self.parts
+
+    def close(self) -> None:
+        if self._rows:
+            self._flush()
+        self.sync()
+
+
+def _fsync_path(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _open_writer(fmt: str, path: str, position: int):
+    if fmt == "parquet":
+        return ParquetWriter(path, position)
+    return NdjsonWriter(path, position)
+
+
+# --- checkpoint ----------------------------------------------------------
+
+
+class Checkpoint:
+    """Progress of one run: lines consumed per input and the output position.
+
+    Saved atomically after output that is known to be on disk, so a resumed
+    run neither skips nor duplicates records.
+    """
+
+    def __init__(self, path: str, output: str, fmt: str):
+        self.path = path
+        self.output = output
+        self.format = fmt
+        self.inputs: Dict[str, int] = {}
+        self.position = 0
+        self.records = 0
+        self.errors = 0
+        self.done = False
+
+    @classmethod
+    def load(cls, path: str, output: str, fmt: str) -> "Checkpoint":
+        checkpoint = cls(path, output, fmt)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                state = json.load(f)
+            if state.get("output") != output or state.get("format") != fmt:
+                raise ValueError(f"{path} belongs to a replay into {state.get('output')}")
+            checkpoint.inputs = state["inputs"]
+            checkpoint.position = state["position"]
+            checkpoint.records = state["records"]
+            checkpoint.errors = state["errors"]
+            checkpoint.done = state.get("done", False)
+        return checkpoint
+
+    def save(self) -> None:
+        state = {
+            "output": self.output,
+            "format": self.format,
+            "inputs": self.inputs,
+            "position": self.position,
+            "records": self.records,
+            "errors": self.errors,
+            "done": self.done,
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        _fsync_path(os.path.dirname(os.path.abspath(self.path)))
+
+
+# --- driver --------------------------------------------------------------
+
+
+def actions_runner() -> Tuple[Callable[[EventIn, Dict[str, Any]], Dict[str, Any]], Callable]:
+    # Imported lazily: only replays with --actions need the notifiers.
+    from .autotask import ticket_coalescer
+    from .dispatch import dispatcher
+    from .notifiers import smtp_sender
+    from .webapp import _run_actions, email_digest
+
+    def shutdown() -> None:
+        email_digest.flush()
+        ticket_coalescer.flush_all()
+        dispatcher.shutdown()
+        # Tickets delivered while draining may have buffered more repeat-alert notes.
+        if ticket_coalescer.flush_all():
+            dispatcher.shutdown()
+        smtp_sender.close()
+
+    return _run_actions, shutdown
+
+
+def replay(
+    inputs: List[str],
+    output: str,
+    fmt: str = "ndjson",
+    workers: int = 1,
+    chunk_size: int = 500,
+    checkpoint_path: Optional[str] = None,
+    restart: bool = False,
+    intel_cache: Optional[str] = None,
+    actions: bool = False,
+) -> Dict[str, Any]:
+    """Score every event in ``inputs`` and write the results to ``output``.
+
+    ``workers`` processes score chunks of ``chunk_size`` lines; ``workers=0``
+    scores in this process. Progress is checkpointed to ``checkpoint_path``
+    (default ``<output>.checkpoint.json``) and picked up again by the next
+    run unless ``restart`` is set. Returns run statistics.
+    """
+    checkpoint_path = checkpoint_path or f"{output.rstrip('/')}.checkpoint.json"
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = Checkpoint.load(checkpoint_path, output, fmt)
+    writer = _open_writer(fmt, output, checkpoint.position)
+    run_actions = shutdown = None
+    if actions:
+        run_actions, shutdown = actions_runner()
+
+    temp_cache = None
+    if intel_cache is None:
+        intel_cache = SETTINGS.ioc_cache_path
+    if not intel_cache and workers > 1:
+        # Pool processes still share lookups within this run.
+        fd, temp_cache = tempfile.mkstemp(prefix="soc-replay-", suffix=".sqlite")
+        os.close(fd)
+        intel_cache = temp_cache
+
+    categories: Counter = Counter()
+    pending_inputs: Dict[str, int] = dict(checkpoint.inputs)
+    started = time.perf_counter()
+    processed = 0
+
+    def consume(chunk: Chunk, records: List[Dict[str, Any]], events: Dict[int, EventIn]) -> None:
+        nonlocal processed
+        source, offset, lines = chunk
+        for index, record in enumerate(records):
+            analysis = record.get("analysis")
+            if analysis is None:
+                checkpoint.errors += 1
+                continue
+            categories[analysis["category"]] += 1
+            if run_actions is not None:
+                record["actions"] = run_actions(events[index], analysis)
+        processed += len(records)
+        checkpoint.records += len(records)
+        pending_inputs[source] = offset + len(lines)
+        if writer.write(records):
+            writer.sync()
+            checkpoint.inputs = dict(pending_inputs)
+            checkpoint.position = writer.position()
+            checkpoint.save()
+
+    chunks = read_chunks(inputs, checkpoint.inputs, chunk_size)
+    try:
+        if workers <= 0:
+            saved = correlator.window, intel_client.disk_cache
+            _init_worker(intel_cache, 1)
+            try:
+                for chunk in chunks:
+                    consume(chunk, *score_chunk(*chunk, keep_events=actions))
+            finally:
+                _loop.run_until_complete(intel_client.aclose())
+                _loop.close()
+                asyncio.set_event_loop(None)
+                correlator.window, intel_client.disk_cache = saved
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(intel_cache, workers)
+            ) as pool:
+                window: Deque[Tuple[Chunk, Future]] = deque()
+                for chunk in chunks:
+                    window.append((chunk, pool.submit(score_chunk, *chunk, keep_events=actions)))
+                    if len(window) >= 2 * workers:
+                        done_chunk, future = window.popleft()
+                        consume(done_chunk, *future.result())
+                while window:
+                    done_chunk, future = window.popleft()
+                    consume(done_chunk, *future.result())
+        writer.close()  # syncs the remaining output
+        checkpoint.inputs = dict(pending_inputs)
+        checkpoint.position = writer.position()
+        checkpoint.done = True
+        checkpoint.save()
+    finally:
+        if shutdown is not None:
+            shutdown()
+        if temp_cache is not None:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(temp_cache + suffix):
+                    os.remove(temp_cache + suffix)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "records": processed,
+        "errors": checkpoint.errors,
+        "total_records": checkpoint.records,
+        "categories": dict(categories),
+        "seconds": round(elapsed, 3),
+        "events_per_second": round(processed / elapsed, 1) if elapsed > 0 else None,
+        "checkpoint": checkpoint_path,
+    }
+
+
+def add_parser(subparsers: Any) -> None:
+    parser = subparsers.add_parser(
+        "replay",
+        help="score archived alerts offline",
+        description="Replay NDJSON alert archives (.gz/.bz2/.xz or - for stdin) "
+        "through normalization, enrichment and scoring.",
+    )
+    parser.add_argument("inputs", nargs="+", help="archive files, in order")
+    parser.add_argument("-o", "--output", required=True, help="NDJSON file or Parquet directory")
+    parser.add_argument("--format", choices=("ndjson", "parquet"), help="default: by --output")
+    parser.add_argument(
+        "-j", "--workers", type=int, default=os.cpu_count() or 1, help="0 = in-process"
+    )
+    parser.add_argument("--chunk-size", type=int, default=500, help="lines per work unit")
+    parser.add_argument("--checkpoint", help="default: <output>.checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument(
+        "--intel-cache", help="SQLite intel cache shared by the workers (default IOC_CACHE_PATH)"
+    )
+    parser.add_argument(
+        "--actions", action="store_true", help="create tickets/emails (off by default)"
+    )
+    parser.set_defaults(func=_run)
+
+
+def _run(args: argparse.Namespace) -> int:
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "ndjson")
+    stats = replay(
+        args.inputs,
+        args.output,
+        fmt=fmt,
+        workers=args.workers,
+        chunk_size=max(1, args.chunk_size),
+        checkpoint_path=args.checkpoint,
+        restart=args.restart,
+        intel_cache=args.intel_cache,
+        actions=args.actions,
+    )
+    print(json.dumps(stats), file=sys.stderr)
+    return 0
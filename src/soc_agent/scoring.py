@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .config import SETTINGS
+from .lazy import Lazy
+from .models import Event
+
+# NumPy is only needed for columnar batch scoring (the "vector" extra) and is
+# imported by ``_require_numpy`` the first time a batch is scored.
+np: Any = None
+
+# The built-in rules. A SCORING_RULES_PATH file uses the same layout.
+DEFAULT_RULES: Dict[str, Any] = {
+    "severity": {"weight": 6, "max": 100},
+    "event_types": {
+        "auth_failed": 15,
+        "multiple_auth_failed": 25,
+        "malware_detected": 40,
+        "ransomware": 60,
+        "port_scan": 15,
+        "bruteforce": 35,
+        "geo_anomaly": 20,
+        "privilege_escalation": 50,
+        "lateral_movement": 45,
+        "exfil": 55,
+    },
+    "conditions": [
+        {"field": "raw.fail_count", "op": "step", "every": 5, "points": 3, "max": 20},
+        {"field": "raw.geo", "op": "in", "values": ["RU", "KP", "IR", "CN"], "points": 10},
+        {"field": "raw.new_admin_user", "op": "truthy", "points": 25},
+    ],
+    "max_score": 100,
+}
+
+# Operators whose field is read as an integer (``int(value or 0)``).
+_NUMERIC_OPS = frozenset({"step", "gte"})
+_OPS = _NUMERIC_OPS | {"in", "truthy"}
+
+
+class _Condition:
+    """One compiled ``conditions`` row: a field, an operator and its points."""
+
+    __slots__ = ("field", "raw_key", "op", "points", "every", "cap", "threshold", "values")
+
+    def __init__(self, spec: Mapping[str, Any]):
+        field = spec.get("field")
+        if not isinstance(field, str) or not field:
+            raise ValueError(f"condition needs a field: {spec!r}")
+        op = spec.get("op")
+        if op not in _OPS:
+            raise ValueError(f"unknown operator {op!r} for {field}")
+        self.field = field
+        # "raw.<key>" reads the vendor payload; anything else is a top-level field.
+        self.raw_key = field[4:] if field.startswith("raw.") else None
+        self.op = op
+        self.points = int(spec.get("points", 0))
+        self.every = int(spec.get("every", 1))
+        self.cap = int(spec["max"]) if spec.get("max") is not None else None
+        self.threshold = int(spec.get("value", 0))
+        self.values = frozenset(spec.get("values", ()))
+        if op == "step" and self.every <= 0:
+            raise ValueError(f"step condition on {field} needs every > 0")
+
+    def read(self, event: Event, raw: Mapping[str, Any]) -> Any:
+        return event.get(self.field) if self.raw_key is None else raw.get(self.raw_key)
+
+    def compile(self) -> Callable[[Any], int]:
+        """Return a function scoring one field value, specialized for the operator."""
+        points, every, cap = self.points, self.every, self.cap
+        threshold, values = self.threshold, self.values
+        if self.op == "in":
+            return lambda value: points if value in values else 0
+        if self.op == "truthy":
+            return lambda value: points if value else 0
+        if self.op == "gte":
+            return lambda value: points if int(value or 0) >= threshold else 0
+
+        def step(value: Any) -> int:
+            number = int(value or 0)
+            if number < every:
+                return 0
+            total = points * (number // every)
+            return total if cap is None else min(cap, total)
+
+        return step
+
+    def score_column(self, column: Any) -> Any:
+        op = self.op
+        if op == "in":
+            if column.dtype.kind in "Uiubf":
+                hit = np.isin(column, list(self.values))
+            else:
+                hit = np.fromiter((v in self.values for v in column), bool, len(column))
+            return np.where(hit, self.points, 0)
+        if op == "truthy":
+            if column.dtype.kind in "iubf":
+                hit = column != 0
+            else:
+                hit = np.fromiter((bool(v) for v in column), bool, len(column))
+            return np.where(hit, self.points, 0)
+        numbers = _int_column(column)
+        if op == "gte":
+            return np.where(numbers >= self.threshold, self.points, 0)
+        points = self.points * (numbers // self.every)
+        if self.cap is not None:
+            points = np.minimum(self.cap, points)
+        return np.where(numbers >= self.every, points, 0)
+
+
+def _int_column(column: Any) -> Any:
+    if column.dtype.kind in "iub":
+        return column.astype(np.int64, copy=False)
+    return np.fromiter((int(v or 0) for v in column), np.int64, len(column))
+
+
+class RuleSet:
+    """Base-score rules compiled into a decision table.
+
+    ``rules`` has the layout of ``DEFAULT_RULES``: a capped per-point
+    severity weight, a table of event-type weights, and ``conditions`` that
+    add points from event or ``raw.*`` fields. Operators are ``step``
+    (``points`` per ``every`` units, at most ``max``), ``gte`` (``points``
+    once the field reaches ``value``), ``in`` (field is one of ``values``)
+    and ``truthy``. The total is capped at ``max_score``.
+
+    ``score`` rates one event. ``score_columns`` rates a columnar batch with
+    NumPy and gives the same results.
+    """
+
+    def __init__(self, rules: Mapping[str, Any]):
+        severity = rules.get("severity", {})
+        self.severity_weight = int(severity.get("weight", 0))
+        self.severity_max = int(severity.get("max", 100))
+        self.event_types: Dict[str, int] = {
+            str(name).lower(): int(weight) for name, weight in rules.get("event_types", {}).items()
+        }
+        self.conditions: Tuple[_Condition, ...] = tuple(
+            _Condition(spec) for spec in rules.get("conditions", ())
+        )
+        self.max_score = int(rules.get("max_score", 100))
+        # The decision table proper: (key, compiled check) rows per source.
+        self._event_checks = [(c.field, c.compile()) for c in self.conditions if c.raw_key is None]
+        self._raw_checks = [(c.raw_key, c.compile()) for c in self.conditions if c.raw_key]
+
+    @classmethod
+    def load(cls, path: str) -> "RuleSet":
+        with open(path, "rb") as f:
+            return cls(json.load(f))
+
+    @property
+    def fields(self) -> List[str]:
+        """Column names ``score_columns`` reads."""
+        names = ["event_type", "severity"]
+        names.extend(c.field for c in self.conditions if c.field not in names)
+        return names
+
+    def score(self, event: Event) -> int:
+        sev = int(event.get("severity") or 0)
+        score = min(self.severity_max, sev * self.severity_weight)
+        score += self.event_types.get((event.get("event_type") or "").lower(), 0)
+        for field, check in self._event_checks:
+            score += check(event.get(field))
+        if self._raw_checks:
+            raw = event.get("raw") or {}
+            if isinstance(raw, dict):
+                for key, check in self._raw_checks:
+                    score += check(raw.get(key))
+            else:
+                for _, check in self._raw_checks:
+                    score += check(None)
+        return min(self.max_score, score)
+
+    def columns(self, events: Sequence[Event]) -> Dict[str, Any]:
+        """Build the columns ``score_columns`` expects from ``events``."""
+        _require_numpy()
+        count = len(events)
+        raws = []
+        for event in events:
+            raw = event.get("raw") or {}
+            raws.append(raw if isinstance(raw, dict) else {})
+        columns = {
+            "event_type": np.array([(e.get("event_type") or "") for e in events], dtype=str),
+            "severity": np.fromiter((int(e.get("severity") or 0) for e in events), np.int64, count),
+        }
+        for condition in self.conditions:
+            if condition.field in columns:
+                continue
+            values = [condition.read(e, raw) for e, raw in zip(events, raws)]
+            if condition.op in _NUMERIC_OPS:
+                columns[condition.field] = np.fromiter(
+                    (int(v or 0) for v in values), np.int64, count
+                )
+            else:
+                column = np.empty(count, dtype=object)
+                column[:] = values
+                columns[condition.field] = column
+        return columns
+
+    def score_columns(self, columns: Mapping[str, Any]) -> Any:
+        """Score a batch given as ``{field: array}``; returns an int64 array.
+
+        Fields are named as in the rules (``severity``, ``raw.geo``...).
+        Event types are matched once per distinct value, not once per row.
+        """
+        _require_numpy()
+        severity = _int_column(np.asarray(columns["severity"]))
+        scores = np.minimum(self.severity_max, severity * self.severity_weight)
+        types = np.asarray(columns["event_type"])
+        if types.dtype.kind != "U":
+            types = np.array([(t or "") for t in types], dtype=str)
+        distinct, index = np.unique(types, return_inverse=True)
+        weights = np.array([self.event_types.get(t.lower(), 0) for t in distinct], np.int64)
+        scores = scores + weights[index.reshape(-1)]
+        for condition in self.conditions:
+            scores = scores + condition.score_column(np.asarray(columns[condition.field]))
+        return np.minimum(self.max_score, scores)
+
+    def score_batch(self, events: Sequence[Event]) -> List[int]:
+        if not events:
+            return []
+        return self.score_columns(self.columns(events)).tolist()
+
+
+def _require_numpy() -> None:
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - exercised only without the extra
+            raise RuntimeError(
+                "columnar scoring needs NumPy: pip install 'soc-agent[vector]'"
+            ) from None
+        np = numpy
+
+
+def load_rules(path: Optional[str]) -> RuleSet:
+    return RuleSet.load(path) if path else RuleSet(DEFAULT_RULES)
+
+
+RULES: RuleSet = Lazy(lambda: load_rules(SETTINGS.scoring_rules_path), per_process=False)
@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+from .config import SETTINGS
+from .lazy import Lazy
+from .models import Event, EventIn
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    source TEXT,
+    event_type TEXT,
+    category TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    analysis TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_ts ON analyses (ts);
+CREATE INDEX IF NOT EXISTS analyses_source_ts ON analyses (source, ts);
+CREATE INDEX IF NOT EXISTS analyses_category_ts ON analyses (category, ts);
+CREATE TABLE IF NOT EXISTS analysis_indicators (
+    indicator TEXT NOT NULL,
+    ts REAL NOT NULL,
+    analysis_id INTEGER NOT NULL,
+    PRIMARY KEY (indicator, ts, analysis_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS analysis_indicators_ts ON analysis_indicators (ts);
+"""
+
+# Rows deleted per statement during retention, so readers are never blocked long.
+_COMPACT_CHUNK = 5000
+
+# ``(ts, event, analysis)`` waiting for the writer.
+_Pending = Tuple[float, Event, Dict[str, Any]]
+
+
+def _encode_cursor(ts: float, row_id: int) -> str:
+    return f"{ts!r}:{row_id}"
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    ts, _, row_id = cursor.partition(":")
+    try:
+        return float(ts), int(row_id)
+    except ValueError:
+        raise ValueError(f"invalid cursor {cursor!r}")
+
+
+class AnalysisStore:
+    """SQLite history of every analysis, searchable by indicator, source,
+    category and time.
+
+    :meth:`record` only appends to an in-memory buffer; a writer thread
+    started on first use inserts the buffer in one transaction once it holds
+    ``batch_size`` analyses or ``flush_interval`` seconds after the first
+    one arrived, so storing adds next to nothing to request latency. At most
+    ``max_pending`` analyses are buffered; beyond that new ones are dropped
+    and counted. The same thread deletes analyses older than
+    ``retention_days`` every ``compact_interval`` seconds and returns the
+    freed pages to the file system. The database runs in WAL mode, so
+    queries (and other worker processes) are not blocked by the writer.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        retention_days: float = 30,
+        compact_interval: float = 3600,
+        max_pending: int = 50000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.compact_interval = compact_interval
+        self.max_pending = max_pending
+        self._clock = clock
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending: List[_Pending] = []
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self.written = 0
+        self.dropped = 0
+        self.compacted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so they are keyed by pid too.
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._local.conn = self._connect()
+            self._local.pid = pid
+        return self._local.conn
+
+    def record(self, event: Event, analysis: Dict[str, Any]) -> None:
+        """Queue one analysis for storage; never blocks on the database."""
+        if not self.enabled:
+            return
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending.append((self._clock(), event, analysis))
+            if not self._running:
+                self._start()
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def _start(self) -> None:
+        # Called with ``_cond`` held.
+        self._running = True
+        self._thread = threading.Thread(target=self._work, name="analysis-store", daemon=True)
+        self._thread.start()
+
+    def _work(self) -> None:
+        next_compact = time.monotonic() + self.compact_interval
+        while True:
+            with self._cond:
+                if not self._pending and self._running:
+                    timeout = None
+                    if self.retention_days > 0 and self.compact_interval > 0:
+                        timeout = max(0.0, next_compact - time.monotonic())
+                    self._cond.wait(timeout)
+                if 0 < len(self._pending) < self.batch_size and self._running:
+                    # Give a burst the chance to fill the batch.
+                    self._cond.wait(self.flush_interval)
+                running = self._running
+            try:
+                self.flush()
+                if self.retention_days > 0 and 0 < self.compact_interval:
+                    if time.monotonic() >= next_compact:
+                        self.compact()
+                        next_compact = time.monotonic() + self.compact_interval
+            except sqlite3.Error as e:
+                log.warning("analysis store write failed: %s", e)
+                if running:
+                    # e.g. "database is locked": back off before retrying the batch.
+                    with self._cond:
+                        self._cond.wait(self.flush_interval)
+            if not running:
+                return
+
+    def flush(self) -> int:
+        """Write every buffered analysis now and return how many there were.
+
+        If the write fails the analyses go back to the front of the buffer,
+        as far as ``max_pending`` allows; the rest are counted as dropped.
+        """
+        with self._write_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            if batch:
+                try:
+                    self._insert(batch)
+                except sqlite3.Error:
+                    with self._cond:
+                        keep = max(0, self.max_pending - len(self._pending))
+                        self.dropped += max(0, len(batch) - keep)
+                        self._pending[:0] = batch[:keep]
+                    raise
+            return len(batch)
+
+    def _insert(self, batch: List[_Pending]) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            for ts, event, analysis in batch:
+                if isinstance(event, EventIn):
+                    fields = event.model_dump(exclude={"raw"})
+                else:
+                    fields = {k: v for k, v in event.items() if k != "raw"}
+                row_id = conn.execute(
+                    "INSERT INTO analyses"
+                    " (ts, source, event_type, category, score, event, analysis)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        ts,
+                        fields.get("source"),
+                        fields.get("event_type"),
+                        analysis["category"],
+                        analysis["scores"]["final"],
+                        orjson.dumps(fields, default=str).decode(),
+                        orjson.dumps(analysis, default=str).decode(),
+                    ),
+                ).lastrowid
+                indicators = {i for values in analysis["iocs"].values() for i in values}
+                conn.executemany(
+                    "INSERT OR IGNORE INTO analysis_indicators (indicator, ts, analysis_id)"
+                    " VALUES (?, ?, ?)",
+                    [(indicator, ts, row_id) for indicator in indicators],
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.written += len(batch)
+
+    def query(
+        self,
+        indicator: Optional[str] = None,
+        source: Optional[str] = None,
+        category: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Stored analyses matching every given filter, newest first.
+
+        ``since``/``until`` are Unix times. Pass the returned ``next`` back as
+        ``cursor`` for the following page; it is ``None`` on the last page.
+        """
+        if indicator is not None:
+            sql = (
+                "SELECT a.id, a.ts, a.event, a.analysis FROM analysis_indicators i"
+                " JOIN analyses a ON a.id = i.analysis_id WHERE i.indicator = ?"
+            )
+            params: List[Any] = [indicator]
+            ts_col, id_col = "i.ts", "i.analysis_id"
+        else:
+            sql = "SELECT a.id, a.ts, a.event, a.analysis FROM analyses a WHERE 1"
+            params = []
+            ts_col, id_col = "a.ts", "a.id"
+        if source is not None:
+            sql += " AND a.source = ?"
+            params.append(source)
+        if category is not None:
+            sql += " AND a.category = ?"
+            params.append(category.upper())
+        if since is not None:
+            sql += f" AND {ts_col} >= ?"
+            params.append(since)
+        if until is not None:
+            sql += f" AND {ts_col} < ?"
+            params.append(until)
+        if cursor:
+            sql += f" AND ({ts_col}, {id_col}) < (?, ?)"
+            params.extend(_decode_cursor(cursor))
+        sql += f" ORDER BY {ts_col} DESC, {id_col} DESC LIMIT ?"
+        params.append(limit + 1)
+
+        rows = self._conn().execute(sql, params).fetchall()
+        items = [
+            {
+                "id": row_id,
+                "ts": ts,
+                "event": orjson.loads(event),
+                "analysis": orjson.loads(analysis),
+            }
+            for row_id, ts, event, analysis in rows[:limit]
+        ]
+        more = len(rows) > limit
+        return {
+            "items": items,
+            "next": _encode_cursor(items[-1]["ts"], items[-1]["id"]) if more else None,
+        }
+
+    def compact(self) -> int:
+        """Delete analyses past the retention period and return how many were removed."""
+        if self.retention_days <= 0:
+            return 0
+        cutoff = self._clock() - self.retention_days * 86400
+        conn = self._conn()
+        with self._write_lock:
+            removed = self._delete_chunked(
+                conn,
+                "DELETE FROM analyses WHERE id IN (SELECT id FROM analyses WHERE ts < ? LIMIT ?)",
+                cutoff,
+            )
+            self._delete_chunked(
+                conn,
+                "DELETE FROM analysis_indicators WHERE (indicator, ts, analysis_id) IN"
+                " (SELECT indicator, ts, analysis_id FROM analysis_indicators"
+                " WHERE ts < ? LIMIT ?)",
+                cutoff,
+            )
+            if removed:
+                conn.execute("PRAGMA incremental_vacuum")
+                conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        self.compacted += removed
+        return removed
+
+    @staticmethod
+    def _delete_chunked(conn: sqlite3.Connection, sql: str, cutoff: float) -> int:
+        removed = 0
+        while True:
+            count = conn.execute(sql, (cutoff, _COMPACT_CHUNK)).rowcount or 0
+            removed += count
+            if count < _COMPACT_CHUNK:
+                return removed
+
+    def close(self) -> None:
+        """Stop the writer thread after it has written everything buffered."""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._running = False
+            self._cond.notify()
+        if thread is not None:
+            thread.join()
+        if self.enabled:
+            self.flush()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and getattr(self._local, "pid", None) == os.getpid():
+            conn.close()
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "enabled": self.enabled,
+            "pending": pending,
+            "written": self.written,
+            "dropped": self.dropped,
+            "compacted": self.compacted,
+        }
+
+
+def _build_store() -> AnalysisStore:
+    return AnalysisStore(
+        SETTINGS.analysis_store_path,
+        batch_size=SETTINGS.analysis_store_batch,
+        flush_interval=SETTINGS.analysis_store_flush_interval,
+        retention_days=SETTINGS.analysis_retention_days,
+        compact_interval=SETTINGS.analysis_compact_interval,
+    )
+
+
+analysis_store: AnalysisStore = Lazy(_build_store)
@@ -0,0 +1,377 @@
+"""Pull-mode ingestion from a local Wazuh ``alerts.json``.
+
+When the agent runs on the Wazuh manager it can read alerts straight from
+the file instead of receiving them over HTTP. The file is read in large
+chunks, cut into lines and scored in batches through the same
+``normalize_event`` -> ``EventIn`` -> ``enrich_and_score_batch`` path the
+webhook uses; recommended actions are queued as for webhook events. After
+each batch the byte offset reached is checkpointed durably, so a restarted
+tailer continues exactly after the last alert it handled.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .analyzer import enrich_and_score_batch
+from .lazy import is_loaded
+from .metrics import EVENTS
+from .models import EventIn
+from .replay import NdjsonWriter, actions_runner, parse_lines
+from .store import analysis_store
+
+log = logging.getLogger(__name__)
+
+# (st_dev, st_ino): which file an offset belongs to, across renames.
+FileId = Tuple[int, int]
+
+
+def _file_id(st: os.stat_result) -> FileId:
+    return st.st_dev, st.st_ino
+
+
+class FileTailer:
+    """Follow ``path`` like ``tail -F``, returning whole lines with their offsets.
+
+    New data is read ``chunk_bytes`` at a time. At end of file the path is
+    checked: if it now names a different file (rotated by rename) the rest
+    of the old file has already been read and reading continues at the
+    start of the new one; if the file shrank (``copytruncate``) reading
+    restarts at offset 0. A partial last line is only returned once its
+    newline arrives, or when its file has been rotated away.
+    """
+
+    def __init__(self, path: str, chunk_bytes: int = 1 << 20):
+        self.path = path
+        self.chunk_bytes = max(4096, chunk_bytes)
+        self.file_id: Optional[FileId] = None
+        # Offset just after the last returned line, in the file ``file_id``.
+        self.offset = 0
+        self.rotations = 0
+        self._fd: Optional[int] = None
+        self._buf = bytearray()
+        self._start = 0
+
+    def open(self, file_id: Optional[FileId] = None, offset: int = 0, at_end: bool = False) -> None:
+        """Start reading at ``offset`` of the file identified by ``file_id``.
+
+        If ``path`` no longer is that file, or is briefly missing during
+        rotation, the rotated copy next to it (``alerts.json.1``...) is
+        drained first. Without ``file_id`` reading starts at the beginning,
+        or at the end with ``at_end``. Raises ``FileNotFoundError`` when
+        there is nothing to open yet.
+        """
+        path = self.path
+        try:
+            current: Optional[FileId] = _file_id(os.stat(path))
+        except FileNotFoundError:
+            current = None
+        if file_id is not None and current != file_id:
+            path = self._find_rotated(file_id)
+            if path is None and current is None:
+                raise FileNotFoundError(self.path)
+            if path is None:
+                log.warning("%s was rotated away; starting at its replacement", self.path)
+                file_id, offset = None, 0
+        fd = os.open(path, os.O_RDONLY)
+        st = os.fstat(fd)
+        if file_id is None:
+            offset = st.st_size if at_end else 0
+        elif st.st_size < offset:
+            log.warning("%s shrank below the checkpoint; reading it from the start", path)
+            offset = 0
+        os.lseek(fd, offset, os.SEEK_SET)
+        self._switch(fd, _file_id(st), offset)
+
+    def _find_rotated(self, file_id: FileId) -> Optional[str]:
+        for candidate in sorted(glob.glob(glob.escape(self.path) + ".*")):
+            try:
+                if _file_id(os.stat(candidate)) == file_id:
+                    return candidate
+            except OSError:
+                continue
+        return None
+
+    def _switch(self, fd: int, file_id: FileId, offset: int) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd, self.file_id, self.offset = fd, file_id, offset
+        self._buf, self._start = bytearray(), 0
+
+    def _rotated(self) -> Optional[str]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None  # renamed but not recreated yet
+        if _file_id(st) != self.file_id:
+            return "replaced"
+        if os.fstat(self._fd).st_size < self.offset + len(self._buf) - self._start:
+            return "truncated"
+        return None
+
+    def read_lines(self, max_lines: int) -> List[Tuple[int, bytes]]:
+        """Up to ``max_lines`` complete ``(offset, line)`` pairs, all from one file."""
+        lines: List[Tuple[int, bytes]] = []
+        buf = self._buf
+        while len(lines) < max_lines:
+            end = buf.find(b"\n", self._start)
+            if end >= 0:
+                lines.append((self.offset, bytes(buf[self._start : end + 1])))
+                self.offset += end + 1 - self._start
+                self._start = end + 1
+                continue
+            del buf[: self._start]
+            self._start = 0
+            chunk = os.read(self._fd, self.chunk_bytes)
+            if chunk:
+                buf += chunk
+                continue
+            if lines:
+                break
+            rotation = self._rotated()
+            if rotation is None:
+                break
+            if buf:
+                # The writer has moved on, so the unterminated tail is final.
+                lines.append((self.offset, bytes(buf)))
+                self.offset += len(buf)
+                del buf[:]
+                break
+            self.rotations += 1
+            if rotation == "replaced":
+                fd = os.open(self.path, os.O_RDONLY)
+                self._switch(fd, _file_id(os.fstat(fd)), 0)
+                buf = self._buf
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                self.offset = 0
+        return lines
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class TailCheckpoint:
+    """Which file the tailer was reading, how far, and the output position.
+
+    Written with fsync and an atomic rename after every batch, once the
+    batch's results and actions have been handed off and its analyses are
+    in the analysis store.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file_id: Optional[FileId] = None
+        self.offset = 0
+        self.position = 0
+        self.records = 0
+        self.errors = 0
+
+    @classmethod
+    def load(cls, path: str) -> "TailCheckpoint":
+        checkpoint = cls(path)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                state = json.load(f)
+            checkpoint.file_id = tuple(state["file_id"])
+            checkpoint.offset = state["offset"]
+            checkpoint.position = state.get("position", 0)
+            checkpoint.records = state.get("records", 0)
+            checkpoint.errors = state.get("errors", 0)
+        return checkpoint
+
+    def save(self) -> None:
+        state = {
+            "file_id": list(self.file_id) if self.file_id else None,
+            "offset": self.offset,
+            "position": self.position,
+            "records": self.records,
+            "errors": self.errors,
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        directory = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+
+async def follow(
+    path: str,
+    checkpoint_path: Optional[str] = None,
+    output: Optional[str] = None,
+    batch_size: int = 500,
+    chunk_bytes: int = 1 << 20,
+    interval: float = 1.0,
+    from_start: bool = False,
+    actions: bool = True,
+    once: bool = False,
+    stop: Optional[asyncio.Event] = None,
+) -> Dict[str, Any]:
+    """Score alerts appended to ``path`` until ``stop`` is set.
+
+    Lines are scored ``batch_size`` at a time. Results are appended to the
+    NDJSON ``output`` when given and actions are queued unless ``actions``
+    is off. Progress is checkpointed to ``checkpoint_path`` (default
+    ``<path>.checkpoint.json``). Without a checkpoint reading starts at the
+    end of the file, or at the beginning with ``from_start``. With ``once``
+    it returns as soon as it has caught up. Returns run statistics.
+    """
+    checkpoint_path = checkpoint_path or f"{path}.checkpoint.json"
+    checkpoint = TailCheckpoint.load(checkpoint_path)
+    tailer = FileTailer(path, chunk_bytes)
+
+    async def idle() -> None:
+        if stop is None:
+            await asyncio.sleep(interval)
+        else:
+            try:
+                await asyncio.wait_for(stop.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    while True:
+        try:
+            if checkpoint.file_id is None:
+                tailer.open(at_end=not from_start)
+            else:
+                tailer.open(checkpoint.file_id, checkpoint.offset)
+            break
+        except FileNotFoundError:
+            # alerts.json is briefly missing while Wazuh rotates it.
+            if once or (stop is not None and stop.is_set()):
+                raise
+            log.info("%s does not exist yet; waiting for it", path)
+            await idle()
+    writer = NdjsonWriter(output, checkpoint.position) if output else None
+    run_actions: Optional[Callable[[EventIn, Dict[str, Any]], Dict[str, Any]]] = None
+    shutdown = None
+    if actions:
+        run_actions, shutdown = actions_runner()
+
+    categories: Counter = Counter()
+    processed = errors = 0
+    started = time.perf_counter()
+    try:
+        while stop is None or not stop.is_set():
+            lines = tailer.read_lines(batch_size)
+            if lines:
+                records, payloads = parse_lines(
+                    ({"source": path, "offset": offset}, line)
+                    for offset, line in lines
+                    if line.strip()
+                )
+                if payloads:
+                    analyses = await enrich_and_score_batch([payload for _, payload in payloads])
+                    for (index, payload), analysis in zip(payloads, analyses):
+                        records[index]["analysis"] = analysis
+                        EVENTS.inc(category=analysis["category"])
+                        categories[analysis["category"]] += 1
+                        analysis_store.record(payload, analysis)
+                        if run_actions is not None:
+                            records[index]["actions"] = run_actions(payload, analysis)
+                if writer is not None and records:
+                    writer.write(records)
+                    writer.sync()
+                    checkpoint.position = writer.position()
+                processed += len(records)
+                errors += len(records) - len(payloads)
+                checkpoint.records += len(records)
+                checkpoint.errors += len(records) - len(payloads)
+                if payloads and analysis_store.enabled:
+                    # The store only buffers; never checkpoint past unwritten analyses.
+                    analysis_store.flush()
+            if (tailer.file_id, tailer.offset) != (checkpoint.file_id, checkpoint.offset):
+                checkpoint.file_id, checkpoint.offset = tailer.file_id, tailer.offset
+                checkpoint.save()
+            if lines:
+                continue
+            if once:
+                break
+            await idle()
+    finally:
+        tailer.close()
+        if writer is not None:
+            writer.close()
+        if shutdown is not None:
+            shutdown()
+        if is_loaded(analysis_store):
+            analysis_store.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "records": processed,
+        "errors": errors,
+        "total_records": checkpoint.records,
+        "categories": dict(categories),
+        "rotations": tailer.rotations,
+        "offset": checkpoint.offset,
+        "seconds": round(elapsed, 3),
+        "checkpoint": checkpoint_path,
+    }
+
+
+def add_parser(subparsers: Any) -> None:
+    parser = subparsers.add_parser(
+        "tail",
+        help="ingest a local Wazuh alerts.json",
+        description="Follow a Wazuh alerts.json (across rotation and truncation) and score "
+        "new alerts in batches, checkpointing the byte offset reached.",
+    )
+    parser.add_argument("path", help="e.g. /var/ossec/logs/alerts/alerts.json")
+    parser.add_argument("--checkpoint", help="default: <path>.checkpoint.json")
+    parser.add_argument("-o", "--output", help="also append results to this NDJSON file")
+    parser.add_argument("--batch-size", type=int, default=500, help="alerts scored together")
+    parser.add_argument("--chunk-bytes", type=int, default=1 << 20, help="read size")
+    parser.add_argument("--interval", type=float, default=1.0, help="poll interval when idle")
+    parser.add_argument(
+        "--from-start", action="store_true", help="without a checkpoint, read existing alerts"
+    )
+    parser.add_argument("--no-actions", action="store_true", help="score only")
+    parser.add_argument("--once", action="store_true", help="exit once caught up")
+    parser.set_defaults(func=_run)
+
+
+def _run(args: argparse.Namespace) -> int:
+    from .logging import setup_json_logging
+
+    setup_json_logging()
+
+    async def main() -> Dict[str, Any]:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        return await follow(
+            args.path,
+            checkpoint_path=args.checkpoint,
+            output=args.output,
+            batch_size=max(1, args.batch_size),
+            chunk_bytes=args.chunk_bytes,
+            interval=args.interval,
+            from_start=args.from_start,
+            actions=not args.no_actions,
+            once=args.once,
+            stop=stop,
+        )
+
+    stats = asyncio.run(main())
+    print(json.dumps(stats), file=sys.stderr)
+    return 0
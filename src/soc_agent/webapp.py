@@ -1,28 +1,82 @@
 from __future__ import annotations
 
 import json
-
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from importlib import metadata
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+import orjson
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from .adapters import normalize_event
-from .analyzer import enrich_and_score
-from .autotask import create_autotask_ticket
+from .admission import Overloaded, admission
+from .analyzer import base_score, enrich_and_score, enrich_and_score_batch
+from .autotask import (
+    autotask_unavailable,
+    create_autotask_ticket,
+    ticket_coalescer,
+    ticket_correlation_key,
+)
 from .config import SETTINGS
+from .correlation import correlator
+from .dispatch import QueueFull, dispatcher
+from .intel import intel_client
+from .lazy import Lazy, is_loaded
 from .logging import setup_json_logging
+from .metrics import EVENTS, IN_FLIGHT, REGISTRY, STAGE_SECONDS
 from .models import EventIn
-from .notifiers import send_email
+from .notifiers import EmailDigest, email_unavailable, send_email, smtp_sender
 from .security import WebhookAuth
+from .store import analysis_store
 
 try:
     VERSION = metadata.version("soc_agent")
 except metadata.PackageNotFoundError:  # pragma: no cover - fallback for non-installed package
     VERSION = "0.0.0"
 
-app = FastAPI(title="SOC Agent – Webhook Analyzer", version=VERSION)
-setup_json_logging()
+
+class ORJSONResponse(JSONResponse):
+    """``JSONResponse`` encoded with orjson.
+
+    orjson writes the same compact UTF-8 as Starlette's stdlib encoder, in a
+    fraction of the time for large analyses.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_json_logging()
+    yield
+    # Singletons are built on first use; only shut down the ones this worker used.
+    if is_loaded(intel_client):
+        await intel_client.aclose()
+    if is_loaded(email_digest):
+        email_digest.flush()
+    if is_loaded(ticket_coalescer):
+        ticket_coalescer.flush_all()
+    if is_loaded(dispatcher):
+        dispatcher.shutdown()
+        # Tickets delivered while draining may have buffered more repeat-alert notes.
+        if is_loaded(ticket_coalescer) and ticket_coalescer.flush_all():
+            dispatcher.shutdown()
+    if is_loaded(smtp_sender):
+        smtp_sender.close()
+    if is_loaded(analysis_store):
+        analysis_store.close()
+
+
+app = FastAPI(
+    title="SOC Agent – Webhook Analyzer",
+    version=VERSION,
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 
 @app.get("/")
@@ -40,11 +94,107 @@ def readyz():
     return {"status": "ready"}
 
 
-@app.post("/webhook")
-async def webhook(req: Request):
-    body = await req.body()
+def _collect_runtime() -> Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]:
+    cache = intel_client.cache_stats()
+    yield (
+        "soc_intel_cache_lookups_total",
+        "counter",
+        "In-memory IOC cache lookups by result.",
+        [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])],
+    )
+    yield ("soc_intel_cache_hit_ratio", "gauge", "IOC cache hit ratio.", [({}, cache["hit_ratio"])])
+    yield ("soc_intel_cache_entries", "gauge", "IOC cache entries.", [({}, cache["size"])])
+    yield (
+        "soc_action_queue_depth",
+        "gauge",
+        "Actions queued or waiting for a retry.",
+        [({}, dispatcher.pending())],
+    )
+    breakers = intel_client.breaker_stats()
+    yield (
+        "soc_intel_breaker_open",
+        "gauge",
+        "1 while a provider's circuit breaker refuses calls.",
+        [({"provider": name}, int(b["state"] != "closed")) for name, b in breakers.items()],
+    )
+    yield (
+        "soc_intel_breaker_trips_total",
+        "counter",
+        "Times a provider's circuit breaker opened.",
+        [({"provider": name}, b["trips"]) for name, b in breakers.items()],
+    )
+    providers = intel_client.provider_stats()
+    yield (
+        "soc_intel_provider_latency_ewma_seconds",
+        "gauge",
+        "Moving average of each provider's lookup latency.",
+        [({"provider": name}, p["latency_ms"] / 1000) for name, p in providers.items()],
+    )
+    yield (
+        "soc_intel_provider_win_rate",
+        "gauge",
+        "Moving average of how often a provider's vote is the winning intel score.",
+        [({"provider": name}, p["win_rate"]) for name, p in providers.items()],
+    )
+    adm = admission.stats()
+    yield ("soc_admission_active", "gauge", "Requests running the pipeline.", [({}, adm["active"])])
+    yield ("soc_admission_queued", "gauge", "Requests queued for admission.", [({}, adm["queued"])])
+    yield (
+        "soc_admission_rejected_total",
+        "counter",
+        "Requests turned away with 429 by reason.",
+        [({"reason": reason}, count) for reason, count in adm["rejected"].items()],
+    )
+    stored = analysis_store.stats()
+    yield (
+        "soc_analysis_store_pending",
+        "gauge",
+        "Analyses buffered for the result store.",
+        [({}, stored["pending"])],
+    )
+    yield (
+        "soc_analysis_store_dropped_total",
+        "counter",
+        "Analyses not stored because the buffer was full.",
+        [({}, stored["dropped"])],
+    )
+    corr = correlator.stats()
+    yield ("soc_correlation_keys", "gauge", "Tracked correlation keys.", [({}, corr["keys"])])
+    yield (
+        "soc_correlation_escalations_total",
+        "counter",
+        "Events escalated to an aggregate type.",
+        [({}, corr["escalations"])],
+    )
+
+
+REGISTRY.add_collector(_collect_runtime)
+
 
-    # Optional shared-secret or HMAC verification
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/intel/cache")
+def intel_cache_stats():
+    return intel_client.cache_stats()
+
+
+@app.get("/intel/quotas")
+def intel_quotas():
+    return intel_client.rate_limit_stats()
+
+
+@app.get("/intel/providers")
+def intel_providers():
+    return intel_client.provider_stats()
+
+
+def _authenticate(req: Request, body: bytes) -> None:
+    """Optional shared-secret or HMAC verification."""
     if SETTINGS.webhook_shared_secret:
         provided = req.headers.get("X-Webhook-Secret")
         if not WebhookAuth.verify_shared_secret(provided, SETTINGS.webhook_shared_secret):
@@ -56,22 +206,8 @@ async def webhook(req: Request):
         ):
             raise HTTPException(status_code=401, detail="Invalid HMAC signature")
 
-    try:
-        event = json.loads(body.decode("utf-8"))
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid JSON")
-
-    # Normalize vendor payloads first
-    normalized = normalize_event(event)
-
-    # Validate normalized payload
-    try:
-        payload = EventIn.model_validate(normalized)
-    except Exception as e:
-        raise HTTPException(status_code=422, detail=f"Invalid payload: {e}")
-
-    result = enrich_and_score(payload.model_dump())
 
+def _summarize(payload: EventIn, result: Dict[str, Any]) -> Tuple[str, str]:
     title = (
         f"[{result['category']}] {payload.event_type or 'event'} – {payload.source or 'unknown'}"
     )
@@ -92,14 +228,289 @@ async def webhook(req: Request):
         label = ",".join(ipinfo.get("labels", []))
         scr = ipinfo.get("score", 0)
         summary_lines.append(f"Intel: {ipinfo['indicator']} -> {label} (score {scr})")
-    body_out = "\n".join(summary_lines)
+    return title, "\n".join(summary_lines)
+
+
+def _queue_action(kind: str, unavailable: Optional[str], handler, **kwargs) -> Dict[str, Any]:
+    if unavailable:
+        return {"status": "skipped", "message": unavailable}
+    try:
+        action_id = dispatcher.submit(kind, handler, **kwargs)
+    except QueueFull as e:
+        return {"id": str(e), "status": "dead_letter", "message": "Action queue full"}
+    return {"id": action_id, "status": "queued"}
+
+
+def _primary_ioc(payload: EventIn, result: Dict[str, Any]) -> Optional[str]:
+    if payload.ip:
+        return payload.ip
+    ips = result["iocs"].get("ips") or []
+    return ips[0] if ips else payload.username
+
+
+def _deliver_digest(batch_id: str, subject: str, body: str) -> None:
+    try:
+        dispatcher.submit(
+            "email_digest", send_email, action_id=batch_id, subject=subject, body=body
+        )
+    except QueueFull:
+        pass  # already dead-lettered by the dispatcher
+
 
+email_digest: EmailDigest = Lazy(
+    lambda: EmailDigest(SETTINGS.email_digest_window, SETTINGS.email_digest_max, _deliver_digest)
+)
+
+
+def _run_actions(payload: EventIn, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Queue the recommended action for background delivery."""
+    title, body_out = _summarize(payload, result)
     actions = {}
     if result["recommended_action"] == "ticket":
-        ok, msg, resp = create_autotask_ticket(title=title, description=body_out)
-        actions["autotask_ticket"] = {"ok": ok, "message": msg, "response": resp}
+        actions["autotask_ticket"] = _queue_action(
+            "autotask_ticket",
+            autotask_unavailable(),
+            create_autotask_ticket,
+            title=title,
+            description=body_out,
+            correlation_key=ticket_correlation_key(
+                payload.event_type, payload.source, _primary_ioc(payload, result)
+            ),
+        )
     elif result["recommended_action"] == "email":
-        ok, msg = send_email(subject=title, body=body_out)
-        actions["email"] = {"ok": ok, "message": msg}
+        unavailable = email_unavailable()
+        if email_digest.enabled and not unavailable:
+            batch_id = email_digest.add(payload.source, result["category"], title, body_out)
+            dispatcher.reserve("email_digest", batch_id)
+            actions["email"] = {"id": batch_id, "status": "batching"}
+        else:
+            actions["email"] = _queue_action(
+                "email", unavailable, send_email, subject=title, body=body_out
+            )
+    return actions
+
+
+def _status_code(actions: Dict[str, Any]) -> int:
+    queued = any(action.get("status") in ("queued", "batching") for action in actions.values())
+    return 202 if queued else 200
+
+
+@app.post("/webhook")
+async def webhook(req: Request):
+    with IN_FLIGHT.track(endpoint="webhook"):
+        return await _webhook(req)
+
+
+def _request_deadline() -> Optional[float]:
+    if SETTINGS.webhook_deadline <= 0:
+        return None
+    return time.monotonic() + SETTINGS.webhook_deadline
+
+
+@asynccontextmanager
+async def _admitted(endpoint: str, priority: int, deadline: Optional[float]) -> AsyncIterator[None]:
+    """Hold a pipeline slot, or fail with 429 + Retry-After when saturated.
+
+    ``priority`` is the base score, which needs no enrichment to compute.
+    """
+    if SETTINGS.admission_workers <= 0:
+        yield
+        return
+    with STAGE_SECONDS.time(endpoint=endpoint, stage="admission"):
+        try:
+            await admission.acquire(priority, deadline)
+        except Overloaded as e:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Overloaded ({e.reason}), retry later",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        admission.release(time.monotonic() - start)
+
+
+async def _webhook(req: Request) -> ORJSONResponse:
+    deadline = _request_deadline()
+    body = await req.body()
+    with STAGE_SECONDS.time(endpoint="webhook", stage="auth"):
+        _authenticate(req, body)
+
+    with STAGE_SECONDS.time(endpoint="webhook", stage="parse"):
+        try:
+            event = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid JSON")
+
+    # Normalize vendor payloads first
+    with STAGE_SECONDS.time(endpoint="webhook", stage="normalize"):
+        normalized = normalize_event(event)
+
+    # Validate once; scoring and summaries read the model directly.
+    with STAGE_SECONDS.time(endpoint="webhook", stage="validate"):
+        try:
+            payload = EventIn.model_validate(normalized)
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Invalid payload: {e}")
+
+    async with _admitted("webhook", base_score(payload), deadline):
+        with STAGE_SECONDS.time(endpoint="webhook", stage="analyze"):
+            result = await enrich_and_score(payload, deadline=deadline)
+        EVENTS.inc(category=result["category"])
+        analysis_store.record(payload, result)
+        with STAGE_SECONDS.time(endpoint="webhook", stage="actions"):
+            actions = _run_actions(payload, result)
+    return ORJSONResponse(
+        {"analysis": result, "actions": actions}, status_code=_status_code(actions)
+    )
+
 
-    return JSONResponse({"analysis": result, "actions": actions})
+class _BadRecord:
+    def __init__(self, error: str):
+        self.error = error
+
+
+def _parse_batch(body: bytes, content_type: str) -> List[Any]:
+    """Decode a JSON array or NDJSON body into a list of records.
+
+    Undecodable NDJSON lines are kept as ``_BadRecord`` placeholders so that
+    results stay aligned with input lines.
+    """
+    stripped = body.lstrip()
+    if "ndjson" not in content_type and "jsonl" not in content_type and stripped[:1] == b"[":
+        records = orjson.loads(stripped)
+        if not isinstance(records, list):
+            raise ValueError("expected a JSON array")
+        return records
+    records: List[Any] = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(orjson.loads(line))
+        except orjson.JSONDecodeError as e:
+            records.append(_BadRecord(f"Invalid JSON: {e}"))
+    return records
+
+
+@app.post("/webhook/batch")
+async def webhook_batch(req: Request):
+    """Analyze a JSON array or NDJSON stream of events in a single request.
+
+    Authentication happens once for the whole body, and every distinct IP in
+    the batch is enriched once. Results are returned in input order; records
+    that fail to parse or validate get an ``error`` entry instead.
+    """
+    with IN_FLIGHT.track(endpoint="batch"):
+        return await _webhook_batch(req)
+
+
+async def _webhook_batch(req: Request) -> ORJSONResponse:
+    deadline = _request_deadline()
+    body = await req.body()
+    with STAGE_SECONDS.time(endpoint="batch", stage="auth"):
+        _authenticate(req, body)
+
+    with STAGE_SECONDS.time(endpoint="batch", stage="parse"):
+        try:
+            records = _parse_batch(body, req.headers.get("content-type", ""))
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid JSON")
+    if len(records) > SETTINGS.batch_max_events:
+        raise HTTPException(
+            status_code=413, detail=f"Batch exceeds {SETTINGS.batch_max_events} events"
+        )
+
+    results: List[Dict[str, Any]] = []
+    payloads: List[Tuple[int, EventIn]] = []
+    for record in records:
+        if isinstance(record, _BadRecord):
+            results.append({"error": record.error, "status": 400})
+            continue
+        if not isinstance(record, dict):
+            results.append({"error": "Invalid payload: expected an object", "status": 422})
+            continue
+        with STAGE_SECONDS.time(endpoint="batch", stage="validate"):
+            try:
+                payload = EventIn.model_validate(normalize_event(record))
+            except Exception as e:
+                results.append({"error": f"Invalid payload: {e}", "status": 422})
+                continue
+        payloads.append((len(results), payload))
+        results.append({})
+
+    status_code = 200
+    if payloads:
+        # One slot per batch, at the priority of its most important event.
+        priority = max(base_score(payload) for _, payload in payloads)
+        async with _admitted("batch", priority, deadline):
+            with STAGE_SECONDS.time(endpoint="batch", stage="analyze"):
+                analyses = await enrich_and_score_batch(
+                    [payload for _, payload in payloads], deadline=deadline
+                )
+            for (index, payload), result in zip(payloads, analyses):
+                EVENTS.inc(category=result["category"])
+                analysis_store.record(payload, result)
+                with STAGE_SECONDS.time(endpoint="batch", stage="actions"):
+                    actions = _run_actions(payload, result)
+                status_code = max(status_code, _status_code(actions))
+                results[index] = {"analysis": result, "actions": actions}
+
+    return ORJSONResponse({"count": len(results), "results": results}, status_code=status_code)
+
+
+@app.get("/actions/{action_id}")
+def action_status(action_id: str):
+    record = dispatcher.status(action_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Unknown action")
+    return record
+
+
+def _parse_time(value: Optional[str], name: str) -> Optional[float]:
+    """Unix seconds or an ISO-8601 timestamp (UTC unless it has an offset)."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {value!r}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+@app.get("/analyses")
+def analyses(
+    indicator: Optional[str] = None,
+    source: Optional[str] = None,
+    category: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    """Stored analyses, newest first, filtered by indicator, source, category and time.
+
+    Follow ``next`` as ``cursor`` to page back in time.
+    """
+    if not analysis_store.enabled:
+        raise HTTPException(status_code=404, detail="Analysis store is not configured")
+    try:
+        return analysis_store.query(
+            indicator=indicator,
+            source=source,
+            category=category,
+            since=_parse_time(since, "since"),
+            until=_parse_time(until, "until"),
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,6 +1,7 @@
 import pytest
 from fastapi.testclient import TestClient
 
+from soc_agent.correlation import correlator
 from soc_agent.webapp import app
 
 
@@ -9,6 +10,7 @@ def disable_side_effects(monkeypatch):
     monkeypatch.setenv("ENABLE_EMAIL", "0")
     monkeypatch.setenv("ENABLE_AUTOTASK", "0")
     yield
+    correlator.clear()
 
 
 @pytest.fixture
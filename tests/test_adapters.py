@@ -16,13 +16,26 @@ CS = {
     "Name": "Authentication failed",
 }
 
+
 def test_normalize_wazuh():
     out = normalize_event(WAZUH)
     assert out["event_type"] == "auth_failed"
     assert out["severity"] >= 1
     assert out["ip"] == "203.0.113.4"
 
+
 def test_normalize_crowdstrike():
     out = normalize_event(CS)
     assert out["event_type"] == "auth_failed"
     assert out["ip"] == "198.51.100.10"
+
+
+def test_normalize_crowdstrike_stream_envelope():
+    out = normalize_event(
+        {
+            "metadata": {"eventType": "AuthActivityAuthFail", "offset": 7},
+            "event": {k: v for k, v in CS.items() if k != "eventType"},
+        }
+    )
+    assert out["event_type"] == "auth_failed"
+    assert out["ip"] == "198.51.100.10"
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from soc_agent.admission import AdmissionController, Overloaded
+
+
+def controller(**kwargs):
+    options = dict(workers=2, queue_size=2, max_wait=1.0, reserve=0.5, reserve_priority=40)
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+
+def test_low_priority_is_shed_before_reserved_slots():
+    adm = controller()
+
+    async def scenario():
+        await adm.acquire(10)  # takes the one slot open to likely-LOW events
+        with pytest.raises(Overloaded) as exc:
+            await adm.acquire(10)
+        assert exc.value.reason == "saturated" and exc.value.retry_after >= 1
+        await adm.acquire(80)  # the reserved slot is still free for a likely-HIGH event
+        assert adm.stats()["active"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_queued_requests_are_served_highest_priority_first():
+    adm = controller(reserve=0.0, queue_size=4)
+    order = []
+
+    async def request(priority):
+        await adm.acquire(priority)
+        order.append(priority)
+        await asyncio.sleep(0.01)
+        adm.release(0.01)
+
+    async def scenario():
+        await adm.acquire(50)
+        await adm.acquire(50)
+        waiting = [asyncio.ensure_future(request(p)) for p in (45, 90, 60)]
+        await asyncio.sleep(0)
+        assert adm.stats()["queued"] == 3
+        adm.release()
+        adm.release()
+        await asyncio.gather(*waiting)
+
+    asyncio.run(scenario())
+    assert order == [90, 60, 45]
+
+
+def test_full_queue_evicts_lowest_priority_and_times_out():
+    adm = controller(workers=1, queue_size=1, reserve=0.0, max_wait=0.05)
+
+    async def scenario():
+        await adm.acquire(50)
+        low = asyncio.ensure_future(adm.acquire(45))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await adm.acquire(40)  # does not outrank the waiter
+        high = asyncio.ensure_future(adm.acquire(95))
+        with pytest.raises(Overloaded) as evicted:
+            await low
+        assert evicted.value.reason == "evicted"
+        with pytest.raises(Overloaded) as timed_out:
+            await high
+        assert timed_out.value.reason == "timeout"
+
+    asyncio.run(scenario())
+    assert adm.stats()["rejected"] == {
+        "saturated": 0,
+        "queue_full": 1,
+        "evicted": 1,
+        "timeout": 1,
+    }
+    assert adm.stats()["queued"] == 0
+
+
+def test_webhook_returns_429_with_retry_after(client, monkeypatch):
+    adm = controller(workers=1, reserve=0.0)
+    asyncio.run(adm.acquire(100))  # the pipeline is busy
+    monkeypatch.setattr("soc_agent.webapp.admission", adm)
+    r = client.post("/webhook", json={"event_type": "port_scan", "severity": 1})
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 1
+    adm.release()
+    r = client.post("/webhook", json={"event_type": "port_scan", "severity": 1})
+    assert r.status_code == 200
+    assert adm.stats()["active"] == 0
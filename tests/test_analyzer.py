@@ -1,25 +1,117 @@
-from soc_agent.analyzer import base_score, enrich_and_score
+import asyncio
+
+from soc_agent.analyzer import (
+    base_score,
+    enrich_and_score,
+    extract_iocs,
+    final_score,
+    intel_thresholds,
+    score_event,
+)
+from soc_agent.intel import IntelResult
 
 
 class DummyIntel:
-    def enrich_ip(self, ip: str):
-        return {
-            "indicator": ip,
-            "score": 80 if ip == "9.9.9.9" else 0,
-            "labels": ["unknown"],
-            "sources": {},
-        }
+    async def enrich_ips(self, ips, priority=0, deadline=None, verdict=None):
+        return [
+            {
+                "indicator": ip,
+                "score": 80 if ip == "9.9.9.9" else 0,
+                "labels": ["unknown"],
+                "sources": {},
+            }
+            for ip in ips
+        ]
 
 
 def test_extract_and_score(monkeypatch):
     monkeypatch.setattr("soc_agent.analyzer.intel_client", DummyIntel())
     event = {"event_type": "port_scan", "severity": 3, "message": "src 9.9.9.9"}
-    out = enrich_and_score(event)
+    out = asyncio.run(enrich_and_score(event))
     assert out["scores"]["intel"] >= 0
     assert out["category"] in {"LOW", "MEDIUM", "HIGH"}
 
 
+def test_intel_thresholds_mark_where_the_category_changes(monkeypatch):
+    assert intel_thresholds(100) == (24,)  # MEDIUM without intel, HIGH from 24
+    assert final_score(100, 23) < 70 <= final_score(100, 24)
+    assert intel_thresholds(10) == (84,)  # HIGH is out of reach
+    assert intel_thresholds(50) == (24, 99)
+    seen = []
+
+    class Intel:
+        async def enrich_ips(self, ips, priority=0, deadline=None, verdict=None):
+            seen.append(verdict)
+            return [{"indicator": ip, "score": 0, "labels": []} for ip in ips]
+
+    monkeypatch.setattr("soc_agent.analyzer.intel_client", Intel())
+    event = {"event_type": "port_scan", "ip": "9.9.9.9"}
+    asyncio.run(enrich_and_score(event))
+    assert seen[0].thresholds == intel_thresholds(base_score(event))
+    monkeypatch.setattr("soc_agent.analyzer.SETTINGS.intel_mode", "full")
+    asyncio.run(enrich_and_score(event))
+    assert seen[1] is None
+
+
 def test_base_score_monotonic():
     low = base_score({"event_type": "auth_failed", "severity": 1})
     high = base_score({"event_type": "auth_failed", "severity": 8})
     assert high > low
+
+
+def test_extract_iocs_kinds_and_validation():
+    message = (
+        "Failed password from 203.0.113.4 port 22; v6 2001:db8::1 at 10:22:33, "
+        "fetched https://cdn.evil-example.net/p.bin (md5 D41D8CD98F00B204E9800998ECF8427E) "
+        "via Mirror.Example.ORG, dropped svchost.exe, version 1.2.3.4.5, bogus 999.1.1.1"
+    )
+    out = extract_iocs({"message": message, "ip": "1.2", "src_ip": "198.51.100.7"})
+    assert out["ips"] == ["198.51.100.7", "2001:db8::1", "203.0.113.4"]
+    assert out["domains"] == ["cdn.evil-example.net", "mirror.example.org"]
+    assert out["urls"] == ["https://cdn.evil-example.net/p.bin"]
+    assert out["hashes"] == ["d41d8cd98f00b204e9800998ecf8427e"]
+
+
+def test_extract_iocs_ipv4_with_port_and_key_prefix():
+    message = (
+        "conn from 10.1.2.3:51234 to 8.8.8.8:53 srcip=192.0.2.10 dstip:198.51.100.20 "
+        "mapped ::ffff:203.0.113.9 odd ffff:192.0.2.99 build 1.2.3.4.5 bad 1.2.3.4:123456"
+    )
+    out = extract_iocs({"message": message})
+    assert out["ips"] == [
+        "10.1.2.3",
+        "192.0.2.10",
+        "198.51.100.20",
+        "203.0.113.9",
+        "8.8.8.8",
+    ]
+
+
+def test_partial_intel_is_flagged_and_deadline_passed_on(monkeypatch):
+    seen = []
+
+    class PartialIntel:
+        async def enrich_ips(self, ips, priority=0, deadline=None, verdict=None):
+            seen.append(deadline)
+            return [
+                {"indicator": ip, "score": 0, "labels": [], "sources": {}, "partial": True}
+                for ip in ips
+            ]
+
+    monkeypatch.setattr("soc_agent.analyzer.intel_client", PartialIntel())
+    monkeypatch.setattr("soc_agent.analyzer.SETTINGS.webhook_deadline_reserve", 0.5)
+    out = asyncio.run(enrich_and_score({"event_type": "port_scan", "ip": "9.9.9.9"}, deadline=10.0))
+    assert out["intel"]["partial"] is True
+    assert seen == [9.5]
+
+
+def test_intel_results_are_rendered_by_verbosity(monkeypatch):
+    intel = IntelResult("9.9.9.9", 80, ["malicious"], malicious=12, raw={"virustotal": {}})
+    event = {"event_type": "port_scan", "severity": 3}
+    iocs = {"ips": ["9.9.9.9"]}
+    out = score_event(event, iocs, [intel])
+    assert out["intel"]["ips"] == [
+        {"indicator": "9.9.9.9", "score": 80, "labels": ["malicious"], "malicious": 12}
+    ]
+    monkeypatch.setattr("soc_agent.analyzer.SETTINGS.intel_verbosity", "full")
+    assert score_event(event, iocs, [intel])["intel"]["ips"][0]["sources"] == {"virustotal": {}}
@@ -0,0 +1,115 @@
+import json
+import time
+
+from soc_agent.autotask import TicketCoalescer, create_autotask_ticket, ticket_correlation_key
+from soc_agent.dispatch import ActionDispatcher
+
+
+def wait_for(dispatcher, action_id, status, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        record = dispatcher.status(action_id)
+        if record["status"] == status:
+            return record
+        time.sleep(0.01)
+    raise AssertionError(dispatcher.status(action_id))
+
+
+class FakeSession:
+    def __init__(self, fail_notes=False):
+        self.posts = []
+        self.fail_notes = fail_notes
+
+    def post(self, url, json=None, timeout=None):
+        self.posts.append((url, json))
+        failed = self.fail_notes and url.endswith("/notes")
+
+        class Resp:
+            status_code = 503 if failed else 200
+            text = "unavailable" if failed else ""
+
+            def json(self_inner):
+                return {"itemId": len(self.posts)}
+
+        return Resp()
+
+
+def configure_autotask(monkeypatch, tmp_path, fail_notes=False):
+    for name, value in {
+        "enable_autotask": True,
+        "at_base_url": "https://at.example/v1.0/",
+        "at_api_integration_code": "code",
+        "at_username": "user",
+        "at_secret": "secret",
+        "at_account_id": 1,
+        "at_queue_id": 2,
+    }.items():
+        monkeypatch.setattr(f"soc_agent.autotask.SETTINGS.{name}", value)
+    session = FakeSession(fail_notes)
+    monkeypatch.setattr("soc_agent.autotask.get_session", lambda: session)
+    dispatcher = ActionDispatcher(
+        workers=1,
+        max_queue=100,
+        max_attempts=2,
+        backoff=0.01,
+        dead_letter_path=str(tmp_path / "dead.jsonl"),
+    )
+    monkeypatch.setattr("soc_agent.autotask.dispatcher", dispatcher)
+    coalescer = TicketCoalescer(window=600, note_interval=600)
+    monkeypatch.setattr("soc_agent.autotask.ticket_coalescer", coalescer)
+    return session, dispatcher, coalescer
+
+
+def submit_alerts(dispatcher, key, count):
+    return [
+        dispatcher.submit(
+            "autotask_ticket",
+            create_autotask_ticket,
+            title=f"host{i}",
+            description="d",
+            correlation_key=key,
+        )
+        for i in range(count)
+    ]
+
+
+def test_repeat_alerts_become_one_note(monkeypatch, tmp_path):
+    session, dispatcher, coalescer = configure_autotask(monkeypatch, tmp_path)
+    key = ticket_correlation_key("ransomware", "crowdstrike", "203.0.113.5")
+
+    first, *repeats = submit_alerts(dispatcher, key, 5)
+    assert wait_for(dispatcher, first, "delivered")["response"] == {"itemId": 1}
+    # Folded alerts are only delivered once their note has been posted.
+    for action_id in repeats:
+        record = wait_for(dispatcher, action_id, "queued")
+        assert record["message"] == "coalesced" and record["response"]["itemId"] == 1
+    assert coalescer.flush_all() == 1
+    for action_id in repeats:
+        wait_for(dispatcher, action_id, "delivered")
+    assert [url for url, _ in session.posts] == [
+        "https://at.example/v1.0/tickets",
+        "https://at.example/v1.0/tickets/1/notes",
+    ]
+    assert session.posts[1][1]["title"] == "4 repeat alert(s)"
+
+    other = ticket_correlation_key("ransomware", "crowdstrike", "203.0.113.6")
+    assert create_autotask_ticket(title="x", description="d", correlation_key=other)[1] == "created"
+    dispatcher.shutdown()
+
+
+def test_failed_notes_are_retried_and_dead_lettered(monkeypatch, tmp_path):
+    session, dispatcher, coalescer = configure_autotask(monkeypatch, tmp_path, fail_notes=True)
+    key = ticket_correlation_key("ransomware", "crowdstrike", "203.0.113.7")
+
+    first, *repeats = submit_alerts(dispatcher, key, 3)
+    wait_for(dispatcher, first, "delivered")
+    for action_id in repeats:
+        wait_for(dispatcher, action_id, "queued")
+    coalescer.flush_all()
+    for action_id in repeats:
+        assert wait_for(dispatcher, action_id, "dead_letter")["message"].startswith("HTTP 503")
+    assert [url for url, _ in session.posts].count("https://at.example/v1.0/tickets/1/notes") == 2
+    (entry,) = [json.loads(line) for line in (tmp_path / "dead.jsonl").read_text().splitlines()]
+    assert entry["kind"] == "autotask_note" and entry["args"]["ticket_id"] == 1
+    assert "host1\nd\n\nhost2\nd" in entry["args"]["description"]
+    dispatcher.shutdown()
@@ -0,0 +1,74 @@
+import asyncio
+
+from soc_agent.analyzer import enrich_and_score
+from soc_agent.correlation import CorrelationEngine
+
+RULES = {"auth_failed": (("multiple_auth_failed", 5), ("bruteforce", 20))}
+
+
+def test_window_escalates_and_expires():
+    now = [0.0]
+    engine = CorrelationEngine(window=60, rules=RULES, clock=lambda: now[0])
+    event = {"event_type": "auth_failed", "ip": "203.0.113.5", "username": "Alice"}
+    seen = []
+    for _ in range(20):
+        seen.append(engine.observe(event)["event_type"])
+        now[0] += 1
+    assert seen[:4] == ["auth_failed"] * 4
+    assert seen[4:19] == ["multiple_auth_failed"] * 15
+    assert seen[19] == "bruteforce"
+    # Another IP for the same user still counts against the user key.
+    other = engine.observe({"event_type": "auth_failed", "ip": "198.51.100.1", "username": "alice"})
+    assert other["key"] == "user:alice" and other["count"] == 20
+    now[0] += 120
+    assert engine.observe(event)["event_type"] == "auth_failed"
+    assert engine.observe({"event_type": "port_scan", "ip": "203.0.113.5"}) is None
+
+
+def test_key_count_is_bounded():
+    engine = CorrelationEngine(window=60, rules=RULES, max_keys=100)
+    for i in range(10000):
+        engine.observe({"event_type": "auth_failed", "ip": f"10.0.{i // 256}.{i % 256}"})
+    assert engine.stats()["keys"] == 100
+    assert all(len(state.times) <= 20 for state in engine._keys.values())
+
+
+def test_reused_intel_expires_after_the_cache_ttl():
+    now = [0.0]
+    engine = CorrelationEngine(window=60, rules=RULES, clock=lambda: now[0], intel_ttl=100)
+    event = {"event_type": "auth_failed", "ip": "203.0.113.8"}
+    engine.observe(event)
+    engine.remember_intel("auth_failed", "203.0.113.8", {"score": 80})
+    # One event every 30s keeps the window open well past the TTL.
+    for _ in range(3):
+        now[0] += 30
+        engine.observe(event)
+        assert engine.cached_intel("auth_failed", "203.0.113.8") == {"score": 80}
+    now[0] += 30
+    engine.observe(event)
+    assert engine.cached_intel("auth_failed", "203.0.113.8") is None
+    engine.remember_intel("auth_failed", "203.0.113.8", {"score": 10})
+    assert engine.cached_intel("auth_failed", "203.0.113.8") == {"score": 10}
+
+
+def test_repeated_events_reuse_first_enrichment(monkeypatch):
+    class CountingIntel:
+        calls = 0
+
+        async def enrich_ips(self, ips, priority=0, deadline=None, verdict=None):
+            self.calls += 1
+            return [{"indicator": ip, "score": 0, "labels": [], "sources": {}} for ip in ips]
+
+    intel = CountingIntel()
+    monkeypatch.setattr("soc_agent.analyzer.intel_client", intel)
+    monkeypatch.setattr("soc_agent.analyzer.correlator", CorrelationEngine(window=60, rules=RULES))
+    event = {"event_type": "auth_failed", "severity": 2, "ip": "203.0.113.7"}
+
+    async def flood():
+        return [await enrich_and_score(event) for _ in range(5)]
+
+    out = asyncio.run(flood())
+    assert intel.calls == 1
+    assert out[0]["correlation"]["event_type"] == "auth_failed"
+    assert out[4]["correlation"]["event_type"] == "multiple_auth_failed"
+    assert out[4]["scores"]["base"] > out[0]["scores"]["base"]
@@ -0,0 +1,44 @@
+import json
+import time
+
+from soc_agent.dispatch import ActionDispatcher
+
+
+def wait_for(dispatcher, action_id, status, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        record = dispatcher.status(action_id)
+        if record["status"] == status:
+            return record
+        time.sleep(0.01)
+    raise AssertionError(dispatcher.status(action_id))
+
+
+def test_dispatch_retries_until_delivered():
+    calls = []
+
+    def flaky(subject, body):
+        calls.append(subject)
+        return (len(calls) >= 3, "sent" if len(calls) >= 3 else "relay busy")
+
+    d = ActionDispatcher(workers=2, max_queue=10, max_attempts=5, backoff=0.01)
+    action_id = d.submit("email", flaky, subject="s", body="b")
+    record = wait_for(d, action_id, "delivered")
+    assert record["attempts"] == 3 and record["message"] == "sent"
+    d.shutdown()
+
+
+def test_dispatch_dead_letters_after_max_attempts(tmp_path):
+    path = tmp_path / "dead.ndjson"
+
+    def broken(title, description):
+        raise RuntimeError("HTTP 500")
+
+    d = ActionDispatcher(
+        workers=1, max_queue=10, max_attempts=2, backoff=0.01, dead_letter_path=str(path)
+    )
+    action_id = d.submit("autotask_ticket", broken, title="t", description="d")
+    wait_for(d, action_id, "dead_letter")
+    entry = json.loads(path.read_text().splitlines()[0])
+    assert entry["id"] == action_id and entry["attempts"] == 2 and entry["error"] == "HTTP 500"
+    d.shutdown()
@@ -1,32 +1,542 @@
-from soc_agent.intel.client import IntelClient
+import asyncio
+import sqlite3
+import threading
+import time
+
+import orjson
+
+from soc_agent.intel.breaker import CircuitBreaker
+from soc_agent.intel.cache import IOCCache
+from soc_agent.intel.client import IntelClient, Provider, Verdict
+from soc_agent.intel.disk_cache import SqliteIntelCache
+from soc_agent.intel.providers.blocklist import BlocklistIndex
+from soc_agent.intel.ratelimit import TokenBucket
+from soc_agent.intel.result import IntelResult
 
 
 class DummySession:
-    def __init__(self, payload):
+    def __init__(self, payload, delay=0.0):
         self.payload = payload
-    def get(self, url, **kwargs):
+        self.delay = delay
+
+    async def get(self, url, **kwargs):
         class Resp:
             def __init__(self, p):
                 self._p = p
                 self.status_code = 200
+
             def raise_for_status(self):
                 pass
+
             def json(self):
                 return self._p
+
+        if self.delay:
+            await asyncio.sleep(self.delay)
         return Resp(self.payload)
 
+
 class StubClient(IntelClient):
-    def __init__(self):
+    def __init__(self, delay=0.0):
         super().__init__()
         self.session = DummySession(
             {
                 "pulse_info": {"pulses": [1]},
-                "data": {"attributes": {"last_analysis_stats": {}}},
-            }
+                "data": {
+                    "attributes": {"last_analysis_stats": {"malicious": 3}},
+                    "abuseConfidenceScore": 90,
+                },
+            },
+            delay=delay,
         )
 
 
+def enable_all_feeds(monkeypatch):
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.otx_api_key", "otx")
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.vt_api_key", "vt")
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.abuseipdb_api_key", "abuse")
+
+
 def test_enrich_ip_shape():
     c = StubClient()
-    out = c.enrich_ip("203.0.113.1")
-    assert "indicator" in out and "score" in out and "sources" in out
+    out = asyncio.run(c.enrich_ip("203.0.113.1"))
+    assert isinstance(out, IntelResult)
+    assert out.indicator == "203.0.113.1" and out.score == 0 and out.labels == ("unknown",)
+
+
+def test_enrich_ips_fans_out_concurrently(monkeypatch):
+    enable_all_feeds(monkeypatch)
+    c = StubClient(delay=0.2)
+    ips = [f"203.0.113.{i}" for i in range(1, 6)]
+    start = time.perf_counter()
+    out = asyncio.run(c.enrich_ips(ips))
+    elapsed = time.perf_counter() - start
+    # 5 IPs x 3 feeds sequentially would take 3s; concurrently about one call.
+    assert elapsed < 1.0
+    assert [r.indicator for r in out] == ips
+    assert all(r.score == 50 and r.labels == ("suspicious",) for r in out)
+    assert (out[0].pulses, out[0].malicious, out[0].abuse_confidence) == (1, 3, 90)
+
+
+class CountingSession(DummySession):
+    def __init__(self, payload, delay=0.0, fail=False):
+        super().__init__(payload, delay)
+        self.calls = 0
+        self.fail = fail
+
+    async def get(self, url, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("HTTP 503")
+        return await super().get(url, **kwargs)
+
+
+def test_lazy_enrichment_stops_once_the_verdict_is_settled(monkeypatch):
+    enable_all_feeds(monkeypatch)
+    c = StubClient()
+    c.session = CountingSession(c.session.payload)
+    out = asyncio.run(c.enrich_ip("203.0.113.20", verdict=Verdict([24])))
+    # Unmetered OTX votes 11; AbuseIPDB has more quota than VirusTotal and its 50 settles it.
+    assert c.session.calls == 2 and out.score == 50 and out.skipped == ("virustotal",)
+    assert out.malicious is None
+    asyncio.run(c.enrich_ip("203.0.113.20", verdict=Verdict([45])))
+    assert c.session.calls == 2
+    out = asyncio.run(c.enrich_ip("203.0.113.20"))  # full enrichment tops up the cached result
+    assert c.session.calls == 3 and out.malicious == 3 and out.skipped == ()
+    out = asyncio.run(c.enrich_ip("203.0.113.21", verdict=Verdict([])))
+    assert c.session.calls == 3 and out.skipped == ("otx", "abuseipdb", "virustotal")
+
+
+def test_lazy_enrichment_never_asks_providers_that_cannot_cross_a_threshold(monkeypatch):
+    enable_all_feeds(monkeypatch)
+    c = StubClient()
+    c.session = CountingSession(c.session.payload)
+    urls = []
+    get = c.session.get
+
+    async def recording_get(url, **kwargs):
+        urls.append(url)
+        return await get(url, **kwargs)
+
+    c.session.get = recording_get
+    # OTX votes at most 30, so it cannot reach 45; AbuseIPDB's 50 settles it.
+    out = asyncio.run(c.enrich_ip("203.0.113.22", verdict=Verdict([45])))
+    assert len(urls) == 1 and "abuseipdb" in urls[0]
+    assert out.score == 50 and out.skipped == ("otx", "virustotal")
+
+
+def test_ioc_cache_ttl_and_lru():
+    now = [0.0]
+    cache = IOCCache(max_entries=2, ttl=10, negative_ttl=1, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    cache.set("d", 4, negative=True)
+    now[0] = 5
+    assert cache.get("d") is None
+    assert cache.get("c") == 3
+    now[0] = 11
+    assert cache.get("c") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 2 and stats["expirations"] == 2 and stats["hits"] == 2
+
+
+def test_enrich_ip_single_flight(monkeypatch):
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.otx_api_key", "otx")
+    c = IntelClient()
+    c.session = CountingSession({"pulse_info": {"pulses": [1]}}, delay=0.05)
+
+    async def burst():
+        return await asyncio.gather(*(c.enrich_ip("198.51.100.7") for _ in range(20)))
+
+    out = asyncio.run(burst())
+    assert c.session.calls == 1
+    assert all(r.score == 11 for r in out)
+    asyncio.run(c.enrich_ip("198.51.100.7"))
+    assert c.session.calls == 1
+    assert c.cache.stats()["coalesced"] == 19
+
+
+def test_enrich_ip_negative_cache(monkeypatch):
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.otx_api_key", "otx")
+    c = IntelClient()
+    c.session = CountingSession({}, fail=True)
+    out = asyncio.run(c.enrich_ip("198.51.100.8"))
+    assert out.errors == {"otx": "HTTP 503"}
+    assert c.cache._data["198.51.100.8"][0] - time.monotonic() <= c.cache.negative_ttl
+
+
+def test_disk_cache_survives_restart_and_compacts(tmp_path):
+    path = str(tmp_path / "intel.sqlite")
+    first = SqliteIntelCache(path, compact_interval=0)
+    first.set("203.0.113.9", {"indicator": "203.0.113.9", "score": 40}, ttl=60)
+    first.set("203.0.113.10", {"indicator": "203.0.113.10", "score": 0}, ttl=0.01)
+    first.close()
+
+    restarted = SqliteIntelCache(path, compact_interval=0)
+    value, remaining = restarted.get("203.0.113.9")
+    assert value["score"] == 40 and 0 < remaining <= 60
+    time.sleep(0.02)
+    assert restarted.get("203.0.113.10") is None
+    assert restarted.compact() == 1
+
+
+def test_disk_cache_stays_off_the_event_loop_and_converts_old_files(tmp_path):
+    path = str(tmp_path / "intel.sqlite")
+    old = sqlite3.connect(path)
+    old.execute("CREATE TABLE unrelated (x)")
+    old.close()
+
+    disk = SqliteIntelCache(path, compact_interval=0)
+    threads = []
+    get = disk.get
+
+    def recording_get(key):
+        threads.append(threading.current_thread().name)
+        return get(key)
+
+    disk.get = recording_get
+
+    async def roundtrip():
+        await disk.aset("203.0.113.11", {"score": 7}, ttl=60)
+        return await disk.aget("203.0.113.11")
+
+    value, _ = asyncio.run(roundtrip())
+    assert value == {"score": 7}
+    assert threads and all(name.startswith("intel-cache") for name in threads)
+    assert disk._conn().execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    disk.close()
+
+
+def test_enrich_ip_uses_disk_tier(monkeypatch, tmp_path):
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.otx_api_key", "otx")
+    disk = SqliteIntelCache(str(tmp_path / "intel.sqlite"), compact_interval=0)
+    writer = IntelClient()
+    writer.disk_cache = disk
+    writer.session = CountingSession({"pulse_info": {"pulses": [1, 2]}})
+    asyncio.run(writer.enrich_ip("198.51.100.9"))
+
+    reader = IntelClient()
+    reader.disk_cache = disk
+    reader.session = CountingSession({})
+    out = asyncio.run(reader.enrich_ip("198.51.100.9"))
+    assert out.score == 12 and out.pulses == 2
+    assert reader.session.calls == 0
+
+
+def test_token_bucket_serves_high_priority_first():
+    bucket = TokenBucket(rate_per_min=600)  # one token every 0.1s
+    bucket._tokens = 0
+    order = []
+
+    async def take(name, priority):
+        if await bucket.acquire(priority, max_wait=1.0):
+            order.append(name)
+
+    async def contend():
+        await asyncio.gather(take("low", 10), take("high", 90))
+
+    asyncio.run(contend())
+    assert order == ["high", "low"]
+
+
+def test_token_bucket_daily_budget_reserve():
+    bucket = TokenBucket(rate_per_min=0, daily_budget=10, reserve=0.2, reserve_priority=40)
+
+    async def drain(priority):
+        return [await bucket.acquire(priority) for _ in range(10)]
+
+    assert asyncio.run(drain(5)).count(True) == 8
+    assert asyncio.run(drain(80)).count(True) == 2
+
+
+def test_low_priority_lookup_skipped_when_rate_limited(monkeypatch):
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.vt_api_key", "vt")
+    c = IntelClient()
+    c.session = CountingSession({"data": {"attributes": {"last_analysis_stats": {}}}})
+    c.rate_limiters["virustotal"]._tokens = 0
+    out = asyncio.run(c.enrich_ip("198.51.100.20", priority=10))
+    assert out.errors == {"virustotal": "rate limited"}
+    assert c.session.calls == 0
+
+
+def test_micro_batcher_coalesces_into_bulk_requests(monkeypatch):
+    bulk_calls = []
+
+    async def lookup_ips(client, ips, timeout):
+        bulk_calls.append(sorted(ips))
+        return {ip: {"pulse_info": {"pulses": [1]}} for ip in ips}
+
+    async def lookup_ip(client, ip, timeout):
+        raise AssertionError("single lookup used despite bulk endpoint")
+
+    provider = Provider("otx", "otx", lookup_ip, lambda data: {}, lambda summary: 11, lookup_ips)
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.otx_api_key", "otx")
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.intel_batch_window_ms", 20)
+    c = IntelClient(providers=[provider])
+    c.session = DummySession({})
+    ips = [f"192.0.2.{i}" for i in range(10)]
+
+    async def concurrent_webhooks():
+        return await asyncio.gather(*(c.enrich_ips([ip]) for ip in ips))
+
+    out = asyncio.run(concurrent_webhooks())
+    assert bulk_calls == [sorted(ips)]
+    assert all(r[0].score == 11 for r in out)
+    assert c.batch_stats()["otx"] == {"batches": 1, "lookups": 10, "requests": 1}
+
+
+def test_micro_batches_only_bulk_providers_with_each_callers_timeout(monkeypatch):
+    timeouts = []
+
+    async def lookup_ips(client, ips, timeout):
+        timeouts.append(timeout)
+        return {ip: {} for ip in ips}
+
+    single = fixed_vote_provider("virustotal", "vt", 10, [])
+    bulk = Provider("otx", "otx", single.lookup, lambda data: {}, lambda summary: 0, lookup_ips)
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.intel_batch_window_ms", 20)
+    c = IntelClient(providers=[bulk, single])
+    assert list(c.batch_stats()) == ["otx"]
+
+    async def callers():
+        batcher = c.batchers["otx"]
+        await asyncio.gather(
+            batcher.submit(None, "192.0.2.1", 1.0), batcher.submit(None, "192.0.2.2", 3.0)
+        )
+
+    asyncio.run(callers())
+    assert timeouts == [3.0]
+
+
+def write_feeds(tmp_path):
+    drop = tmp_path / "drop.txt"
+    drop.write_text("; Spamhaus DROP\n1.10.16.0/20 ; SBL256894\n2001:db8:bad::/48 ; SBL1\n")
+    firehol = tmp_path / "firehol_level1.netset"
+    firehol.write_text("# FireHOL\n1.10.16.0/24\n203.0.113.66\n")
+    feodo = tmp_path / "feodo.csv"
+    feodo.write_text(
+        '# abuse.ch\n"first_seen_utc","dst_ip","dst_port"\n'
+        '"2024-01-01 00:00:00","198.51.100.23","443"\n'
+    )
+    return [str(drop), str(firehol), str(feodo)]
+
+
+def test_blocklist_index_membership_and_reload(tmp_path):
+    feeds = write_feeds(tmp_path)
+    index = BlocklistIndex(feeds, str(tmp_path / "blocklist.idx"), reload_interval=0)
+    assert index.lookup("1.10.16.5") == ["drop", "firehol_level1"]
+    assert index.lookup("1.10.20.1") == ["drop"]
+    assert index.lookup("2001:db8:bad::1") == ["drop"]
+    assert index.lookup("198.51.100.23") == ["feodo"]
+    assert index.lookup("198.51.100.24") == [] and index.lookup("not-an-ip") == []
+    assert index.stats()["mapped"] is True
+
+    # A second worker maps the already-built index instead of rebuilding it.
+    other = BlocklistIndex(feeds, str(tmp_path / "blocklist.idx"))
+    assert other.lookup("203.0.113.66") == ["firehol_level1"]
+
+    index._reloader.join()
+    with open(feeds[1], "a") as fh:
+        fh.write("192.0.2.0/24\n")
+    # The rebuild runs in the background; lookups keep the old index meanwhile.
+    with index._lock:
+        assert index.lookup("192.0.2.8") == []
+    index._reloader.join()
+    assert index.lookup("192.0.2.8") == ["firehol_level1"]
+    assert index.stats()["reloads"] == 2
+
+
+def test_blocklist_match_skips_remote_providers(monkeypatch, tmp_path):
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.otx_api_key", "otx")
+    c = IntelClient()
+    c.blocklist = BlocklistIndex(write_feeds(tmp_path))
+    c.session = CountingSession({"pulse_info": {"pulses": [1]}})
+    out = asyncio.run(c.enrich_ip("1.10.16.5"))
+    assert c.session.calls == 0
+    assert out.feeds == ("drop", "firehol_level1") and out.pulses is None
+    assert out.labels == ("malicious", "blocklist:drop", "blocklist:firehol_level1")
+    asyncio.run(c.enrich_ip("192.0.2.1"))
+    assert c.session.calls == 1
+
+
+def test_circuit_breaker_opens_and_probes():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    now[0] = 10
+    assert breaker.allow()  # the single half-open probe
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.trips == 2
+    now[0] = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_open_breaker_skips_failing_provider(monkeypatch):
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.otx_api_key", "otx")
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.intel_breaker_failures", 2)
+    c = IntelClient()
+    c.session = CountingSession({}, fail=True)
+    for i in range(4):
+        out = asyncio.run(c.enrich_ip(f"198.51.100.{30 + i}"))
+    assert c.session.calls == 2
+    assert out.errors == {"otx": "circuit open"}
+    assert c.breaker_stats()["otx"]["state"] == "open"
+
+
+class SlowVirusTotalSession(DummySession):
+    async def get(self, url, **kwargs):
+        if "virustotal" in url:
+            await asyncio.sleep(5)
+        return await super().get(url, **kwargs)
+
+
+def test_deadline_returns_partial_result(monkeypatch):
+    enable_all_feeds(monkeypatch)
+    c = StubClient()
+    c.session = SlowVirusTotalSession(c.session.payload)
+    start = time.perf_counter()
+    out = asyncio.run(c.enrich_ip("198.51.100.40", deadline=time.monotonic() + 0.2))
+    assert time.perf_counter() - start < 1.0
+    rendered = out.to_dict()
+    assert rendered["partial"] is True and rendered["missing"] == ["virustotal"]
+    assert rendered["errors"] == {"virustotal": "deadline exceeded"}
+    assert rendered["pulses"] == 1 and rendered["abuse_confidence"] == 90
+
+
+def test_intel_verbosity_keeps_raw_only_when_full(monkeypatch):
+    enable_all_feeds(monkeypatch)
+
+    def verbose_client():
+        # VirusTotal IP objects carry tens of KB the scorer never reads.
+        c = StubClient()
+        c.session.payload["data"]["attributes"]["whois"] = "x" * 20000
+        return c
+
+    summary = asyncio.run(verbose_client().enrich_ip("203.0.113.90"))
+    assert summary.raw is None
+    assert summary.to_dict("full") == {
+        "indicator": "203.0.113.90",
+        "score": 50,
+        "labels": ["suspicious"],
+        "pulses": 1,
+        "malicious": 3,
+        "suspicious": 0,
+        "abuse_confidence": 90,
+    }
+
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.intel_verbosity", "full")
+    full = asyncio.run(verbose_client().enrich_ip("203.0.113.91"))
+    assert list(full.raw) == ["otx", "virustotal", "abuseipdb"]
+    rendered = full.to_dict("full")
+    assert rendered["sources"]["virustotal"]["data"]["attributes"]["whois"]
+    assert IntelResult.from_dict(rendered) == full
+    assert len(orjson.dumps(full.to_dict("summary"))) * 10 < len(orjson.dumps(rendered))
+
+
+def fixed_vote_provider(name, prefix, vote, calls, delay=0.0):
+    async def lookup_ip(client, ip, timeout):
+        calls.append(name)
+        await asyncio.sleep(delay)
+        return {}
+
+    return Provider(name, prefix, lookup_ip, lambda data: {}, lambda summary: vote, max_vote=50)
+
+
+def metered_client(monkeypatch, calls, vt_delay=0.0, abuse_vote=0):
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.vt_api_key", "vt")
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.abuseipdb_api_key", "abuse")
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.intel_batch_window_ms", 0)
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.vt_rate_per_min", 0)
+    c = IntelClient(
+        providers=[
+            fixed_vote_provider("virustotal", "vt", 40, calls, delay=vt_delay),
+            fixed_vote_provider("abuseipdb", "abuseipdb", abuse_vote, calls),
+        ]
+    )
+    c.session = DummySession({})
+    return c
+
+
+def test_lazy_order_adapts_to_which_provider_wins(monkeypatch, client):
+    calls = []
+    c = metered_client(monkeypatch, calls)
+    monkeypatch.setattr("soc_agent.webapp.intel_client", c)
+    # Unmeasured, the provider with more daily quota goes first.
+    assert list(client.get("/intel/providers").json()) == ["abuseipdb", "virustotal"]
+    for i in range(10):
+        asyncio.run(c.enrich_ip(f"192.0.2.{i}", verdict=Verdict([30])))
+    assert calls == ["abuseipdb", "virustotal"] + ["virustotal"] * 9
+    stats = client.get("/intel/providers").json()
+    assert list(stats) == ["virustotal", "abuseipdb"]
+    assert stats["virustotal"]["wins"] == 10 and stats["virustotal"]["win_rate"] > 0.5
+    assert stats["abuseipdb"]["answered"] == 1 and stats["abuseipdb"]["skipped"] == 9
+
+
+def test_slow_provider_is_hedged(monkeypatch):
+    calls = []
+    c = metered_client(monkeypatch, calls, vt_delay=0.5, abuse_vote=50)
+    c.observed["virustotal"].record(0.01, ok=True)
+    c.observed["virustotal"].record_vote(True)
+    c.observed["abuseipdb"].record(0.01, ok=True)
+    c.observed["abuseipdb"].record_vote(False)
+
+    async def lookup():
+        start = time.perf_counter()
+        out = await c.enrich_ip("192.0.2.50", verdict=Verdict([30]))
+        return out, time.perf_counter() - start
+
+    out, elapsed = asyncio.run(lookup())
+    # VirusTotal usually answers in 10ms; after 20ms AbuseIPDB is asked too and settles it.
+    assert calls == ["virustotal", "abuseipdb"] and elapsed < 0.3
+    assert out.score == 50 and out.skipped == ("virustotal",)
+
+
+def test_lookups_queued_past_the_deadline_do_not_trip_the_breaker(monkeypatch):
+    calls = []
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.otx_api_key", "otx")
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.intel_max_concurrency", 1)
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.intel_breaker_failures", 2)
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.intel_batch_window_ms", 0)
+    c = IntelClient(providers=[fixed_vote_provider("otx", "otx", 10, calls, delay=0.5)])
+    c.session = DummySession({})
+    ips = [f"192.0.2.{i}" for i in range(60, 66)]
+    out = asyncio.run(c.enrich_ips(ips, deadline=time.monotonic() + 0.1))
+    # Only the lookup holding the single slot reached the provider and timed out.
+    assert len(calls) == 1 and all(r.errors == {"otx": "deadline exceeded"} for r in out)
+    assert c.breaker_stats()["otx"] == {"state": "closed", "failures": 1, "trips": 0, "rejected": 0}
+    assert c.observed["otx"].calls == 1
+
+
+def test_unmeasured_providers_are_hedged_on_a_cold_start(monkeypatch):
+    calls = []
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.vt_api_key", "vt")
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.abuseipdb_api_key", "abuse")
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.intel_batch_window_ms", 0)
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.vt_rate_per_min", 0)
+    monkeypatch.setattr("soc_agent.intel.client.SETTINGS.intel_hedge_default_latency", 0.02)
+    c = IntelClient(
+        providers=[
+            fixed_vote_provider("virustotal", "vt", 40, calls),
+            fixed_vote_provider("abuseipdb", "abuseipdb", 0, calls, delay=0.5),
+        ]
+    )
+    c.session = DummySession({})
+
+    async def lookup():
+        start = time.perf_counter()
+        out = await c.enrich_ip("192.0.2.70", verdict=Verdict([30]))
+        return out, time.perf_counter() - start
+
+    out, elapsed = asyncio.run(lookup())
+    # Nothing measured yet: AbuseIPDB goes first and VirusTotal is started after 40ms.
+    assert calls == ["abuseipdb", "virustotal"] and elapsed < 0.3
+    assert out.score == 40 and out.skipped == ("abuseipdb",)
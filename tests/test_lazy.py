@@ -0,0 +1,91 @@
+import json
+import os
+import subprocess
+import sys
+from importlib import metadata
+
+import pytest
+
+from soc_agent.adapters import ADAPTERS, Adapter, normalize_event
+from soc_agent.lazy import Lazy, is_loaded
+from soc_agent.plugins import Registry
+
+COLD_IMPORT = """
+import json, sys
+import soc_agent.webapp as w
+from soc_agent.lazy import is_loaded
+print(json.dumps({
+    "settings": is_loaded(w.SETTINGS),
+    "intel_client": is_loaded(w.intel_client),
+    "dispatcher": is_loaded(w.dispatcher),
+    "modules": sorted(
+        m for m in ("httpx", "numpy", "requests", "soc_agent.intel.providers.otx",
+                    "soc_agent.adapters.wazuh") if m in sys.modules
+    ),
+}))
+"""
+
+
+def test_importing_webapp_builds_nothing():
+    out = subprocess.run(
+        [sys.executable, "-c", COLD_IMPORT], check=True, capture_output=True, text=True
+    ).stdout
+    assert json.loads(out) == {
+        "settings": False,
+        "intel_client": False,
+        "dispatcher": False,
+        "modules": [],
+    }
+
+
+def test_lazy_builds_once_and_forwards_attributes():
+    built = []
+
+    class Thing:
+        value = 1
+
+    def factory():
+        built.append(1)
+        return Thing()
+
+    proxy = Lazy(factory)
+    assert not is_loaded(proxy) and built == []
+    proxy.value = 5
+    assert proxy.value == 5 and built == [1]
+    assert is_loaded(proxy) and is_loaded(object())
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_lazy_rebuilds_after_fork():
+    proxy = Lazy(lambda: {"pid": os.getpid()})
+    parent = proxy.copy()
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - runs in the child
+        os.write(write, json.dumps([is_loaded(proxy), proxy.copy()["pid"]]).encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    loaded, child = json.loads(os.read(read, 1024))
+    os.close(read)
+    os.close(write)
+    assert not loaded and child == pid != parent["pid"]
+
+
+def test_registry_discovers_entry_points(monkeypatch):
+    found = [
+        metadata.EntryPoint("extra", "json:loads", "test.plugins"),
+        metadata.EntryPoint("builtin", "json:dumps", "test.plugins"),
+    ]
+    monkeypatch.setattr("soc_agent.plugins.metadata.entry_points", lambda group: found)
+    registry = Registry("test.plugins", {"builtin": "os.path:join", "other": "os.path:split"})
+    assert registry.names() == ["builtin", "other", "extra"]
+    assert registry.all() == [json.dumps, os.path.split, json.loads]
+
+
+def test_registered_adapter_is_used(monkeypatch):
+    adapter = Adapter("acme", lambda e: "acme_id" in e, lambda e: {"source": "acme", "raw": e})
+    registry = Registry("soc_agent.adapters", dict(ADAPTERS.builtins))
+    registry.register("acme", adapter)
+    monkeypatch.setattr("soc_agent.adapters.ADAPTERS", registry)
+    assert normalize_event({"acme_id": 1})["source"] == "acme"
+    assert normalize_event({"rule": {}, "agent": {}})["source"] == "wazuh"
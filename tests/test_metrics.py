@@ -0,0 +1,45 @@
+from fastapi.testclient import TestClient
+
+from soc_agent.metrics import Registry
+from soc_agent.webapp import app
+
+client = TestClient(app)
+
+
+class StubIntel:
+    async def enrich_ips(self, ips, priority=0, deadline=None, verdict=None):
+        return [{"indicator": ip, "score": 0, "labels": ["unknown"], "sources": {}} for ip in ips]
+
+
+def test_histogram_and_counter_render_prometheus_text():
+    registry = Registry()
+    latency = registry.histogram("t_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+    hits = registry.counter("t_total", "Hits.", ("result",))
+    latency.observe(0.05, stage="parse")
+    latency.observe(0.5, stage="parse")
+    latency.observe(3.0, stage="parse")
+    hits.inc(result='a"b')
+    registry.add_collector(lambda: [("t_ratio", "gauge", "Ratio.", [({}, 0.25)])])
+    text = registry.render()
+    assert "# TYPE t_seconds histogram" in text
+    assert 't_seconds_bucket{stage="parse",le="0.1"} 1' in text
+    assert 't_seconds_bucket{stage="parse",le="1"} 2' in text
+    assert 't_seconds_bucket{stage="parse",le="+Inf"} 3' in text
+    assert 't_seconds_sum{stage="parse"} 3.55' in text
+    assert 't_seconds_count{stage="parse"} 3' in text
+    assert 't_total{result="a\\"b"} 1' in text
+    assert "t_ratio 0.25" in text
+
+
+def test_metrics_endpoint_reports_webhook_stages(monkeypatch):
+    monkeypatch.setattr("soc_agent.analyzer.intel_client", StubIntel())
+    payload = {"event_type": "port_scan", "severity": 1, "ip": "203.0.113.80"}
+    assert client.post("/webhook", json=payload).status_code == 200
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    for stage in ("auth", "parse", "normalize", "validate", "enrich", "analyze", "actions"):
+        assert f'soc_stage_seconds_count{{endpoint="webhook",stage="{stage}"}}' in r.text
+    assert 'soc_events_total{category="LOW"}' in r.text
+    assert 'soc_requests_in_flight{endpoint="webhook"} 0' in r.text
+    assert "soc_intel_cache_hit_ratio" in r.text
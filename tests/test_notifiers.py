@@ -0,0 +1,82 @@
+import smtplib
+
+from soc_agent.notifiers import EmailDigest, SmtpSender, send_email
+
+
+class FakeSMTP:
+    instances = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.fail_next = False
+        self.refuse = set()
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def send_message(self, msg):
+        if self.fail_next:
+            raise smtplib.SMTPServerDisconnected("gone")
+        if self.refuse & {msg["To"]}:
+            raise smtplib.SMTPRecipientsRefused({msg["To"]: (550, b"no such user")})
+        self.sent.append(msg["Subject"])
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def configure_email(monkeypatch):
+    monkeypatch.setattr("soc_agent.notifiers.smtplib.SMTP", FakeSMTP)
+    monkeypatch.setattr("soc_agent.notifiers.SETTINGS.enable_email", True)
+    monkeypatch.setattr("soc_agent.notifiers.SETTINGS.smtp_host", "relay.local")
+    monkeypatch.setattr("soc_agent.notifiers.SETTINGS.email_from", "alerts@example.com")
+    monkeypatch.setattr("soc_agent.notifiers.SETTINGS.email_to", ["soc@example.com"])
+    FakeSMTP.instances = []
+
+
+def test_smtp_connection_is_reused_and_reopened(monkeypatch):
+    configure_email(monkeypatch)
+    sender = SmtpSender()
+    monkeypatch.setattr("soc_agent.notifiers.smtp_sender", sender)
+    for i in range(3):
+        assert send_email(subject=f"alert {i}", body="x") == (True, "sent")
+    assert sender.connects == 1
+    FakeSMTP.instances[0].fail_next = True
+    assert send_email(subject="after drop", body="x") == (True, "sent")
+    assert sender.connects == 2
+    assert FakeSMTP.instances[1].sent == ["after drop"]
+
+
+def test_refused_recipient_keeps_the_pooled_connection(monkeypatch):
+    configure_email(monkeypatch)
+    sender = SmtpSender()
+    monkeypatch.setattr("soc_agent.notifiers.smtp_sender", sender)
+    assert send_email(subject="first", body="x") == (True, "sent")
+    FakeSMTP.instances[0].refuse = {"soc@example.com"}
+    ok, message = send_email(subject="refused", body="x")
+    assert not ok and "no such user" in message
+    FakeSMTP.instances[0].refuse = set()
+    assert send_email(subject="after refusal", body="x") == (True, "sent")
+    assert sender.connects == 1 and len(FakeSMTP.instances) == 1
+    assert FakeSMTP.instances[0].sent == ["first", "after refusal"]
+
+
+def test_digest_groups_alerts_without_losing_content():
+    sent = []
+    digest = EmailDigest(window=60, max_items=3, sink=lambda *args: sent.append(args))
+    first = digest.add("wazuh", "MEDIUM", "[MEDIUM] auth_failed – wazuh", "body one")
+    digest.add("crowdstrike", "MEDIUM", "[MEDIUM] malware – crowdstrike", "body two")
+    digest.add("wazuh", "MEDIUM", "[MEDIUM] port_scan – wazuh", "body three")
+    assert len(sent) == 1
+    batch_id, subject, body = sent[0]
+    assert batch_id == first and subject.startswith("[DIGEST] 3 alerts")
+    assert "== wazuh / MEDIUM (2) ==" in body and "== crowdstrike / MEDIUM (1) ==" in body
+    assert all(text in body for text in ("body one", "body two", "body three"))
+    assert digest.flush() is None
@@ -0,0 +1,125 @@
+import gzip
+import json
+from pathlib import Path
+
+import orjson
+import pytest
+
+from soc_agent import replay as replay_mod
+from soc_agent.cli import main
+
+FIXTURES = Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures"
+
+
+def write_archive(tmp_path):
+    lines = (FIXTURES / "wazuh.jsonl").read_bytes().splitlines()
+    lines += (FIXTURES / "crowdstrike.jsonl").read_bytes().splitlines()
+    lines.insert(3, b"{not json")
+    lines.insert(5, b"")
+    path = tmp_path / "alerts.json.gz"
+    with gzip.open(path, "wb") as f:
+        f.write(b"\n".join(lines) + b"\n")
+    return str(path)
+
+
+def read_ndjson(path):
+    return [orjson.loads(line) for line in Path(path).read_bytes().splitlines()]
+
+
+def test_replay_streams_gzip_in_order(tmp_path):
+    archive = write_archive(tmp_path)
+    out = tmp_path / "scores.ndjson"
+    assert main(["replay", archive, "-o", str(out), "--workers", "0", "--chunk-size", "4"]) == 0
+    records = read_ndjson(out)
+    assert [r["line"] for r in records] == [1, 2, 3, 4, 5, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16]
+    assert records[3]["error"].startswith("Invalid JSON")
+    assert all("analysis" in r for r in records if r["line"] != 4)
+    assert records[0]["analysis"]["category"] in {"LOW", "MEDIUM", "HIGH"}
+    assert "actions" not in records[0]
+    checkpoint = json.loads(Path(f"{out}.checkpoint.json").read_text())
+    assert checkpoint["done"] and checkpoint["inputs"] == {archive: 16}
+
+
+def test_replay_resumes_from_checkpoint(tmp_path, monkeypatch):
+    archive = write_archive(tmp_path)
+    full = tmp_path / "full.ndjson"
+    replay_mod.replay([archive], str(full), workers=0, chunk_size=3)
+
+    out = tmp_path / "resumed.ndjson"
+    calls = []
+    score_chunk = replay_mod.score_chunk
+
+    def flaky(*args, **kwargs):
+        calls.append(args[1])
+        if calls == [0, 3, 6]:
+            raise RuntimeError("interrupted")
+        return score_chunk(*args, **kwargs)
+
+    monkeypatch.setattr(replay_mod, "score_chunk", flaky)
+    with pytest.raises(RuntimeError):
+        replay_mod.replay([archive], str(out), workers=0, chunk_size=3)
+    with open(out, "ab") as f:
+        f.write(b'{"half written')  # lost output past the checkpoint
+    calls.clear()
+    stats = replay_mod.replay([archive], str(out), workers=0, chunk_size=3)
+    assert calls[0] == 6  # resumed after the two checkpointed chunks
+    assert stats["total_records"] == 15
+    assert read_ndjson(out) == read_ndjson(full)
+
+
+def test_replay_syncs_output_before_each_checkpoint(tmp_path, monkeypatch):
+    archive = write_archive(tmp_path)
+    out = tmp_path / "scores.ndjson"
+    order = []
+    sync, save = replay_mod.NdjsonWriter.sync, replay_mod.Checkpoint.save
+    monkeypatch.setattr(
+        replay_mod.NdjsonWriter, "sync", lambda self: (order.append("sync"), sync(self))[1]
+    )
+    monkeypatch.setattr(
+        replay_mod.Checkpoint, "save", lambda self: (order.append("save"), save(self))[1]
+    )
+    replay_mod.replay([archive], str(out), workers=0, chunk_size=4)
+    assert order == ["sync", "save"] * 5  # four chunks, then the final save
+
+    out.unlink()
+    Path(f"{out}.checkpoint.json").write_text(
+        json.dumps({**json.loads(Path(f"{out}.checkpoint.json").read_text()), "done": False})
+    )
+    with pytest.raises(ValueError, match="--restart"):
+        replay_mod.replay([archive], str(out), workers=0, chunk_size=4)
+    assert not out.exists()
+
+
+def test_worker_rate_limits_split_rate_and_burst(monkeypatch):
+    bucket = replay_mod.intel_client.rate_limiters["otx"]
+    monkeypatch.setattr(bucket, "rate", bucket.rate)
+    monkeypatch.setattr(bucket, "capacity", 60.0)
+    monkeypatch.setattr(bucket, "_tokens", 60.0)
+    monkeypatch.setattr(bucket, "daily_budget", 0)
+    rate = bucket.rate
+    monkeypatch.setattr(replay_mod.correlator, "window", replay_mod.correlator.window)
+    replay_mod._init_worker(None, 4)
+    replay_mod._loop.close()
+    replay_mod.asyncio.set_event_loop(None)
+    assert bucket.rate == rate / 4
+    assert bucket.capacity == 15.0 and bucket._tokens == 15.0
+
+
+def test_replay_process_pool_matches_inline(tmp_path):
+    archive = write_archive(tmp_path)
+    inline, pooled = tmp_path / "inline.ndjson", tmp_path / "pooled.ndjson"
+    replay_mod.replay([archive], str(inline), workers=0, chunk_size=4)
+    stats = replay_mod.replay([archive], str(pooled), workers=2, chunk_size=4)
+    assert stats["records"] == 15 and stats["errors"] == 1
+    assert read_ndjson(pooled) == read_ndjson(inline)
+
+
+def test_replay_writes_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    archive = write_archive(tmp_path)
+    out = tmp_path / "scores.parquet"
+    replay_mod.replay([archive], str(out), fmt="parquet", workers=0)
+    table = pq.read_table(str(out / "part-00000.parquet"))
+    assert table.num_rows == 15
+    assert table.column("line").to_pylist()[:4] == [1, 2, 3, 4]
+    assert table.column("error").to_pylist()[3].startswith("Invalid JSON")
@@ -0,0 +1,100 @@
+import json
+import random
+
+import pytest
+
+from soc_agent.analyzer import RULE_WEIGHTS, SEVERITY_WEIGHT, base_score
+from soc_agent.models import EventIn
+from soc_agent.scoring import DEFAULT_RULES, RuleSet
+
+LEGACY_WEIGHTS = {
+    "auth_failed": 15,
+    "multiple_auth_failed": 25,
+    "malware_detected": 40,
+    "ransomware": 60,
+    "port_scan": 15,
+    "bruteforce": 35,
+    "geo_anomaly": 20,
+    "privilege_escalation": 50,
+    "lateral_movement": 45,
+    "exfil": 55,
+}
+
+
+def legacy_base_score(event):
+    # The hardcoded scoring the default rules replaced.
+    ev = (event.get("event_type") or "").lower()
+    score = min(100, int(event.get("severity") or 0) * 6) + LEGACY_WEIGHTS.get(ev, 0)
+    raw = event.get("raw") or {}
+    if isinstance(raw, dict):
+        fail_count = int(raw.get("fail_count") or 0)
+        if fail_count >= 5:
+            score += min(20, 3 * (fail_count // 5))
+        if raw.get("geo") in {"RU", "KP", "IR", "CN"}:
+            score += 10
+        if raw.get("new_admin_user"):
+            score += 25
+    return min(100, score)
+
+
+def random_events(n, seed=7):
+    rng = random.Random(seed)
+    types = [*LEGACY_WEIGHTS, "AUTH_FAILED", "Ransomware", "unknown", "", None]
+    events = []
+    for _ in range(n):
+        raw = rng.choice(
+            [
+                None,
+                "not a dict",
+                {},
+                {
+                    "fail_count": rng.choice([None, 0, 4, 5, 9, 10, 37, 200, -5, "12"]),
+                    "geo": rng.choice([None, "RU", "CN", "US", "ru"]),
+                    "new_admin_user": rng.choice([None, False, True, "yes", "", 0]),
+                },
+            ]
+        )
+        events.append({"event_type": rng.choice(types), "severity": rng.randint(0, 20), "raw": raw})
+    return events
+
+
+def test_default_rules_match_legacy_scoring():
+    events = random_events(2000)
+    assert [base_score(e) for e in events] == [legacy_base_score(e) for e in events]
+    model = EventIn(event_type="auth_failed", severity=5, raw={"fail_count": 12, "geo": "KP"})
+    assert base_score(model) == legacy_base_score(model.model_dump())
+
+
+def test_legacy_weight_constants_are_read_only_views_of_the_defaults():
+    assert SEVERITY_WEIGHT == 6 and RULE_WEIGHTS["ransomware"] == 60
+    assert dict(RULE_WEIGHTS) == DEFAULT_RULES["event_types"]
+    with pytest.raises(TypeError):
+        RULE_WEIGHTS["ransomware"] = 0
+
+
+def test_columnar_scoring_matches_single_event_path():
+    pytest.importorskip("numpy")
+    rules = RuleSet(DEFAULT_RULES)
+    events = random_events(5000, seed=11)
+    assert rules.score_batch(events) == [legacy_base_score(e) for e in events]
+    assert rules.score_batch([]) == []
+
+
+def test_rules_load_from_file(tmp_path):
+    path = tmp_path / "rules.json"
+    rules = {
+        "severity": {"weight": 2, "max": 10},
+        "event_types": {"Beacon": 30},
+        "conditions": [
+            {"field": "raw.bytes_out", "op": "gte", "value": 1000000, "points": 40},
+            {"field": "host", "op": "in", "values": ["dc01"], "points": 5},
+        ],
+        "max_score": 90,
+    }
+    path.write_text(json.dumps(rules))
+    loaded = RuleSet.load(str(path))
+    event = {"event_type": "beacon", "severity": 9, "host": "dc01", "raw": {"bytes_out": 2e6}}
+    assert loaded.score(event) == 10 + 30 + 40 + 5
+    assert loaded.fields == ["event_type", "severity", "raw.bytes_out", "host"]
+    with pytest.raises(ValueError):
+        RuleSet({"conditions": [{"field": "x", "op": "regex"}]})
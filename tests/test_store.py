@@ -0,0 +1,101 @@
+import sqlite3
+
+import pytest
+
+from soc_agent.models import EventIn
+from soc_agent.store import AnalysisStore
+
+
+class Clock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def analysis(category, ips=(), score=10):
+    return {
+        "iocs": {"ips": list(ips), "domains": [], "urls": [], "hashes": []},
+        "intel": {"ips": [], "domains": []},
+        "scores": {"base": score, "intel": 0, "final": score},
+        "category": category,
+        "recommended_action": "none",
+    }
+
+
+def test_query_by_indicator_category_and_time_with_pages(tmp_path):
+    clock = Clock()
+    store = AnalysisStore(str(tmp_path / "analyses.db"), clock=clock)
+    for i in range(5):
+        clock.now += 60
+        event = EventIn(source="wazuh", event_type="auth_failed", ip="1.2.3.4", raw={"n": i})
+        store.record(event, analysis("LOW", ["1.2.3.4"]))
+    store.record({"source": "crowdstrike", "ip": "5.6.7.8"}, analysis("HIGH", ["5.6.7.8"], 90))
+    store.flush()
+
+    first = store.query(indicator="1.2.3.4", limit=2)
+    assert all("raw" not in item["event"] for item in first["items"])
+    pages, cursor = [first["items"]], first["next"]
+    while cursor:
+        page = store.query(indicator="1.2.3.4", limit=2, cursor=cursor)
+        pages.append(page["items"])
+        cursor = page["next"]
+    assert [len(items) for items in pages] == [2, 2, 1]
+    seen = [item["ts"] for items in pages for item in items]
+    assert seen == sorted(seen, reverse=True) and len(set(seen)) == 5
+
+    (high,) = store.query(category="high")["items"]
+    assert high["event"]["source"] == "crowdstrike" and high["analysis"]["scores"]["final"] == 90
+    assert len(store.query(source="wazuh", since=seen[2])["items"]) == 3
+    assert len(store.query(indicator="1.2.3.4", until=seen[2])["items"]) == 2
+    store.close()
+
+
+def test_retention_removes_old_analyses(tmp_path):
+    clock = Clock()
+    store = AnalysisStore(str(tmp_path / "analyses.db"), retention_days=1, clock=clock)
+    store.record({"source": "wazuh"}, analysis("LOW", ["1.2.3.4"]))
+    clock.now += 2 * 86400
+    store.record({"source": "wazuh"}, analysis("LOW", ["1.2.3.4"]))
+    store.flush()
+    assert store.compact() == 1
+    assert [item["ts"] for item in store.query(indicator="1.2.3.4")["items"]] == [clock.now]
+    assert store.stats()["compacted"] == 1
+    store.close()
+
+
+def test_failed_writes_are_kept_for_the_next_flush(tmp_path, monkeypatch):
+    store = AnalysisStore(str(tmp_path / "analyses.db"), flush_interval=60, max_pending=3)
+    for _ in range(2):
+        store.record({"source": "wazuh"}, analysis("LOW", ["1.2.3.4"]))
+    insert = store._insert
+
+    def locked(batch):
+        store.record({"source": "wazuh"}, analysis("LOW", ["1.2.3.4"]))
+        store.record({"source": "wazuh"}, analysis("LOW", ["1.2.3.4"]))
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(store, "_insert", locked)
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush()
+    assert store.stats()["pending"] == 3 and store.stats()["dropped"] == 1
+
+    monkeypatch.setattr(store, "_insert", insert)
+    assert store.flush() == 3
+    assert len(store.query(indicator="1.2.3.4")["items"]) == 3
+    store.close()
+
+
+def test_webhook_analyses_are_queryable(client, monkeypatch, tmp_path):
+    store = AnalysisStore(str(tmp_path / "analyses.db"), flush_interval=60)
+    monkeypatch.setattr("soc_agent.webapp.analysis_store", store)
+    event = {"source": "wazuh", "event_type": "port_scan", "ip": "203.0.113.7", "severity": 2}
+    assert client.post("/webhook", json=event).status_code == 200
+    store.flush()
+    r = client.get("/analyses", params={"indicator": "203.0.113.7", "since": "2000-01-01T00:00Z"})
+    assert r.status_code == 200
+    (item,) = r.json()["items"]
+    assert item["event"]["event_type"] == "port_scan" and r.json()["next"] is None
+    assert client.get("/analyses", params={"cursor": "bogus"}).status_code == 400
+    store.close()
@@ -0,0 +1,141 @@
+import asyncio
+import os
+from pathlib import Path
+
+import orjson
+import pytest
+
+from soc_agent import tail as tail_mod
+from soc_agent.cli import main
+from soc_agent.store import AnalysisStore
+from soc_agent.tail import FileTailer
+
+FIXTURES = Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures"
+ALERTS = (FIXTURES / "wazuh.jsonl").read_bytes().splitlines()
+
+
+def follow(path, out, **kwargs):
+    options = dict(output=str(out), batch_size=3, from_start=True, actions=False, once=True)
+    options.update(kwargs)
+    return asyncio.run(tail_mod.follow(str(path), **options))
+
+
+def read_ndjson(path):
+    return [orjson.loads(line) for line in Path(path).read_bytes().splitlines()]
+
+
+def offsets(lines):
+    starts = [0]
+    for line in lines[:-1]:
+        starts.append(starts[-1] + len(line) + 1)
+    return starts
+
+
+def test_partial_line_waits_for_its_newline(tmp_path):
+    path = tmp_path / "alerts.json"
+    path.write_bytes(b"one\ntw")
+    tailer = FileTailer(str(path))
+    tailer.open()
+    assert tailer.read_lines(10) == [(0, b"one\n")]
+    assert tailer.read_lines(10) == []
+    with open(path, "ab") as f:
+        f.write(b"o\nthree\n")
+    assert tailer.read_lines(10) == [(4, b"two\n"), (8, b"three\n")]
+    assert tailer.offset == 14
+    tailer.close()
+
+
+def test_follows_rename_rotation_and_truncation(tmp_path):
+    path = tmp_path / "alerts.json"
+    path.write_bytes(b"a\nb\n")
+    tailer = FileTailer(str(path))
+    tailer.open()
+    assert [line for _, line in tailer.read_lines(10)] == [b"a\n", b"b\n"]
+    with open(path, "ab") as f:
+        f.write(b"c\nunterminated")
+    os.rename(path, tmp_path / "alerts.json.1")
+    path.write_bytes(b"d\n")
+    assert [line for _, line in tailer.read_lines(10)] == [b"c\n"]
+    assert [line for _, line in tailer.read_lines(10)] == [b"unterminated"]
+    assert tailer.read_lines(10) == [(0, b"d\n")] and tailer.rotations == 1
+    with open(path, "r+b") as f:  # copytruncate
+        f.truncate(0)
+    assert tailer.read_lines(10) == []
+    with open(path, "ab") as f:
+        f.write(b"e\n")
+    assert tailer.read_lines(10) == [(0, b"e\n")] and tailer.rotations == 2
+    tailer.close()
+
+
+def test_restart_after_failure_loses_and_repeats_nothing(tmp_path, monkeypatch):
+    path = tmp_path / "alerts.json"
+    path.write_bytes(b"\n".join(ALERTS[:5]) + b"\n")
+    out = tmp_path / "scores.ndjson"
+    score = tail_mod.enrich_and_score_batch
+    calls = []
+
+    async def flaky(payloads):
+        calls.append(len(payloads))
+        if len(calls) == 2:
+            raise RuntimeError("interrupted")
+        return await score(payloads)
+
+    monkeypatch.setattr(tail_mod, "enrich_and_score_batch", flaky)
+    with pytest.raises(RuntimeError):
+        follow(path, out)
+    with open(out, "ab") as f:
+        f.write(b'{"half written')  # lost output past the checkpoint
+    with open(path, "ab") as f:
+        f.write(b"{not json\n")
+    os.rename(path, tmp_path / "alerts.json.1")
+    path.write_bytes(b"\n".join(ALERTS[5:]) + b"\n")
+
+    stats = follow(path, out)
+    assert calls[2:] == [2, 3]  # resumed after the checkpointed batch
+    assert stats["rotations"] == 1 and stats["errors"] == 1
+    records = read_ndjson(out)
+    rotated = offsets(ALERTS[:5] + [b"{not json"])
+    assert [r["offset"] for r in records] == rotated + offsets(ALERTS[5:])
+    assert [r["source"] for r in records] == [str(path)] * 9
+    assert "error" in records[5] and all("analysis" in r for i, r in enumerate(records) if i != 5)
+    assert follow(path, out)["records"] == 0
+
+
+def test_cli_starts_at_end_of_file(tmp_path):
+    path = tmp_path / "alerts.json"
+    path.write_bytes(b"\n".join(ALERTS[:2]) + b"\n")
+    out = tmp_path / "scores.ndjson"
+    argv = ["tail", str(path), "-o", str(out), "--no-actions", "--once"]
+    assert main(argv) == 0
+    assert read_ndjson(out) == []
+    with open(path, "ab") as f:
+        f.write(ALERTS[2] + b"\n")
+    assert main(argv) == 0
+    (record,) = read_ndjson(out)
+    assert record["offset"] == offsets(ALERTS[:3])[2] and "analysis" in record
+
+
+def test_checkpoint_follows_stored_analyses_and_survives_missing_file(tmp_path, monkeypatch):
+    path = tmp_path / "alerts.json"
+    path.write_bytes(b"\n".join(ALERTS[:3]) + b"\n")
+    out = tmp_path / "scores.ndjson"
+    store = AnalysisStore(str(tmp_path / "analyses.db"), flush_interval=60)
+    monkeypatch.setattr(tail_mod, "analysis_store", store)
+    save = tail_mod.TailCheckpoint.save
+    pending_at_save = []
+
+    def checked_save(checkpoint):
+        pending_at_save.append(store.stats()["pending"])
+        save(checkpoint)
+
+    monkeypatch.setattr(tail_mod.TailCheckpoint, "save", checked_save)
+    follow(path, out)
+    assert pending_at_save == [0] and store.stats()["written"] == 3
+
+    # Restarted mid-rotation: alerts.json renamed away and not recreated yet.
+    with open(path, "ab") as f:
+        f.write(b"\n".join(ALERTS[3:5]) + b"\n")
+    os.rename(path, tmp_path / "alerts.json.1")
+    assert follow(path, out)["records"] == 2
+    assert [r["offset"] for r in read_ndjson(out)] == offsets(ALERTS[:5])
+    store.close()
@@ -1,3 +1,8 @@
+import hashlib
+import hmac
+import json
+import time
+
 from fastapi.testclient import TestClient
 
 from soc_agent.webapp import app
@@ -25,3 +30,86 @@ def test_webhook_ok(monkeypatch):
     assert r.status_code == 200
     data = r.json()
     assert "analysis" in data and "actions" in data
+
+
+class RecordingIntel:
+    def __init__(self):
+        self.requested = []
+
+    async def enrich_ips(self, ips, priority=0, deadline=None, verdict=None):
+        self.requested.append(list(ips))
+        return [{"indicator": ip, "score": 0, "labels": ["unknown"], "sources": {}} for ip in ips]
+
+
+def test_webhook_batch_array_dedupes_iocs(monkeypatch):
+    intel = RecordingIntel()
+    monkeypatch.setattr("soc_agent.analyzer.intel_client", intel)
+    events = [
+        {"event_type": "auth_failed", "severity": 5, "ip": "9.9.9.9"},
+        {
+            "rule": {"level": 7, "description": "sshd: authentication failed"},
+            "agent": {"name": "srv01"},
+            "data": {"srcip": "9.9.9.9"},
+            "full_log": "Failed password from 9.9.9.9 and 198.51.100.4",
+        },
+        "not an event",
+    ]
+    r = client.post("/webhook/batch", json=events)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["count"] == 3
+    assert intel.requested == [["9.9.9.9", "198.51.100.4"]]
+    assert data["results"][1]["analysis"]["iocs"]["ips"] == ["198.51.100.4", "9.9.9.9"]
+    assert data["results"][2]["status"] == 422
+
+
+def test_webhook_batch_ndjson_with_hmac(monkeypatch):
+    monkeypatch.setattr("soc_agent.analyzer.intel_client", RecordingIntel())
+    monkeypatch.setattr("soc_agent.webapp.SETTINGS.webhook_hmac_secret", "s3cret")
+    body = b'{"event_type": "port_scan", "severity": 2}\n{broken\n{"severity": 1}\n'
+    digest = hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+    headers = {"Content-Type": "application/x-ndjson", "X-Signature": f"sha256={digest}"}
+    r = client.post("/webhook/batch", content=body, headers=headers)
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [("analysis" in x, x.get("status")) for x in results] == [
+        (True, None),
+        (False, 400),
+        (True, None),
+    ]
+    headers["X-Signature"] = "sha256=bad"
+    assert client.post("/webhook/batch", content=body, headers=headers).status_code == 401
+
+
+def test_webhook_queues_action_and_reports_status(monkeypatch):
+    monkeypatch.setattr("soc_agent.analyzer.intel_client", RecordingIntel())
+    monkeypatch.setattr("soc_agent.webapp.email_unavailable", lambda: None)
+    monkeypatch.setattr("soc_agent.webapp.send_email", lambda **kw: (True, "sent"))
+    payload = {"event_type": "auth_failed", "severity": 10, "ip": "9.9.9.9"}
+    r = client.post("/webhook", json=payload)
+    assert r.status_code == 202
+    action = r.json()["actions"]["email"]
+    assert action["status"] == "queued"
+    for _ in range(200):
+        status = client.get(f"/actions/{action['id']}").json()
+        if status["status"] == "delivered":
+            break
+        time.sleep(0.01)
+    assert status["status"] == "delivered"
+    assert client.get("/actions/unknown").status_code == 404
+
+
+def test_webhook_wazuh_alert_response_bytes_match_stdlib_encoder(monkeypatch):
+    monkeypatch.setattr("soc_agent.analyzer.intel_client", RecordingIntel())
+    alert = {
+        "rule": {"level": 3, "description": "sshd: authentication failed"},
+        "agent": {"name": "srv-ü01"},
+        "data": {"srcip": "203.0.113.50", "srcuser": "jörg"},
+        "full_log": "Failed password for jörg from 203.0.113.50 port 22 ssh2",
+        "decoder": {"name": "sshd", "ratio": 0.25},
+    }
+    r = client.post("/webhook", content=json.dumps(alert).encode())
+    assert r.status_code == 200
+    expected = json.dumps(r.json(), ensure_ascii=False, separators=(",", ":")).encode()
+    assert r.content == expected
+    assert r.json()["analysis"]["iocs"]["ips"] == ["203.0.113.50"]